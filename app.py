@@ -1,15 +1,80 @@
 # app.py
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from config.logging import setup_logging
+from middleware.request_id import RequestIdMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.admission import AdmissionMiddleware
+from middleware.response_cache import ResponseCacheMiddleware
+from middleware.profiler import ProfilerMiddleware
+from middleware import admission
+from services import cache_sync, profiler, response_cache, startup
 from routes.auth import auth as authRouter
 from routes.user import user as userRouter
 from routes.session import session as sessionRouter
 from routes.gallery import gallery as galleryRouter  
+from routes.admin import admin as adminRouter
+from routes.media import media as mediaRouter
+from routes.metrics import metrics as metricsRouter
+
+# Logging asíncrono (QueueHandler + QueueListener), ver config/logging.py
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Esquema, conexiones y sentencias preparadas antes de aceptar peticiones
+    # (ver services/startup.py)
+    startup.run()
+    # Invalidaciones de caché de los demás workers (ver services/cache_sync.py)
+    if response_cache.ENABLED:
+        cache_sync.start()
+    yield
+    cache_sync.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# Añadimos los middlewares
+# (el último añadido es el más externo)
+# Compresión de JSON y texto desde 1 KB. Niveles bajos: en el JSON de las
+# galerías casi toda la reducción se obtiene ya con ellos, y el coste de CPU
+# crece mucho en los altos (limitados en middleware/compression.py)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=1024,
+    levels={"gzip": 5, "br": 4, "zstd": 3},
+)
+if profiler.ENABLED:
+    # Profiling bajo demanda (X-Profile: 1 de un admin o muestreo), ver services/profiler.py
+    app.add_middleware(ProfilerMiddleware)
+if admission.ENABLED:
+    # Control de admisión: 503 + Retry-After en lugar de colas sin límite.
+    # 40 = hilos del threadpool de AnyIO; los logins (bcrypt) se limitan a
+    # pocos a la vez y son los últimos en recibir hueco. Las descargas largas
+    # (selection.zip) tienen su propio límite para no ocupar los huecos de
+    # las lecturas durante minutos (ver middleware/admission.py)
+    app.add_middleware(
+        AdmissionMiddleware,
+        max_in_flight=40,
+        limits={"read": (32, 200), "write": (16, 100), "stream": (4, 20), "auth": (4, 20)},
+        queue_timeout=2.0,
+    )
+if response_cache.ENABLED:
+    # Caché de respuestas GET por usuario, por fuera de la compresión
+    # para guardar los bytes ya comprimidos (ver services/response_cache.py)
+    app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(MetricsMiddleware)  # Latencias, Server-Timing y /metrics
 
 # Añadimos los routers
 app.include_router(authRouter)
 app.include_router(userRouter)
 app.include_router(sessionRouter)
-app.include_router(galleryRouter) 
\ No newline at end of file
+app.include_router(galleryRouter)
+app.include_router(adminRouter)
+app.include_router(mediaRouter)
+app.include_router(metricsRouter) 
\ No newline at end of file
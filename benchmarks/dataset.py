@@ -0,0 +1,154 @@
+# benchmarks/dataset.py
+"""
+Datos sintéticos para los benchmarks
+
+Crea en la base de datos configurada (DATABASE_URL) un fotógrafo, un
+cliente y, por cada tamaño de galería pedido, una sesión con ese número de
+fotos y una galería del cliente que las contiene todas.
+
+Los datos se crean una sola vez: en ejecuciones posteriores se reutilizan.
+Las fotos y sus relaciones se insertan con executemany.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from config.db import get_db
+from config.security import get_password_hash
+from models import users, sessions, photos, galleries, gallery_photos
+from models.migrations import ensure_schema
+from services.ranking import initial_rank
+
+PHOTOGRAPHER_EMAIL = "bench-fotografo@example.com"
+CLIENT_EMAIL = "bench-cliente@example.com"
+PASSWORD = "bench123"
+
+# Una de cada SELECTED_EVERY fotos de cada galería se marca como seleccionada
+SELECTED_EVERY = 4
+
+
+def _gallery_name(size: int) -> str:
+    return f"bench-{size}"
+
+
+def load_dataset(gallery_sizes: list[int]) -> dict:
+    """
+    Devuelve los IDs de los datos de benchmark, creándolos si no existen.
+
+    Retorna un diccionario con photographer_id, client_id y galleries
+    (tamaño -> {"id": gallery_id, "photo_ids": [...]}).
+    """
+    ensure_schema()
+
+    with get_db() as db:
+        photographer = db.execute(
+            select(users.c.id).where(users.c.email == PHOTOGRAPHER_EMAIL)
+        ).first()
+        if photographer is None:
+            _create_users(db)
+            photographer = db.execute(
+                select(users.c.id).where(users.c.email == PHOTOGRAPHER_EMAIL)
+            ).first()
+
+        client = db.execute(
+            select(users.c.id).where(users.c.email == CLIENT_EMAIL)
+        ).first()
+
+        dataset = {
+            "photographer_id": photographer.id,
+            "client_id": client.id,
+            "galleries": {},
+        }
+        for size in gallery_sizes:
+            dataset["galleries"][size] = _get_or_create_gallery(
+                db, size, photographer.id, client.id
+            )
+        return dataset
+
+
+def _create_users(db):
+    # Los dos usuarios comparten contraseña: un solo hash
+    password = get_password_hash(PASSWORD)
+    photographer_id = db.execute(
+        users.insert().values(
+            name="Bench Fotógrafo",
+            email=PHOTOGRAPHER_EMAIL,
+            password=password,
+            role="photographer",
+        )
+    ).inserted_primary_key[0]
+    db.execute(
+        users.insert().values(
+            name="Bench Cliente",
+            email=CLIENT_EMAIL,
+            password=password,
+            role="client",
+            photographer_id=photographer_id,
+        )
+    )
+
+
+def _get_or_create_gallery(db, size: int, photographer_id: int, client_id: int) -> dict:
+    gallery = db.execute(
+        select(galleries.c.id).where(
+            galleries.c.name == _gallery_name(size),
+            galleries.c.photographer_id == photographer_id,
+        )
+    ).first()
+
+    if gallery is None:
+        session_id = db.execute(
+            sessions.insert().values(
+                name=f"Bench sesión {size}",
+                date=datetime(2025, 1, 1),
+                photographer_id=photographer_id,
+            )
+        ).inserted_primary_key[0]
+
+        db.execute(
+            photos.insert(),
+            [
+                {
+                    "description": f"Foto {number}",
+                    "path": f"/uploads/sessions/{session_id}/bench_{number:06d}.jpg",
+                    "session_id": session_id,
+                }
+                for number in range(size)
+            ],
+        )
+        photo_ids = db.execute(
+            select(photos.c.id).where(photos.c.session_id == session_id).order_by(photos.c.id)
+        ).scalars().all()
+
+        gallery_id = db.execute(
+            galleries.insert().values(
+                name=_gallery_name(size),
+                description=f"Galería de benchmark con {size} fotos",
+                photographer_id=photographer_id,
+                client_id=client_id,
+            )
+        ).inserted_primary_key[0]
+
+        db.execute(
+            gallery_photos.insert(),
+            [
+                {
+                    "gallery_id": gallery_id,
+                    "photo_id": photo_id,
+                    "selected": number % SELECTED_EVERY == 0,
+                    "favorite": False,
+                    "rank": initial_rank(number + 1),
+                }
+                for number, photo_id in enumerate(photo_ids)
+            ],
+        )
+    else:
+        gallery_id = gallery.id
+
+    photo_ids = db.execute(
+        select(gallery_photos.c.photo_id)
+        .where(gallery_photos.c.gallery_id == gallery_id)
+        .order_by(gallery_photos.c.photo_id)
+    ).scalars().all()
+    return {"id": gallery_id, "photo_ids": photo_ids}
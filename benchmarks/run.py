@@ -0,0 +1,337 @@
+# benchmarks/run.py
+"""
+Benchmarks de carga de la API
+
+Lanza peticiones concurrentes contra los endpoints principales y mide el
+throughput y las latencias p50/p95/p99 de cada uno:
+    - token:              POST /token
+    - users_me:           GET /users/me
+    - galleries_me:       GET /galleries/me/
+    - gallery_<tamaño>:   GET /galleries/{id} con galerías de distintos tamaños
+    - toggle_selection:   PUT /galleries/{id}/photos/{photo_id}/select
+
+Dos transportes:
+    - asgi:    la app en el mismo proceso (httpx.ASGITransport), sin red
+    - uvicorn: un servidor uvicorn real en un subproceso, por socket TCP
+
+Los datos se crean en una base de datos propia (data/db/bench.db por
+defecto, ver benchmarks/dataset.py), nunca en la de desarrollo.
+
+El resultado es un JSON. Con --baseline se compara con un resultado
+anterior y el proceso termina con código 1 si algún endpoint empeora más
+de la tolerancia (throughput menor o p95 mayor).
+
+Ejemplos de uso (desde el directorio raíz del proyecto):
+    > python -m benchmarks.run
+    > python -m benchmarks.run --transport uvicorn --concurrency 32 --requests 2000
+    > python -m benchmarks.run --scenarios users_me,gallery_1000 --output resultado.json
+    > python -m benchmarks.run --save-baseline                 # guarda benchmarks/baseline.json
+    > python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+DEFAULT_DATABASE = "./data/db/bench.db"
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+
+# -------------------------------------------------------------------
+# Escenarios
+# -------------------------------------------------------------------
+class Scenario:
+    """
+    Un endpoint a medir.
+
+    build_request(n) devuelve los argumentos de httpx para la petición
+    número n (método, URL y opciones como cabeceras o formulario).
+    """
+
+    def __init__(self, name: str, build_request, expected_status: int = 200):
+        self.name = name
+        self.build_request = build_request
+        self.expected_status = expected_status
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> dict:
+    response = await client.post("/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def build_scenarios(client: httpx.AsyncClient, dataset: dict) -> list[Scenario]:
+    from benchmarks.dataset import PHOTOGRAPHER_EMAIL, CLIENT_EMAIL, PASSWORD
+
+    photographer = await _login(client, PHOTOGRAPHER_EMAIL, PASSWORD)
+    client_headers = await _login(client, CLIENT_EMAIL, PASSWORD)
+
+    scenarios = [
+        Scenario(
+            "token",
+            lambda n: ("POST", "/token", {"data": {"username": CLIENT_EMAIL, "password": PASSWORD}}),
+        ),
+        Scenario("users_me", lambda n: ("GET", "/users/me", {"headers": client_headers})),
+        Scenario("galleries_me", lambda n: ("GET", "/galleries/me/", {"headers": photographer})),
+    ]
+
+    for size, gallery in sorted(dataset["galleries"].items()):
+        url = f"/galleries/{gallery['id']}"
+        scenarios.append(
+            Scenario(f"gallery_{size}", lambda n, url=url: ("GET", url, {"headers": client_headers}))
+        )
+
+    # La selección se alterna recorriendo las fotos de la galería más pequeña
+    smallest = dataset["galleries"][min(dataset["galleries"])]
+    gallery_id, photo_ids = smallest["id"], smallest["photo_ids"]
+    scenarios.append(
+        Scenario(
+            "toggle_selection",
+            lambda n: (
+                "PUT",
+                f"/galleries/{gallery_id}/photos/{photo_ids[n % len(photo_ids)]}/select",
+                {"headers": client_headers},
+            ),
+        )
+    )
+    return scenarios
+
+
+# -------------------------------------------------------------------
+# Medición
+# -------------------------------------------------------------------
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Percentil por el método del rango más cercano."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int, warmup: int
+) -> dict:
+    """Lanza `requests` peticiones con `concurrency` clientes en paralelo."""
+    for n in range(warmup):
+        method, url, options = scenario.build_request(n)
+        await client.request(method, url, **options)
+
+    latencies: list[float] = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal errors, next_request
+        while next_request < requests:
+            n = next_request
+            next_request += 1
+            method, url, options = scenario.build_request(warmup + n)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **options)
+                ok = response.status_code == scenario.expected_status
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def run_all(client: httpx.AsyncClient, dataset: dict, args) -> dict:
+    scenarios = await build_scenarios(client, dataset)
+    if args.scenarios:
+        wanted = set(args.scenarios.split(","))
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+
+    results = {}
+    for scenario in scenarios:
+        print(f"  {scenario.name}...", file=sys.stderr, flush=True)
+        results[scenario.name] = await run_scenario(
+            client, scenario, args.requests, args.concurrency, args.warmup
+        )
+    return results
+
+
+# -------------------------------------------------------------------
+# Transportes
+# -------------------------------------------------------------------
+async def bench_asgi(dataset: dict, args) -> dict:
+    from app import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await run_all(client, dataset, args)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn terminó antes de aceptar conexiones")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"uvicorn no aceptó conexiones en {timeout} s")
+
+
+async def bench_uvicorn(dataset: dict, args) -> dict:
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        # Los workers se enteran de que no están solos (ver services/cache_sync.py)
+        env={**os.environ, "WEB_CONCURRENCY": str(args.workers)},
+    )
+    try:
+        _wait_for_port(port, process)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            return await run_all(client, dataset, args)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+# -------------------------------------------------------------------
+# Comparación con el baseline
+# -------------------------------------------------------------------
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Devuelve la lista de regresiones respecto al baseline."""
+    regressions = []
+    for transport, scenarios in results["results"].items():
+        for name, current in scenarios.items():
+            previous = baseline.get("results", {}).get(transport, {}).get(name)
+            if previous is None:
+                continue
+
+            if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{transport}/{name}: throughput {current['throughput_rps']} rps "
+                    f"(baseline {previous['throughput_rps']} rps)"
+                )
+            if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{transport}/{name}: p95 {current['p95_ms']} ms "
+                    f"(baseline {previous['p95_ms']} ms)"
+                )
+            if current["errors"] > previous["errors"]:
+                regressions.append(
+                    f"{transport}/{name}: {current['errors']} errores "
+                    f"(baseline {previous['errors']})"
+                )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks de carga de la API")
+    parser.add_argument("--transport", choices=["asgi", "uvicorn", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes en paralelo")
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones por escenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Peticiones de calentamiento por escenario")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn")
+    parser.add_argument("--gallery-sizes", default="10,100,1000", help="Tamaños de galería separados por comas")
+    parser.add_argument("--scenarios", default="", help="Escenarios a ejecutar separados por comas (todos por defecto)")
+    parser.add_argument("--database", default=DEFAULT_DATABASE, help="Base de datos SQLite de los benchmarks")
+    parser.add_argument("--output", help="Archivo donde guardar el JSON (por defecto stdout)")
+    parser.add_argument("--baseline", type=Path, help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Guarda el resultado en {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Empeoramiento tolerado (0.15 = 15 %%)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # La configuración se lee al importar la app: fijarla antes de importar nada.
+    # Los logs por petición distorsionan la medida, solo se dejan los avisos.
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.database}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from benchmarks.dataset import load_dataset
+
+    gallery_sizes = [int(size) for size in args.gallery_sizes.split(",")]
+    print("Preparando datos de benchmark...", file=sys.stderr, flush=True)
+    dataset = load_dataset(gallery_sizes)
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "workers": args.workers,
+            "gallery_sizes": gallery_sizes,
+        },
+        "results": {},
+    }
+
+    transports = ["asgi", "uvicorn"] if args.transport == "both" else [args.transport]
+    for transport in transports:
+        print(f"Transporte {transport}:", file=sys.stderr, flush=True)
+        bench = bench_asgi if transport == "asgi" else bench_uvicorn
+        results["results"][transport] = asyncio.run(bench(dataset, args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        DEFAULT_BASELINE.write_text(output + "\n")
+        print(f"Baseline guardado en {DEFAULT_BASELINE}", file=sys.stderr)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESIÓN {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("Sin regresiones respecto al baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,46 +3,118 @@
 # Importamos los componentes necesarios de SQLAlchemy:
 # - create_engine: Crea el motor de base de datos para gestionar conexiones
 # - MetaData: Contiene definiciones de tablas y otros elementos del esquema
-from sqlalchemy import create_engine, MetaData
-from contextlib import contextmanager
+from sqlalchemy import create_engine, MetaData, event
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Optional
+import os
+import time
+from dotenv import load_dotenv # Para variables de entorno
+
+# Cargar las variables de entorno desde el archivo .env
+load_dotenv()
+
+# URL de conexión a la base de datos SQLite
+# Se puede cambiar con la variable de entorno DATABASE_URL (p. ej. los
+# benchmarks usan su propia base de datos para no tocar la de desarrollo)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/db/test.db")
 
 # Creación del motor de SQLAlchemy
-# - sqlite:///./test.db: URL de conexión a la base de datos SQLite
+# - DATABASE_URL: URL de conexión a la base de datos SQLite
 # - check_same_thread=False: Permite acceso desde múltiples hilos (necesario para FastAPI)
 # - isolation_level="AUTOCOMMIT": Comentado, pero permitiría auto-commit en cada operación
+# - timeout=30: Espera hasta 30 segundos si otro proceso tiene bloqueada la base de datos
 engine = create_engine(
-    "sqlite:///./data/db/test.db", 
-    connect_args={"check_same_thread": False},
+    DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": 30},
     #isolation_level="AUTOCOMMIT"
     )
 
+
+# Pragmas aplicados a cada nueva conexión SQLite
+# - journal_mode=WAL: Los lectores no bloquean al escritor (API y workers en paralelo)
+# - synchronous=NORMAL: Seguro con WAL y mucho más rápido que FULL
+# - busy_timeout: Espera en lugar de fallar con "database is locked"
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
+# Estadísticas de las consultas ejecutadas durante una petición
+# (número de consultas, tiempo total en segundos y veces que se ejecutó
+# cada sentencia SQL, para detectar patrones N+1)
+class QueryStats:
+    __slots__ = ("count", "duration", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: dict[str, int] = {}
+
+
+# Estadísticas de la petición en curso. Las crea middleware/metrics.py;
+# fuera de una petición (scripts, workers) es None y no se mide nada.
+query_stats_var: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+# Medición del tiempo de cada consulta mediante los eventos del cursor
+@event.listens_for(engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats_var.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += time.perf_counter() - context._query_start
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
 # Objeto MetaData: Registro central de todos los objetos de la base de datos
 # - Almacena definiciones de tablas, índices y constraints
 # - Sirve como punto de referencia para el esquema completo de la base de datos
 meta = MetaData()
 
+# Control de acceso a las conexiones: services/fair_scheduler.py lo sustituye
+# por su reparto por fotógrafo. Por defecto (scripts, workers) no limita nada.
+connection_gate = nullcontext
+
 # Gestor de contexto para manejar conexiones a la base de datos
 # Proporciona una forma segura de:
 # - Obtener una conexión
 # - Manejar transacciones (commit/rollback)
 # - Cerrar la conexión automáticamente
+#
+# Con immediate=True la transacción empieza con BEGIN IMMEDIATE (bloqueo de
+# escritura desde el principio). Sin él, pysqlite solo abre la transacción
+# en el primer INSERT/UPDATE/DELETE: las lecturas anteriores no forman parte
+# de ella y dos peticiones pueden decidir la misma escritura a partir de
+# los mismos datos. Para operaciones de leer y después escribir.
 @contextmanager
-def get_db():
-     # Establece una nueva conexión
-    connection = engine.connect()
-    try:
-        # Cede la conexión al código que usa este contexto
-        yield connection
-        # Si no hay excepciones, confirma los cambios
-        connection.commit()
-    except Exception:
-        # Si hay algún error, revierte los cambios
-        connection.rollback()
-         # Re-lanza la excepción para su manejo superior
-        raise
-    finally:
-         # Garantiza que la conexión se cierre, incluso si hay errores
-        connection.close()
+def get_db(immediate: bool = False):
+    with connection_gate():
+         # Establece una nueva conexión
+        connection = engine.connect()
+        try:
+            if immediate:
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+            # Cede la conexión al código que usa este contexto
+            yield connection
+            # Si no hay excepciones, confirma los cambios
+            connection.commit()
+        except Exception:
+            # Si hay algún error, revierte los cambios
+            connection.rollback()
+             # Re-lanza la excepción para su manejo superior
+            raise
+        finally:
+             # Garantiza que la conexión se cierre, incluso si hay errores
+            connection.close()
 
 '''
 # En los endpoints
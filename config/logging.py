@@ -0,0 +1,152 @@
+# config/logging.py
+"""
+Configuración del logging de la aplicación
+
+Los handlers de las rutas no escriben en stdout directamente: cada registro
+se encola con un QueueHandler y un QueueListener (hilo aparte) lo formatea
+y lo escribe. El hilo de la petición solo paga el coste de encolar.
+
+Variables de entorno:
+    LOG_LEVEL              Nivel por defecto (INFO)
+    LOG_LEVELS             Niveles por módulo, p. ej. "routes.gallery=DEBUG,sqlalchemy.engine=WARNING"
+    LOG_FORMAT             'json' (por defecto) o 'text'
+    LOG_DEBUG_SAMPLE_RATE  Fracción de registros DEBUG que se conservan (1.0 = todos)
+
+Ejemplo de uso:
+    import logging
+    logger = logging.getLogger(__name__)
+    logger.debug("Galería %s consultada por %s", gallery_id, user_id)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from dotenv import load_dotenv # Para variables de entorno
+
+# Cargar las variables de entorno desde el archivo .env
+load_dotenv()
+
+# ID de la petición en curso (lo asigna middleware/request_id.py)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Listener activo (None hasta llamar a setup_logging)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Añade a cada registro el ID de la petición que lo generó."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Conserva solo una fracción de los registros DEBUG."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea el mensaje al encolar.
+
+    El QueueHandler estándar llama a format() en el hilo que registra;
+    como la cola es en memoria (no se serializa), el registro se puede
+    pasar tal cual y dejar todo el formateo al hilo del listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# Convierte "routes.gallery=DEBUG,sqlalchemy.engine=WARNING" en un diccionario
+def _parse_levels(value: str) -> dict[str, str]:
+    levels = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """
+    Configura el logging de la aplicación (se puede llamar varias veces).
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        formatter = logging.Formatter(
+            "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+        )
+    else:
+        formatter = JsonFormatter()
+
+    # El listener escribe en stdout desde su propio hilo
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(
+        DebugSamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0")))
+    )
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    # Vaciar la cola al terminar el proceso para no perder registros
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Detiene el listener escribiendo antes los registros pendientes."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
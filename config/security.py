@@ -2,6 +2,13 @@
 
 # Importaciones necesarias
 import os
+import hmac
+import hashlib
+import base64
+import time
+import multiprocessing
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta,timezone
 from typing import Optional
 from jose import JWTError, jwt # Para manejo de tokens JWT
@@ -17,6 +24,7 @@ class Settings:
     SECRET_KEY = os.getenv("SECRET_KEY", "my-super-secret-key")  # Lee SECRET_KEY o usa el valor por defecto
     ALGORITHM = os.getenv("ALGORITHM", "HS256")                  # Lee ALGORITHM o usa el valor por defecto
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))  # Convierte a entero
+    MEDIA_URL_EXPIRE_SECONDS = int(os.getenv("MEDIA_URL_EXPIRE_SECONDS", 3600))  # Validez mínima de las URLs firmadas
 
 # Instancia de configuración
 settings = Settings()
@@ -34,6 +42,32 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# Pool de procesos para hashear contraseñas en paralelo (se crea al primer uso).
+# Se usa "spawn" porque hacer fork de un servidor con hilos puede bloquearse.
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+# Genera los hashes de varias contraseñas repartiéndolos entre todos los núcleos.
+# Args:
+#   passwords (list[str]): Contraseñas en texto plano
+# Returns:
+#   list[str]: Hashes en el mismo orden
+def get_password_hashes(passwords: list[str]) -> list[str]:
+    global _hash_pool
+
+    if len(passwords) < 2:
+        return [get_password_hash(password) for password in passwords]
+
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    chunksize = max(1, len(passwords) // ((os.cpu_count() or 1) * 4))
+    return list(_hash_pool.map(get_password_hash, passwords, chunksize=chunksize))
+
+
 # Crea un token JWT con los datos proporcionados y tiempo de expiración.
 # Args:
 #   data (dict): Datos a incluir en el token
@@ -64,4 +98,75 @@ def verify_token(token: str) -> Optional[dict]:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+
+# -------------------------------------------------------------------
+# URLs firmadas de las fotos
+#
+# GET /media/... sirve los ficheros sin consultar la base de datos: la URL
+# lleva su caducidad y una firma HMAC-SHA256 de la ruta y la caducidad. Solo
+# la puede generar quien conoce SECRET_KEY, y get_gallery solo la entrega a
+# quien puede ver la galería.
+#
+# La caducidad se redondea a ventanas de MEDIA_URL_EXPIRE_SECONDS: todas las
+# URLs de una foto generadas en la misma ventana son idénticas (cacheables
+# por el navegador o un proxy) y siguen siendo válidas entre una y dos
+# ventanas.
+# -------------------------------------------------------------------
+
+# Clave propia para las URLs, derivada de SECRET_KEY (no se reutiliza la de los JWT)
+_MEDIA_KEY = hmac.new(settings.SECRET_KEY.encode(), b"media-url", hashlib.sha256).digest()
+
+# Bytes de la firma (128 bits, en base64url son 22 caracteres)
+MEDIA_SIGNATURE_BYTES = 16
+
+# Prefijo de las URLs de las fotos. Los middlewares de admisión, caché de
+# respuestas y profiling no se aplican a estas rutas
+MEDIA_PREFIX = "/media/"
+
+
+# Ventana de caducidad a la que pertenece un instante.
+# Args:
+#   timestamp (float): Segundos epoch
+# Returns:
+#   int: Número de ventana
+def media_url_window(timestamp: float) -> int:
+    return int(timestamp // settings.MEDIA_URL_EXPIRE_SECONDS)
+
+
+# Firma de una ruta de fichero y su caducidad.
+# Args:
+#   path (str): Ruta de la foto sin '/' inicial (p. ej. uploads/sessions/1/boda_001.jpg)
+#   expires (int): Segundos epoch a partir de los cuales la URL deja de valer
+# Returns:
+#   str: Firma en base64url sin relleno
+def sign_media_path(path: str, expires: int) -> str:
+    digest = hmac.new(_MEDIA_KEY, f"{path}\n{expires}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:MEDIA_SIGNATURE_BYTES]).rstrip(b"=").decode()
+
+
+# Genera la URL firmada de una foto.
+# Args:
+#   path (str): Ruta de la foto tal como está en photos.path
+#   now (Optional[float]): Instante de referencia (por defecto, ahora)
+# Returns:
+#   str: URL relativa, p. ej. /media/uploads/...jpg?expires=...&signature=...
+def media_url(path: str, now: Optional[float] = None) -> str:
+    path = path.lstrip("/")
+    window = media_url_window(time.time() if now is None else now)
+    expires = (window + 2) * settings.MEDIA_URL_EXPIRE_SECONDS
+    return f"{MEDIA_PREFIX}{quote(path)}?expires={expires}&signature={sign_media_path(path, expires)}"
+
+
+# Comprueba la firma de una URL (en tiempo constante) y que no haya caducado.
+# Args:
+#   path (str): Ruta de la foto sin '/' inicial
+#   expires (int): Caducidad de la URL
+#   signature (str): Firma recibida
+# Returns:
+#   bool: True si la URL es válida
+def verify_media_signature(path: str, expires: int, signature: str) -> bool:
+    expected = sign_media_path(path, expires)
+    valid = hmac.compare_digest(expected.encode(), signature.encode())
+    return valid and expires > time.time()
@@ -0,0 +1,28 @@
+# config/storage.py
+
+# Importaciones necesarias
+import os
+from pathlib import Path
+from dotenv import load_dotenv # Para variables de entorno
+
+# Cargar las variables de entorno desde el archivo .env
+load_dotenv()
+
+# Directorio raíz donde se guardan los ficheros de las fotos.
+# Las rutas de la tabla 'photos' (p. ej. /uploads/sessions/1/boda_001.jpg)
+# son relativas a este directorio.
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", "./data")).resolve()
+
+
+# Convierte la ruta guardada en la base de datos en una ruta del disco.
+# Args:
+#   path (str): Ruta de la foto tal como está en photos.path
+# Returns:
+#   Path: Ruta absoluta dentro de MEDIA_ROOT
+# Raises:
+#   ValueError: Si la ruta intenta salir de MEDIA_ROOT (p. ej. con '..')
+def resolve_media_path(path: str) -> Path:
+    resolved = (MEDIA_ROOT / path.lstrip("/")).resolve()
+    if not resolved.is_relative_to(MEDIA_ROOT):
+        raise ValueError(f"Ruta fuera del directorio de medios: {path}")
+    return resolved
@@ -0,0 +1,233 @@
+# middleware/admission.py
+"""
+Control de admisión y descarte de carga
+
+Los handlers síncronos se ejecutan en un threadpool limitado y la base de
+datos es un único archivo SQLite: con sobrecarga, las peticiones se
+acumulan sin límite hasta que los clientes abandonan por timeout, y
+entonces ninguna petición termina a tiempo. Es preferible rechazar pronto
+una parte (503 + Retry-After) y atender bien el resto.
+
+Cada petición pertenece a una clase:
+    - auth:   POST /token (bcrypt, caro en CPU)
+    - stream: descargas largas (GET de STREAM_SUFFIXES, p. ej. selection.zip),
+              que ocupan su hueco durante minutos
+    - read:   el resto de GET, HEAD y OPTIONS
+    - write:  el resto de métodos
+
+Hay un límite global de peticiones en curso y, dentro de él, un límite por
+clase. Si no hay hueco, la petición espera en la cola de su clase como
+mucho queue_timeout segundos; si la cola está llena o se agota la espera,
+se rechaza. Cuando se libera un hueco se atiende primero a las lecturas,
+después a las escrituras, a las descargas y por último a los logins.
+
+Los límites se configuran en app.py. ADMISSION_ENABLED=0 lo desactiva.
+"""
+
+import asyncio
+import json
+import math
+import os
+from collections import deque
+from typing import Optional
+
+from config.security import MEDIA_PREFIX
+from middleware.metrics import registry
+
+ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+
+# Rutas que nunca se rechazan (monitorización)
+EXEMPT_PATHS = ("/metrics",)
+
+# Prefijos de rutas que nunca se rechazan: las fotos con URL firmada no
+# consultan la base de datos y una galería grande pide cientos a la vez
+EXEMPT_PREFIXES = (MEDIA_PREFIX,)
+
+# Finales de ruta de las descargas largas (clase 'stream')
+STREAM_SUFFIXES = (".zip",)
+
+
+class AdmissionClass:
+    """Límite, cola y contadores de una clase de peticiones."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, priority: int):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.priority = priority  # Menor = se atiende antes
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+
+
+class AdmissionController:
+    """Semáforo con prioridades: un límite global y uno por clase."""
+
+    def __init__(self, max_in_flight: int, classes: list[AdmissionClass], queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.classes = {cls.name: cls for cls in classes}
+        self._by_priority = sorted(classes, key=lambda cls: cls.priority)
+        self.in_flight = 0
+
+    def _has_room(self, cls: AdmissionClass) -> bool:
+        return self.in_flight < self.max_in_flight and cls.in_flight < cls.limit
+
+    def _admit(self, cls: AdmissionClass):
+        self.in_flight += 1
+        cls.in_flight += 1
+        cls.admitted += 1
+
+    async def acquire(self, cls: AdmissionClass) -> Optional[str]:
+        """Reserva un hueco; devuelve el motivo del rechazo o None si se admite."""
+        # Sin adelantar a las que ya esperan en su clase. Las de otras clases
+        # que esperan con hueco global libre están limitadas por su propia clase;
+        # la prioridad se aplica al repartir los huecos en release()
+        if not cls.waiters and self._has_room(cls):
+            self._admit(cls)
+            return None
+
+        if len(cls.waiters) >= cls.max_queue:
+            cls.rejected["queue_full"] += 1
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        cls.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Petición cancelada: devolver el hueco si ya se le había concedido
+            if waiter.done():
+                self.release(cls)
+            else:
+                waiter.cancel()
+                cls.waiters.remove(waiter)
+            raise
+
+        # El hueco puede haberse concedido justo al agotarse la espera
+        if waiter.done():
+            return None
+        waiter.cancel()
+        cls.waiters.remove(waiter)
+        cls.rejected["timeout"] += 1
+        return "timeout"
+
+    def release(self, cls: AdmissionClass):
+        self.in_flight -= 1
+        cls.in_flight -= 1
+        # Repartir los huecos libres por orden de prioridad
+        for waiting in self._by_priority:
+            while waiting.waiters and self._has_room(waiting):
+                self._admit(waiting)
+                waiting.waiters.popleft().set_result(None)
+
+    def retry_after(self) -> int:
+        """Segundos que se sugieren al cliente antes de reintentar."""
+        return max(1, math.ceil(self.queue_timeout))
+
+    def metrics(self) -> list[str]:
+        """Métricas para GET /metrics."""
+        lines = [
+            "# HELP admission_in_flight Peticiones admitidas en curso",
+            "# TYPE admission_in_flight gauge",
+        ]
+        lines += [f'admission_in_flight{{class="{c.name}"}} {c.in_flight}' for c in self._by_priority]
+        lines += [
+            "# HELP admission_queued Peticiones esperando hueco",
+            "# TYPE admission_queued gauge",
+        ]
+        lines += [f'admission_queued{{class="{c.name}"}} {len(c.waiters)}' for c in self._by_priority]
+        lines += [
+            "# HELP admission_admitted_total Peticiones admitidas",
+            "# TYPE admission_admitted_total counter",
+        ]
+        lines += [f'admission_admitted_total{{class="{c.name}"}} {c.admitted}' for c in self._by_priority]
+        lines += [
+            "# HELP admission_rejected_total Peticiones rechazadas con 503",
+            "# TYPE admission_rejected_total counter",
+        ]
+        lines += [
+            f'admission_rejected_total{{class="{c.name}",reason="{reason}"}} {count}'
+            for c in self._by_priority
+            for reason, count in c.rejected.items()
+        ]
+        return lines
+
+
+def classify(scope) -> str:
+    """Clase de la petición a partir del método y la ruta."""
+    if scope["method"] in ("GET", "HEAD", "OPTIONS"):
+        if scope["path"].endswith(STREAM_SUFFIXES):
+            return "stream"
+        return "read"
+    if scope["path"] == "/token":
+        return "auth"
+    return "write"
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI de control de admisión (ver docstring del módulo).
+
+    limits: {clase: (peticiones en curso, tamaño de la cola)}
+    """
+
+    # Orden en que se reparten los huecos libres
+    PRIORITIES = ("read", "write", "stream", "auth")
+
+    def __init__(
+        self,
+        app,
+        max_in_flight: int = 40,
+        limits: Optional[dict[str, tuple[int, int]]] = None,
+        queue_timeout: float = 2.0,
+    ):
+        self.app = app
+        limits = {"read": (32, 200), "write": (16, 100), "stream": (4, 20), "auth": (4, 20), **(limits or {})}
+        self.controller = AdmissionController(
+            max_in_flight,
+            [
+                AdmissionClass(name, *limits[name], priority=priority)
+                for priority, name in enumerate(self.PRIORITIES)
+            ],
+            queue_timeout,
+        )
+        registry.register_collector(self.controller.metrics)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] in EXEMPT_PATHS
+            or scope["path"].startswith(EXEMPT_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        cls = self.controller.classes[classify(scope)]
+        rejected = await self.controller.acquire(cls)
+        if rejected is not None:
+            await self._reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(cls)
+
+    async def _reject(self, send):
+        body = json.dumps(
+            {"detail": "Servidor sobrecargado, inténtalo de nuevo en unos segundos"}
+        ).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.controller.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -5,13 +5,24 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from config.security import verify_token
 from config.db import get_db
-from models.user import users
+from models.user import users, UserRole
+from services.fair_scheduler import tenant_for, tenant_var
+from services.startup import register_hot_statement
 from sqlalchemy import select
 
 # Configurar el esquema OAuth2 con la ruta del endpoint de autenticación
 # tokenUrl="token" indica que el endpoint para obtener el token está en /token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+def user_by_email(email: str):
+    """Consulta del usuario del token (en todas las peticiones autenticadas)."""
+    return select(users).where(users.c.email == email)
+
+
+# Se prepara en el arranque (ver services/startup.py)
+register_hot_statement(lambda: user_by_email(""))
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     """Middleware para obtener el usuario actual desde el token JWT."""
 
@@ -34,12 +45,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         
     # Buscar el usuario en la base de datos usando el email
     with get_db() as db:
-        query = select(users).where(users.c.email == email)
-        user = db.execute(query).mappings().first() # Usar .mappings() para obtener un diccionario
+        user = db.execute(user_by_email(email)).mappings().first() # Usar .mappings() para obtener un diccionario
 
         # Si el usuario no existe, lanzar excepción
         if user is None:
             raise credentials_exception
         
-        # Retornar los datos del usuario si todo es correcto
-        return dict(user)  # Convertir el objeto User en un diccionario 
\ No newline at end of file
+    # Las consultas del resto de la petición se reparten por fotógrafo
+    # (ver services/fair_scheduler.py)
+    tenant_var.set(tenant_for(user))
+
+    # Retornar los datos del usuario si todo es correcto
+    return dict(user)  # Convertir el objeto User en un diccionario 
+
+async def get_current_admin(current_user=Depends(get_current_user)):
+    """Middleware que exige que el usuario actual sea administrador."""
+
+    if current_user["role"] != UserRole.admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los administradores pueden acceder a este recurso",
+        )
+    return current_user
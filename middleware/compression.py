@@ -0,0 +1,260 @@
+# middleware/compression.py
+"""
+Compresión de las respuestas HTTP
+
+Comprime con el mejor algoritmo que acepte el cliente (Accept-Encoding):
+zstd, brotli o gzip. brotli y zstd son opcionales: solo se usan si están
+instalados (pip install brotli zstandard); gzip siempre está disponible.
+
+    - Solo se comprimen los tipos de contenido de la lista permitida (JSON,
+      texto...): las fotos y los ZIP ya están comprimidos.
+    - Las respuestas menores que minimum_size se envían sin comprimir. En
+      las StreamingResponse se acumulan los primeros trozos hasta llegar a
+      minimum_size (o al final) antes de decidir.
+    - Las StreamingResponse se comprimen por trozos, sin acumular el cuerpo.
+      El compresor solo vacía su salida (sync flush) cada STREAM_FLUSH_SIZE
+      bytes o si han pasado STREAM_FLUSH_INTERVAL segundos desde el último
+      vaciado: vaciar cada trozo pequeño reinicia el bloque comprimido y
+      empeora mucho la compresión.
+    - Los cuerpos grandes se comprimen en el threadpool para no bloquear el
+      bucle de eventos.
+
+Los niveles de compresión se configuran en app.py. Los niveles altos apenas
+reducen más el JSON de las galerías y cuestan mucha CPU, por eso se limitan
+a MAX_LEVELS.
+"""
+
+import time
+import zlib
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Opcional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Opcional
+    zstandard = None
+
+# Tipos de contenido que se comprimen
+DEFAULT_CONTENT_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+    "image/svg+xml",
+)
+
+# Nivel máximo permitido para cada algoritmo (límite de CPU)
+MAX_LEVELS = {"gzip": 6, "br": 5, "zstd": 6}
+
+# A partir de este tamaño la compresión se hace en el threadpool
+THREAD_MINIMUM_SIZE = 64 * 1024
+
+# En streaming, bytes sin comprimir y segundos entre vaciados del compresor
+STREAM_FLUSH_SIZE = 64 * 1024
+STREAM_FLUSH_INTERVAL = 0.5
+
+
+def available_encodings() -> list[str]:
+    """Algoritmos disponibles por orden de preferencia."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, encodings: list[str]) -> Optional[str]:
+    """Elige el algoritmo preferido entre los que acepta el cliente (q > 0)."""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in encodings:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+class Compressor:
+    """Compresor incremental con la misma interfaz para los tres algoritmos."""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self._finish = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+        elif encoding == "br":
+            compressor = brotli.Compressor(quality=level)
+            self._compress = compressor.process
+            self._flush = compressor.flush
+            self._finish = compressor.finish
+        else:
+            # wbits=31: formato gzip (cabecera y CRC), no zlib
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._compress = compressor.compress
+            self._flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+        # Bytes recibidos desde el último vaciado y cuándo fue
+        self.pending = 0
+        self.flushed_at = time.monotonic()
+
+    def needs_flush(self, size: int) -> bool:
+        """True si, con `size` bytes más, toca vaciar la salida (streaming)."""
+        return (
+            self.pending + size >= STREAM_FLUSH_SIZE
+            or time.monotonic() - self.flushed_at >= STREAM_FLUSH_INTERVAL
+        )
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Comprime un trozo; con flush=True lo deja listo para enviar."""
+        output = self._compress(data)
+        if not flush:
+            self.pending += len(data)
+            return output
+        self.pending = 0
+        self.flushed_at = time.monotonic()
+        return output + self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    """Middleware ASGI que comprime las respuestas (ver docstring del módulo)."""
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        levels: Optional[dict[str, int]] = None,
+        content_types: tuple[str, ...] = DEFAULT_CONTENT_TYPES,
+        encodings: Optional[list[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = content_types
+        self.encodings = [
+            encoding for encoding in (encodings or available_encodings())
+            if encoding in available_encodings()
+        ]
+        levels = {"gzip": 5, "br": 4, "zstd": 3, **(levels or {})}
+        self.levels = {name: min(level, MAX_LEVELS[name]) for name, level in levels.items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None  # None: aún sin decidir o sin comprimir
+        passthrough = False
+        # Primeros trozos de una respuesta en streaming, hasta minimum_size
+        buffered: list[bytes] = []
+        buffered_size = 0
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough, buffered_size
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or not content_type.startswith(self.content_types)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Se retiene hasta ver el primer trozo del cuerpo
+                    start_message = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                # Sin decidir hasta tener minimum_size bytes o el final
+                if buffered or (more_body and len(body) < self.minimum_size):
+                    buffered.append(body)
+                    buffered_size += len(body)
+                    if more_body and buffered_size < self.minimum_size:
+                        return
+                    body = b"".join(buffered)
+                    buffered.clear()
+
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers.add_vary_header("Accept-Encoding")
+
+                # Respuesta completa y pequeña: no compensa comprimir
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                compressor = Compressor(encoding, self.levels[encoding])
+                headers["Content-Encoding"] = encoding
+
+                if not more_body:
+                    # Respuesta completa: comprimir de una vez y fijar Content-Length
+                    body = await self._run(compressor, body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+                # Streaming: la longitud final no se conoce
+                del headers["Content-Length"]
+                await send(start_message)
+
+            body = await self._run(compressor, body, final=not more_body)
+            # Sin vaciar, el compresor suele no devolver nada todavía
+            if body or not more_body:
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    async def _run(compressor: Compressor, body: bytes, final: bool) -> bytes:
+        """Comprime un trozo; los grandes en el threadpool."""
+        if final:
+            work = lambda: compressor.compress(body) + compressor.finish()
+        else:
+            # Vaciar solo por tamaño o tiempo, no en cada trozo
+            flush = compressor.needs_flush(len(body))
+            work = lambda: compressor.compress(body, flush=flush)
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            return await run_in_threadpool(work)
+        return work()
@@ -0,0 +1,184 @@
+# middleware/metrics.py
+"""
+Métricas de las peticiones HTTP
+
+MetricsMiddleware mide cada petición y registra en memoria:
+    - http_requests_total{method, route, status}
+    - http_request_duration_seconds{method, route} (histograma)
+    - http_requests_in_flight
+    - db_queries_total{route} y db_query_duration_seconds_total{route}
+
+También añade a cada respuesta la cabecera Server-Timing con el tiempo
+total y el tiempo de base de datos hasta el envío de la cabecera, visible
+en las herramientas de desarrollo del navegador.
+
+Las métricas son por proceso: con varios workers de uvicorn, Prometheus
+debe consultar cada uno por separado.
+"""
+
+import bisect
+import time
+from collections import defaultdict
+
+from config.db import QueryStats, query_stats_var
+
+# Límites superiores (en segundos) de los buckets de los histogramas
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Histograma acumulado con buckets fijos, en el formato de Prometheus."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso.
+
+    Solo se actualiza desde el bucle de eventos (el middleware), así que no
+    necesita locks.
+    """
+
+    def __init__(self):
+        self.requests = defaultdict(int)  # (method, route, status) -> total
+        self.latency = defaultdict(Histogram)  # (method, route) -> Histogram
+        self.db_queries = defaultdict(int)  # route -> consultas
+        self.db_time = defaultdict(float)  # route -> segundos
+        self.in_flight = 0
+        # Métricas adicionales que otros módulos registran: función que devuelve líneas
+        self.collectors = []
+        # Funciones llamadas al terminar cada petición con (route, QueryStats)
+        self.request_hooks = []
+
+    def register_collector(self, collector):
+        self.collectors.append(collector)
+
+    def register_request_hook(self, hook):
+        self.request_hooks.append(hook)
+
+    def render(self) -> str:
+        """Devuelve las métricas en el formato de texto de Prometheus."""
+        lines = [
+            "# HELP http_requests_in_flight Peticiones en curso",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Peticiones atendidas",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), total in sorted(self.requests.items()):
+            lines.append(
+                f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {total}'
+            )
+
+        lines += [
+            "# HELP http_request_duration_seconds Duración de las peticiones",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.latency.items()):
+            lines += render_histogram(
+                "http_request_duration_seconds",
+                f'method="{method}",route="{route}"',
+                histogram,
+            )
+
+        lines += [
+            "# HELP db_queries_total Consultas SQL ejecutadas",
+            "# TYPE db_queries_total counter",
+        ]
+        for route, total in sorted(self.db_queries.items()):
+            lines.append(f'db_queries_total{{route="{route}"}} {total}')
+
+        lines += [
+            "# HELP db_query_duration_seconds_total Tiempo total en consultas SQL",
+            "# TYPE db_query_duration_seconds_total counter",
+        ]
+        for route, total in sorted(self.db_time.items()):
+            lines.append(f'db_query_duration_seconds_total{{route="{route}"}} {total:.6f}')
+
+        for collector in self.collectors:
+            lines += collector()
+
+        return "\n".join(lines) + "\n"
+
+
+def render_histogram(name: str, labels: str, histogram: Histogram) -> list[str]:
+    """Líneas de un histograma en el formato de Prometheus."""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+# Registro único del proceso
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mide cada petición HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats = QueryStats()
+        token = query_stats_var.set(stats)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                server_timing = (
+                    f'app;dur={elapsed_ms:.1f}, '
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", server_timing.encode("latin-1")),
+                ]
+            await send(message)
+
+        registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            registry.in_flight -= 1
+            query_stats_var.reset(token)
+
+            # Plantilla de la ruta (p. ej. /galleries/{id}) para no crear una serie por ID
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            registry.requests[(method, route_path, status_code)] += 1
+            registry.latency[(method, route_path)].observe(time.perf_counter() - start)
+            registry.db_queries[route_path] += stats.count
+            registry.db_time[route_path] += stats.duration
+
+            for hook in registry.request_hooks:
+                hook(route_path, stats)
@@ -0,0 +1,92 @@
+# middleware/profiler.py
+
+# Importaciones necesarias
+import random
+import time
+
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from config.db import get_db
+from config.logging import request_id_var
+from config.security import MEDIA_PREFIX, verify_token
+from models.user import users, UserRole
+from services import profiler
+
+
+def _is_admin(token: str) -> bool:
+    """Comprueba que el token JWT pertenece a un administrador."""
+    payload = verify_token(token)
+    if payload is None or payload.get("sub") is None:
+        return False
+    with get_db() as db:
+        role = db.execute(
+            select(users.c.role).where(users.c.email == payload["sub"])
+        ).scalar()
+    return role == UserRole.admin
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI que perfila peticiones bajo demanda (ver services/profiler.py).
+
+    Una petición se perfila si:
+        - envía la cabecera X-Profile: 1 con el token de un administrador, o
+        - sale elegida al azar según PROFILER_SAMPLE_RATE.
+
+    Las demás peticiones solo pagan la búsqueda de la cabecera. La respuesta
+    de una petición perfilada incluye X-Profile-Id con el nombre del perfil,
+    que se consulta en GET /admin/profiles/{name}.
+    """
+
+    def __init__(self, app, sample_rate: float = profiler.SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        # Las fotos con URL firmada solo leen un fichero: no se perfilan
+        if scope["type"] != "http" or scope["path"].startswith(MEDIA_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        trigger = None
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1":
+            token = headers.get(b"authorization", b"").decode("latin-1").removeprefix("Bearer ")
+            if token and await run_in_threadpool(_is_admin, token):
+                trigger = "header"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            trigger = "sample"
+
+        sampler = profiler.start_profile(request_id_var.get()) if trigger else None
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-profile-id", sampler.profile_name.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            route = scope.get("route")
+            sampler.stop(
+                created=time.time(),
+                request_id=request_id_var.get(),
+                method=scope["method"],
+                path=scope["path"],
+                route=getattr(route, "path", None),
+                status=status_code,
+                duration_ms=round((time.perf_counter() - start) * 1000, 3),
+                trigger=trigger,
+            )
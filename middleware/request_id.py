@@ -0,0 +1,46 @@
+# middleware/request_id.py
+
+# Importaciones necesarias
+import uuid
+from config.logging import request_id_var
+
+
+class RequestIdMiddleware:
+    """
+    Middleware ASGI que asigna un ID a cada petición.
+
+    Reutiliza la cabecera X-Request-ID si el cliente (o el proxy) la envía,
+    la guarda en request_id_var para que aparezca en todos los logs de la
+    petición y la devuelve en la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:100]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-request-id", request_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
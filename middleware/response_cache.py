@@ -0,0 +1,143 @@
+# middleware/response_cache.py
+
+# Importaciones necesarias
+import time
+
+from starlette.routing import Match
+
+from config.security import MEDIA_PREFIX, verify_token
+from services.response_cache import CacheEntry, DEFAULT_TTL, MAX_ENTRY_BYTES, response_cache
+
+# Cabeceras de la respuesta que no se guardan en la caché
+UNCACHED_HEADERS = {b"x-profile-id", b"set-cookie"}
+
+
+def _iter_routes(routes):
+    """Rutas finales en orden, entrando en los routers incluidos con include_router."""
+    for route in routes:
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            yield from _iter_routes(included.routes)
+        else:
+            yield route
+
+
+class ResponseCacheMiddleware:
+    """
+    Middleware ASGI que sirve las respuestas GET cacheadas (ver services/response_cache.py).
+
+    Solo actúa en los endpoints marcados con @cacheable y con un token JWT
+    válido. En un acierto la petición no llega a la aplicación: no se
+    consulta el usuario, no se ejecuta el endpoint y no se serializa nada.
+    La respuesta lleva la cabecera X-Cache: HIT o MISS.
+
+    Va por dentro de las métricas y el request ID, que se siguen aplicando
+    a los aciertos, y por fuera de la compresión, para guardar los bytes
+    ya comprimidos.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = None  # Rutas de la aplicación, en orden (se calculan al primer uso)
+
+    def _match(self, scope):
+        """Busca la ruta de la petición y su regla de caché."""
+        if self._routes is None:
+            self._routes = list(_iter_routes(scope["app"].router.routes))
+        for route in self._routes:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                rule = getattr(getattr(route, "endpoint", None), "__response_cache__", None)
+                return route, child_scope, rule
+        return None, None, None
+
+    async def __call__(self, scope, receive, send):
+        # Las fotos con URL firmada ya se cachean en el navegador
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"].startswith(MEDIA_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if not authorization.startswith("Bearer ") or b"x-profile" in headers:
+            await self.app(scope, receive, send)
+            return
+
+        route, child_scope, rule = self._match(scope)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Solo la firma y la caducidad del token: sin consultar la base de datos
+        payload = verify_token(authorization.removeprefix("Bearer "))
+        email = payload.get("sub") if payload else None
+        if email is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = (
+            scope["path"],
+            scope["query_string"],
+            headers.get(b"accept-encoding", b""),
+            email,
+        )
+        entry = response_cache.get(key)
+        if entry is not None:
+            # Para que las métricas usen la plantilla de la ruta
+            scope["route"] = route
+            await send({
+                "type": "http.response.start",
+                "status": entry.status,
+                "headers": [*entry.headers, (b"x-cache", b"HIT")],
+            })
+            await send({"type": "http.response.body", "body": entry.body})
+            return
+
+        tags = [*rule.tags_for(child_scope.get("path_params", {})), f"auth:{email}"]
+        versions = response_cache.versions(tags)
+        start_message = None
+        chunks = []
+        size = 0
+        cacheable = True
+
+        async def send_and_capture(message):
+            nonlocal start_message, size, cacheable
+            if message["type"] == "http.response.start":
+                response_headers = message.get("headers", [])
+                cacheable = message["status"] == 200 and not any(
+                    name == b"cache-control" and b"no-store" in value
+                    for name, value in response_headers
+                )
+                start_message = {
+                    **message,
+                    "headers": [
+                        (name, value) for name, value in response_headers
+                        if name not in UNCACHED_HEADERS
+                    ],
+                }
+                message["headers"] = [*response_headers, (b"x-cache", b"MISS")]
+            elif message["type"] == "http.response.body" and cacheable:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > MAX_ENTRY_BYTES:
+                    cacheable = False
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+
+        if cacheable and start_message is not None:
+            ttl = rule.ttl if rule.ttl is not None else DEFAULT_TTL
+            response_cache.put(
+                key,
+                CacheEntry(
+                    status=start_message["status"],
+                    headers=start_message["headers"],
+                    body=b"".join(chunks),
+                    tags=tags,
+                    expires_at=time.monotonic() + ttl,
+                ),
+                versions,
+            )
@@ -11,6 +11,12 @@ Modelos incluidos:
 - sessions: Sesiones fotográficas
 - galleries: Galerías de fotos
 - photos: Fotografías individuales
+- jobs: Cola de trabajos en segundo plano
+- cache_invalidations: Invalidaciones de caché entre procesos
+- gallery_manifests: Vista precalculada de cada galería
+
+El esquema no se crea al importar: lo hace models.migrations.ensure_schema()
+(en el arranque de la API, del worker y de los scripts).
 
 Ejemplo de uso:
     from models import users, sessions, galleries, photos
@@ -21,13 +27,9 @@ from .session import sessions
 from .gallery import galleries
 from .photo import photos
 from .gallery_photos import gallery_photos
-
-# Importación de dependencias para crear las tablas
-from config.db import engine, meta
-
-# Creación de todas las tablas en la base de datos
-# Este proceso verifica si las tablas existen y las crea si es necesario
-meta.create_all(engine)
+from .job import jobs
+from .cache_invalidation import cache_invalidations
+from .gallery_manifest import gallery_manifests
 
 # Exportar los modelos para facilitar su importación
-__all__ = ['users', 'sessions', 'galleries', 'photos', 'gallery_photos']
\ No newline at end of file
+__all__ = ['users', 'sessions', 'galleries', 'photos', 'gallery_photos', 'jobs', 'cache_invalidations', 'gallery_manifests']
\ No newline at end of file
@@ -0,0 +1,22 @@
+# models/cache_invalidation.py
+
+from sqlalchemy import Table, Column, Integer, String, Text, Float, Index
+from config.db import meta
+
+# Registro de invalidaciones de caché para los demás procesos (ver services/cache_sync.py)
+# Cada escritura que invalida etiquetas de la caché añade una fila; los
+# workers de uvicorn la leen para invalidar sus propias cachés en memoria.
+# Las filas se borran pasados unos minutos. Con AUTOINCREMENT los IDs nunca
+# se reutilizan, aunque se borren todas: los workers leen "id > último visto".
+cache_invalidations = Table(
+    "cache_invalidations",
+    meta,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("tags", Text, nullable=False),  # Etiquetas en JSON, p. ej. ["gallery:5", "galleries"]
+    Column("origin", String(100), nullable=False),  # Proceso que la publicó
+    Column("created_at", Float, nullable=False),  # Segundos epoch
+
+    # Índice para borrar las filas antiguas
+    Index("ix_cache_invalidations_created_at", "created_at"),
+    sqlite_autoincrement=True,
+)
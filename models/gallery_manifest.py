@@ -0,0 +1,18 @@
+# models/gallery_manifest.py
+
+from sqlalchemy import Table, Column, Integer, Float, LargeBinary, ForeignKey
+from config.db import meta
+
+# Vista precalculada de cada galería (ver services/manifests.py)
+# 'body' es el JSON ya serializado de GET /galleries/{id}. Cada escritura que
+# cambia la galería incrementa 'version'; el manifiesto está al día cuando
+# 'built_version' (la versión con la que se generó) coincide con ella.
+gallery_manifests = Table(
+    "gallery_manifests",
+    meta,
+    Column("gallery_id", Integer, ForeignKey("galleries.id"), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),  # Cambios en la galería
+    Column("built_version", Integer, nullable=True),  # Versión del manifiesto guardado
+    Column("body", LargeBinary, nullable=True),  # JSON de la respuesta
+    Column("built_at", Float, nullable=True),  # Segundos epoch
+)
@@ -1,6 +1,6 @@
 # models/gallery_photos.py
 
-from sqlalchemy import Table, Column, Integer, ForeignKey, Boolean, DateTime, UniqueConstraint
+from sqlalchemy import Table, Column, Integer, ForeignKey, Boolean, DateTime, String, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from config.db import meta
 
@@ -13,8 +13,17 @@ gallery_photos = Table(
     Column("photo_id", Integer, ForeignKey("photos.id"), nullable=False),
     Column("selected", Boolean, default=False, nullable=False),
     Column("favorite", Boolean, default=False, nullable=False),
+    # Posición de la foto en la galería: clave fraccionaria (ver services/ranking.py)
+    Column("rank", String, nullable=True),
     #Column("added_at", DateTime(timezone=True), server_default=func.now()),
     
     # Añadir restricción única para gallery_id + photo_id
-    UniqueConstraint('gallery_id', 'photo_id', name='uix_gallery_photo')
-)
\ No newline at end of file
+    UniqueConstraint('gallery_id', 'photo_id', name='uix_gallery_photo'),
+
+    # Índice para buscar en qué galerías está una foto (incluye 'selected'
+    # para que los totales por sesión se resuelvan solo con el índice)
+    Index("ix_gallery_photos_photo", "photo_id", "gallery_id", "selected"),
+
+    # Fotos de una galería en orden, sin ordenar en memoria
+    Index("ix_gallery_photos_gallery_rank", "gallery_id", "rank"),
+)
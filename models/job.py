@@ -0,0 +1,30 @@
+# models/job.py
+
+from sqlalchemy import Table, Column, Integer, String, Text, Float, Index
+from config.db import meta
+
+# Tabla de la cola de trabajos en segundo plano
+# Los tiempos se guardan como segundos epoch (Float) para poder compararlos
+# directamente en SQL al reservar trabajos
+jobs = Table(
+    "jobs",
+    meta,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("queue", String(50), nullable=False, default="default"),  # Nombre de la cola
+    Column("task", String(100), nullable=False),  # Nombre de la tarea registrada
+    Column("payload", Text, nullable=False, default="{}"),  # Argumentos en JSON
+    Column("status", String(20), nullable=False, default="pending"),  # 'pending', 'leased', 'done' o 'dead'
+    Column("attempts", Integer, nullable=False, default=0),  # Intentos realizados
+    Column("max_attempts", Integer, nullable=False, default=5),  # Intentos antes de ir a dead-letter
+    Column("run_at", Float, nullable=False),  # No se ejecuta antes de este instante
+    Column("leased_until", Float, nullable=True),  # Fin del tiempo de visibilidad
+    Column("leased_by", String(100), nullable=True),  # Token del worker que lo reservó
+    Column("last_error", Text, nullable=True),  # Último error (para depurar la dead-letter)
+    Column("created_at", Float, nullable=False),
+    Column("finished_at", Float, nullable=True),
+
+    # Índice para reservar el siguiente trabajo listo de una cola
+    Index("ix_jobs_queue_status_run_at", "queue", "status", "run_at"),
+    # Índice para calcular el throughput reciente
+    Index("ix_jobs_finished_at", "finished_at"),
+)
@@ -0,0 +1,187 @@
+# models/migrations.py
+"""
+Migraciones del esquema de la base de datos
+
+meta.create_all() solo crea las tablas que no existen: no añade índices
+a tablas existentes ni transforma datos. Aquí se agrupan esos pasos,
+escritos para que se puedan ejecutar en cada arranque sin efecto si ya
+se aplicaron.
+
+ensure_schema() los aplica solo si hace falta: guarda una huella del
+esquema (las sentencias CREATE de todas las tablas e índices y
+MIGRATIONS_REVISION) en PRAGMA user_version y, si coincide con la de los
+modelos, no ejecuta nada más. La llaman el arranque de la API (app.py), el
+worker y los scripts; importar los modelos ya no toca la base de datos.
+
+Varios workers de uvicorn arrancan a la vez: ensure_schema() toma el
+bloqueo de escritura (BEGIN IMMEDIATE) y vuelve a leer la huella antes de
+aplicar nada, así que solo uno ejecuta el DDL y los demás esperan y lo
+encuentran hecho. Todas las migraciones reciben esa conexión.
+"""
+
+import hashlib
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from config.db import engine as default_engine, meta as default_meta
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(conn, meta):
+    """
+    Añade las columnas declaradas en los modelos que aún no existen.
+
+    Solo columnas que admiten NULL: SQLite no permite añadir con ALTER TABLE
+    una columna NOT NULL sin valor por defecto.
+    """
+    for table in meta.sorted_tables:
+        existing = {row[1] for row in conn.execute(text(f'PRAGMA table_info("{table.name}")'))}
+        if not existing:
+            continue
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            logger.info("Añadiendo la columna %s.%s", table.name, column.name)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+def create_missing_indexes(conn, meta):
+    """Crea los índices declarados en los modelos que aún no existen."""
+    for table in meta.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def normalize_session_dates(conn):
+    """
+    Convierte sessions.date al formato de DateTime de SQLAlchemy.
+
+    La columna era String y guardaba fechas como '2025-02-15'. El formato
+    canónico ('2025-02-15 00:00:00.000000') permite comparar por rango con
+    el índice (photographer_id, date) y que SQLAlchemy lea datetime.
+    Las fechas que no se pueden interpretar se dejan a NULL.
+    """
+    canonical = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]"
+
+    rows = conn.execute(
+        text("SELECT id, date FROM sessions WHERE date IS NOT NULL AND date NOT GLOB :canonical"),
+        {"canonical": canonical},
+    ).fetchall()
+
+    for session_id, value in rows:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip())
+            normalized = parsed.replace(tzinfo=None).strftime("%Y-%m-%d %H:%M:%S.%f")
+        except ValueError:
+            logger.warning("Fecha no válida en la sesión %s: %r, se deja vacía", session_id, value)
+            normalized = None
+
+        conn.execute(
+            text("UPDATE sessions SET date = :date WHERE id = :id"),
+            {"date": normalized, "id": session_id},
+        )
+
+
+def backfill_gallery_ranks(conn):
+    """
+    Asigna posición a las fotos de galería que no la tienen, en el orden en
+    que se añadieron (ID). La clave es el ID en hexadecimal de ancho fijo
+    con el sufijo 'V' (ver services/ranking.initial_rank), en una sola
+    sentencia y sin tener que agrupar por galería.
+    """
+    result = conn.execute(
+        text("UPDATE gallery_photos SET rank = printf('%08XV', id) WHERE rank IS NULL")
+    )
+    if result.rowcount:
+        logger.info("Asignada posición a %s fotos de galería", result.rowcount)
+
+
+def autoincrement_cache_invalidations(conn, meta):
+    """
+    Reconstruye cache_invalidations con AUTOINCREMENT.
+
+    Sin él SQLite reutiliza los IDs cuando se borran todas las filas y los
+    workers, que leen "id > último visto", ignorarían las invalidaciones
+    nuevas. SQLite no permite cambiarlo con ALTER TABLE: se crea la tabla
+    de nuevo y se copian las filas.
+    """
+    table = meta.tables["cache_invalidations"]
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": table.name},
+    ).scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return
+
+    logger.info("Reconstruyendo %s con AUTOINCREMENT", table.name)
+    conn.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{table.name}_old"'))
+    conn.execute(CreateTable(table))
+    conn.execute(text(f'INSERT INTO "{table.name}" SELECT id, tags, origin, created_at FROM "{table.name}_old"'))
+    conn.execute(text(f'DROP TABLE "{table.name}_old"'))
+    for index in table.indexes:
+        conn.execute(CreateIndex(index))
+
+
+def run_migrations(conn, meta):
+    """Aplica todas las migraciones en orden (en la transacción de conn)."""
+    normalize_session_dates(conn)
+    add_missing_columns(conn, meta)
+    backfill_gallery_ranks(conn)
+    autoincrement_cache_invalidations(conn, meta)
+    create_missing_indexes(conn, meta)
+
+
+# Se incrementa al añadir o cambiar una migración de datos, para que se
+# aplique aunque las tablas no cambien
+MIGRATIONS_REVISION = 1
+
+
+def schema_fingerprint(engine, meta) -> int:
+    """Huella del esquema declarado en los modelos (entero positivo de 31 bits)."""
+    digest = hashlib.sha256(f"revision {MIGRATIONS_REVISION}\n".encode())
+    for table in meta.sorted_tables:
+        digest.update(str(CreateTable(table).compile(dialect=engine.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            digest.update(str(CreateIndex(index).compile(dialect=engine.dialect)).encode())
+    # user_version es un entero de 32 bits con signo; 0 significa "sin huella"
+    return int.from_bytes(digest.digest()[:4], "big") & 0x7FFFFFFF or 1
+
+
+def ensure_schema(engine=default_engine, meta=default_meta, force: bool = False) -> bool:
+    """
+    Crea las tablas y aplica las migraciones si la huella guardada no
+    coincide con la de los modelos (o si force). Devuelve True si se aplicaron.
+    """
+    fingerprint = schema_fingerprint(engine, meta)
+    with engine.connect() as conn:
+        stored = conn.exec_driver_sql("PRAGMA user_version").scalar()
+    if stored == fingerprint and not force:
+        return False
+
+    with engine.connect() as conn:
+        # Bloqueo de escritura antes de volver a leer la huella: si otro
+        # proceso está migrando se espera (busy_timeout) y después se ve su
+        # huella. El DDL, las migraciones y la nueva huella van en esta
+        # misma transacción
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        stored = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        if stored == fingerprint and not force:
+            conn.rollback()
+            return False
+
+        logger.info("Actualizando el esquema de la base de datos (huella %s -> %s)", stored, fingerprint)
+        meta.create_all(conn)
+        run_migrations(conn, meta)
+        conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
+        conn.commit()
+    return True
+
+
+def clear_schema_fingerprint(engine=default_engine):
+    """Olvida la huella guardada (p. ej. tras borrar las tablas)."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA user_version = 0")
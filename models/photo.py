@@ -1,6 +1,6 @@
 # models/photo.py
 
-from sqlalchemy import Table, Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Table, Column, Integer, BigInteger, Float, String, Boolean, ForeignKey, Index
 from config.db import meta
 
 photos = Table(
@@ -10,4 +10,13 @@ photos = Table(
     Column("description", String(255)), 
     Column("path", String(255)),
     Column("session_id", Integer, ForeignKey("sessions.id")),  
+    # Hash perceptual de 64 bits (con signo, como lo guarda SQLite); NULL si
+    # aún no se ha calculado (ver services/phash.py)
+    Column("phash", BigInteger, nullable=True),
+    # Segundos epoch del intento fallido de calcular el hash (fichero que
+    # falta o no es una imagen); no se vuelve a encolar
+    Column("phash_failed_at", Float, nullable=True),
+
+    # Índice para obtener las fotos de una sesión
+    Index("ix_photos_session_id", "session_id"),
 )
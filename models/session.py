@@ -1,6 +1,6 @@
 # models/session.py
 
-from sqlalchemy import Table, Column, Integer, String, ForeignKey
+from sqlalchemy import Table, Column, Integer, String, DateTime, ForeignKey, Index
 from config.db import meta
 
 sessions = Table(
@@ -8,6 +8,9 @@ sessions = Table(
     meta,
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("name", String(255)),
-    Column("date", String(255)),
+    Column("date", DateTime),  # Fecha de la sesión (antes String, ver models/migrations.py)
     Column("photographer_id", Integer, ForeignKey("users.id")),
+
+    # Índice para consultar las sesiones de un fotógrafo por rango de fechas
+    Index("ix_sessions_photographer_date", "photographer_id", "date"),
 )
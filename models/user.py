@@ -2,7 +2,7 @@
 
 # Importa Table y Column de SQLAlchemy para definir la estructura de tablas y columnas en la base de datos.
 # Además, importa tipos de datos como Integer, String y Enum para especificar los tipos de las columnas.
-from sqlalchemy import Table, Column, Integer, String, Enum, ForeignKey
+from sqlalchemy import Table, Column, Integer, String, Enum, ForeignKey, Index
 
 # Importa 'meta' para la metadata de la base de datos
 from config.db import meta
@@ -28,4 +28,7 @@ users = Table(
     # Column("role", String(50)),  # 'admin', 'photographer' o 'client'
     Column("role", Enum(UserRole), nullable=False, default=UserRole.photographer),  # Usar Enum para role
     Column("photographer_id", Integer, ForeignKey("users.id"), nullable=True),      # ID del fotógrafo asociado
+
+    # Índice para listar los clientes de un fotógrafo paginando por ID
+    Index("ix_users_photographer_id_id", "photographer_id", "id"),
 )
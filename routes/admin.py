@@ -0,0 +1,218 @@
+# routes/admin.py
+
+from typing import Literal
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.exc import SQLAlchemyError
+from middleware.auth import get_current_admin
+
+from schemas.backup import BackupStatus
+from schemas.profile import ProfileInfo
+from schemas.query import QueryStatementStats
+from schemas.queue import QueueStats
+from services import backup
+from services import profiler
+from services import query_inspector
+from services import queue as job_queue
+
+# Crear router con tag para la documentación
+admin = APIRouter(tags=["admin"])
+
+
+# -------------------------------------------------------------------
+# Endpoint para consultar el estado de la cola de trabajos
+# GET /admin/queue
+#
+# Parámetros:
+#   - window (int): Ventana en segundos para calcular el throughput
+#
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.get(
+    "/admin/queue",
+    response_model=list[QueueStats],
+    summary="Estado de la cola de trabajos",
+    description="Retorna la profundidad y el throughput de cada cola de trabajos.",
+    responses={
+        403: {"description": "Solo administradores"},
+        500: {"description": "Error interno del servidor"},
+    },
+)
+def get_queue_stats(
+    window: int = Query(60, ge=1, le=86400),
+    current_user=Depends(get_current_admin),
+):
+    try:
+        return job_queue.stats(window)
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener el estado de la cola: {str(e)}",
+        )
+
+
+# -------------------------------------------------------------------
+# Endpoint para consultar las sentencias SQL más costosas
+# GET /admin/queries
+#
+# Parámetros:
+#   - order_by: total_time | count | max_time | slow_count | repeated
+#   - limit (int): Número máximo de sentencias
+#
+# Incluye las repeticiones por petición (posibles N+1) y, para las
+# consultas lentas, el último EXPLAIN QUERY PLAN.
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.get(
+    "/admin/queries",
+    response_model=list[QueryStatementStats],
+    summary="Sentencias SQL más costosas",
+    description="Retorna las sentencias SQL acumuladas por el inspector de consultas, ordenadas por coste.",
+    responses={403: {"description": "Solo administradores"}},
+)
+def get_query_stats(
+    order_by: Literal["total_time", "count", "max_time", "slow_count", "repeated"] = "total_time",
+    limit: int = Query(20, ge=1, le=500),
+    current_user=Depends(get_current_admin),
+):
+    return query_inspector.top_statements(order_by, limit)
+
+
+# -------------------------------------------------------------------
+# Endpoint para reiniciar las estadísticas de consultas
+# DELETE /admin/queries
+#
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.delete(
+    "/admin/queries",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Reiniciar estadísticas de consultas",
+    description="Borra las estadísticas acumuladas por el inspector de consultas.",
+    responses={403: {"description": "Solo administradores"}},
+)
+def reset_query_stats(current_user=Depends(get_current_admin)):
+    query_inspector.reset()
+
+
+# -------------------------------------------------------------------
+# Endpoint para listar los perfiles de peticiones guardados
+# GET /admin/profiles
+#
+# Los perfiles se generan con el middleware de profiling (PROFILER_ENABLED=1)
+# enviando la cabecera X-Profile: 1 con un token de administrador
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.get(
+    "/admin/profiles",
+    response_model=list[ProfileInfo],
+    summary="Perfiles de peticiones",
+    description="Retorna los perfiles guardados, del más reciente al más antiguo.",
+    responses={403: {"description": "Solo administradores"}},
+)
+def get_profiles(current_user=Depends(get_current_admin)):
+    return profiler.list_profiles()
+
+
+# -------------------------------------------------------------------
+# Endpoint para descargar un perfil
+# GET /admin/profiles/{name}
+#
+# Formato "collapsed stacks" (una pila y su número de muestras por línea),
+# compatible con flamegraph.pl, speedscope e inferno
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.get(
+    "/admin/profiles/{name}",
+    response_class=FileResponse,
+    summary="Descargar perfil",
+    description="Retorna el perfil en formato collapsed stacks para generar un flame graph.",
+    responses={
+        403: {"description": "Solo administradores"},
+        404: {"description": "Perfil no encontrado"},
+    },
+)
+def get_profile(name: str, current_user=Depends(get_current_admin)):
+    path = profiler.profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Perfil {name} no encontrado",
+        )
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=f"{name}.collapsed")
+
+
+# -------------------------------------------------------------------
+# Endpoint para lanzar una copia de seguridad de la base de datos
+# POST /admin/backups
+#
+# Parámetros:
+#   - compress (bool): Exportar la copia comprimida con gzip (.db.gz)
+#
+# La copia se hace en segundo plano con la API de backup de SQLite, por
+# pasos y sin bloquear a los escritores (ver services/backup.py). El
+# progreso se consulta en GET /admin/backups/{id}
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.post(
+    "/admin/backups",
+    response_model=BackupStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Lanzar copia de seguridad",
+    description="Inicia una copia de seguridad en caliente de la base de datos.",
+    responses={
+        403: {"description": "Solo administradores"},
+        409: {"description": "Ya hay una copia en curso"},
+    },
+)
+def create_backup(
+    compress: bool = Query(False),
+    current_user=Depends(get_current_admin),
+):
+    try:
+        return backup.start(compress=compress).to_dict()
+    except backup.BackupInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+# -------------------------------------------------------------------
+# Endpoint para listar las copias de seguridad
+# GET /admin/backups
+#
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.get(
+    "/admin/backups",
+    response_model=list[BackupStatus],
+    summary="Copias de seguridad",
+    description="Retorna las copias de seguridad, de la más reciente a la más antigua, con su progreso.",
+    responses={403: {"description": "Solo administradores"}},
+)
+def get_backups(current_user=Depends(get_current_admin)):
+    return backup.list_backups()
+
+
+# -------------------------------------------------------------------
+# Endpoint para consultar el progreso de una copia de seguridad
+# GET /admin/backups/{id}
+#
+# Solo disponible para administradores
+# -------------------------------------------------------------------
+@admin.get(
+    "/admin/backups/{id}",
+    response_model=BackupStatus,
+    summary="Progreso de una copia de seguridad",
+    description="Retorna el estado y el progreso de una copia de seguridad.",
+    responses={
+        403: {"description": "Solo administradores"},
+        404: {"description": "Copia no encontrada"},
+    },
+)
+def get_backup(id: str, current_user=Depends(get_current_admin)):
+    info = backup.get_backup(id)
+    if info is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Copia de seguridad {id} no encontrada",
+        )
+    return info
@@ -1,22 +1,44 @@
 # routes/gallery.py
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from config.db import get_db
+from config.security import media_url
+from config.storage import resolve_media_path
 from sqlalchemy.exc import SQLAlchemyError
 from middleware.auth import get_current_user
 
 from models.user import UserRole  # Importar el enum de roles
 from models.gallery import galleries
+from models.gallery_manifest import gallery_manifests
 from models.gallery_photos import gallery_photos
 from models.photo import photos
 
-from schemas.gallery import Gallery, GalleryCreate, GalleryWithPhotos, PhotoInGallery
+from schemas.gallery import Gallery, GalleryCreate, GalleryWithPhotos, PhotoInGallery, PhotoMove, PhotoPosition
+from schemas.photo import DuplicateReport
+from services import manifests, phash, ranking
+from services.response_cache import cacheable, invalidating
+from services.scoping import gallery_scope, raise_not_visible
+from services.singleflight import group
+from services.startup import register_hot_statement
+from services.zipstream import stream_zip
 
-from sqlalchemy import select, join, and_
+import asyncio
+import logging
+import os
+
+from sqlalchemy import select, join, and_, bindparam
 
 # Crear router con tag para la documentación
 gallery = APIRouter(tags=["galleries"])
 
+logger = logging.getLogger(__name__)
+
+# Generaciones del manifiesto de GET /galleries/{id} en curso, compartidas
+# entre peticiones simultáneas
+gallery_reads = group("gallery")
+
 
 # -------------------------------------------------------------------
 # Endpoint para crear una nueva galería
@@ -36,17 +58,15 @@ gallery = APIRouter(tags=["galleries"])
     # description="Crea una nueva galería asignando al usuario actual como fotógrafo."
     description="Crea una nueva galería. Solo disponible para fotógrafos.",
 )
-async def create_gallery(
+def create_gallery(
     gallery: GalleryCreate, current_user=Depends(get_current_user)
 ):
     try:
-        # Imprimir información del usuario actual para debugging
-        print(f"Usuario actual: {current_user['email']}")
-        print(f"Rol del usuario: {current_user['role']}")
+        logger.debug("Usuario %s (rol %s) creando galería", current_user["id"], current_user["role"])
 
         # Verificar que el usuario tiene rol de fotógrafo
         if current_user["role"] != UserRole.photographer:
-            print(f"Acceso denegado - Rol del usuario: {current_user['role']}")
+            logger.info("Acceso denegado al crear galería - usuario %s con rol %s", current_user["id"], current_user["role"])
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Solo los fotógrafos pueden crear galerías",
@@ -60,8 +80,11 @@ async def create_gallery(
         if new_gallery.get("client_id") == 0:
             new_gallery["client_id"] = None
 
-        with get_db() as db:
+        with invalidating() as stale, get_db() as db:
             result = db.execute(galleries.insert().values(new_gallery))
+            stale.add("galleries")
+            # Por si quedó el manifiesto de una galería borrada con el mismo ID
+            manifests.mark_stale(db, [result.lastrowid])
 
             created_gallery = db.execute(
                 galleries.select().where(galleries.c.id == result.lastrowid)
@@ -91,42 +114,15 @@ async def create_gallery(
         500: {"description": "Error interno del servidor"},
     },
 )
-async def get_my_galleries(current_user=Depends(get_current_user)):
+@cacheable(["galleries"])
+def get_my_galleries(current_user=Depends(get_current_user)):
     try:
         with get_db() as db:
-            # Si es admin, mostrar todas las galerías
-            if current_user["role"] == UserRole.admin:
-                print(f"👑 Admin consultando todas las galerías")
-                galleries_list = db.execute(galleries.select()).fetchall()
-                return galleries_list
-
-            # Si es fotógrafo, mostrar solo sus galerías
-            elif current_user["role"] == UserRole.photographer:
-                print(f"📸 Fotógrafo {current_user['id']} consultando sus galerías")
-                galleries_list = db.execute(
-                    galleries.select().where(
-                        galleries.c.photographer_id == current_user["id"]
-                    )
-                ).fetchall()
-                return galleries_list
-
-            # Si es cliente, mostrar solo las galerías donde es el cliente
-            elif current_user["role"] == UserRole.client:
-                print(f"👤 Cliente {current_user['id']} consultando sus galerías")
-                galleries_list = db.execute(
-                    galleries.select().where(
-                        galleries.c.client_id == current_user["id"]
-                    )
-                ).fetchall()
-                return galleries_list
-
-            """galleries_list = db.execute(
-                galleries.select().where(
-                    (galleries.c.photographer_id == current_user["id"])
-                    | (galleries.c.client_id == current_user["id"])
-                )
+            # Admin: todas. Fotógrafo: las suyas. Cliente: las asignadas
+            logger.debug("Usuario %s (rol %s) consultando sus galerías", current_user["id"], current_user["role"])
+            return db.execute(
+                galleries.select().where(gallery_scope(current_user))
             ).fetchall()
-            return galleries_list"""
 
     except SQLAlchemyError as e:
         raise HTTPException(
@@ -139,6 +135,11 @@ async def get_my_galleries(current_user=Depends(get_current_user)):
 # Endpoint para obtener una galería específica por ID
 # GET /galleries/{id}
 # Verifica que el usuario tenga acceso a la galería
+#
+# La respuesta es el manifiesto precalculado de la galería (ver
+# services/manifests.py): el permiso y el JSON se leen en una sola consulta
+# y se devuelven tal cual, con la versión en la cabecera X-Gallery-Version.
+# Cada foto lleva una URL firmada para descargarla de GET /media/...
 # -------------------------------------------------------------------
 @gallery.get(
     "/galleries/{id}",
@@ -152,141 +153,83 @@ async def get_my_galleries(current_user=Depends(get_current_user)):
     summary="Obtener galería por ID con sus fotos",
     description="Obtiene una galería específica con sus fotos asociadas. El usuario debe ser el fotógrafo o cliente.",
 )
+@cacheable(lambda params: [f"gallery:{params['id']}"])
 async def get_gallery(id: int, current_user=Depends(get_current_user)):
     try:
-        with get_db() as db:
-            # Consulta para obtener la galería
-            gallery = db.execute(galleries.select().where(galleries.c.id == id)).first()
-
-            if not gallery:
+        # Manifiesto de la galería, ya filtrada por las reglas de acceso del usuario
+        manifest = await run_in_threadpool(_visible_manifest, id, current_user)
+
+        if manifests.is_fresh(manifest):
+            version, body = manifest.version, manifest.body
+        else:
+            # Sin manifiesto, desactualizado o con URLs a punto de caducar: se genera ahora, una sola vez
+            # para todas las peticiones simultáneas de la misma galería y versión. Con la versión
+            # en la clave, quien ya vio la versión V no se une a una generación empezada antes de
+            # V (que devolvería los datos sin su propia escritura)
+            built = await gallery_reads.do(f"gallery:{id}:{manifest.version or 0}", manifests.build, id)
+            if built is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Galería con id {id} no encontrada",
                 )
+            version, body = built
 
-            # Control de acceso basado en roles
-            if current_user["role"] == UserRole.admin:
-                print(f"👑 Admin consultando galería {id}")
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={manifests.VERSION_HEADER: str(version)},
+        )
 
-            elif current_user["role"] == UserRole.photographer:
-                # Verificar que el fotógrafo tenga acceso a la galería
-                if gallery.photographer_id != current_user["id"]:
-                    print(
-                        f"❌ Fotógrafo {current_user['id']} intentó acceder a galería {id} que no le pertenece"
-                    )
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="No tienes permiso para ver esta galería",
-                    )
-                print(f"📸 Fotógrafo {current_user['id']} consultando su galería {id}")
+    except asyncio.TimeoutError:
+        logger.warning("Tiempo de espera agotado al obtener la galería %s", id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="La galería está tardando demasiado en cargarse, inténtalo de nuevo",
+        )
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener la galería: {str(e)}",
+        )
 
-            elif current_user["role"] == UserRole.client:
-                # Verificar que el cliente tenga acceso a la galería
-                if gallery.client_id != current_user["id"]:
-                    print(
-                        f"❌ Cliente {current_user['id']} intentó acceder a galería {id} no asignada"
-                    )
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="No tienes permiso para ver esta galería",
-                    )
-                print(f"👤 Cliente {current_user['id']} consultando su galería {id}")
 
-            # Consulta SQLAlchemy para obtener las fotos de la galería
-            query = (
-                select(
-                    gallery_photos.c.id,  # ID de la relación gallery_photos
-                    gallery_photos.c.gallery_id,  # ID de la galería
-                    gallery_photos.c.photo_id,  # ID de la foto
-                    photos.c.description,  # Descripción de la foto
-                    photos.c.path,  # Ruta de la foto
-                    gallery_photos.c.selected,  # Estado de selección
-                    gallery_photos.c.favorite,  # Estado de favorito
-                )
-                .select_from(
-                    join(
-                        photos, gallery_photos, photos.c.id == gallery_photos.c.photo_id
-                    )
-                )
-                .where(gallery_photos.c.gallery_id == id)
+def _manifest_query(id: int, current_user):
+    """Manifiesto de la galería con la condición de acceso del usuario."""
+    return (
+        select(
+            galleries.c.id,
+            gallery_manifests.c.version,
+            gallery_manifests.c.built_version,
+            gallery_manifests.c.body,
+            gallery_manifests.c.built_at,
+        )
+        .select_from(
+            galleries.outerjoin(
+                gallery_manifests, gallery_manifests.c.gallery_id == galleries.c.id
             )
+        )
+        .where(galleries.c.id == id, gallery_scope(current_user))
+    )
 
-            '''print("\n=== SQL Query ===")
-            print(str(query))'''
-
-            gallery_photos_result = db.execute(query).fetchall()
-
-            """print("\n=== Resultados de la consulta ===")
-            for row in gallery_photos_result:
-                print(row)"""
-
-            # Crear el diccionario de respuesta
-            response = {
-                "id": gallery.id,
-                "name": gallery.name,
-                "description": gallery.description,
-                "photographer_id": gallery.photographer_id,
-                "client_id": gallery.client_id,
-                "photos": [
-                    {
-                        "gallery_photo_id": photo.id,
-                        "photo_id": photo.photo_id,
-                        "description": photo.description,
-                        "path": photo.path,
-                        "selected": photo.selected,
-                        "favorite": photo.favorite
-                    }
-                    for photo in gallery_photos_result
-                ]
-            }
-
-            return response
-
-            """
-            EQUIVALENTE EN SQL : 
-            SELECT 
-                gallery_photos.id,         -- ID de la relación gallery_photos
-                photos.id as photo_id,     -- ID de la foto
-                photos.description,        -- Descripción de la foto
-                photos.path,              -- Ruta de la foto
-                photos.session_id,        -- ID de la sesión
-                gallery_photos.selected,   -- Estado de selección
-                gallery_photos.favorite    -- Estado de favorito
-            FROM 
-                photos
-            INNER JOIN 
-                gallery_photos
-            ON 
-                photos.id = gallery_photos.photo_id
-            WHERE 
-                gallery_photos.gallery_id = [id];
-            """
-
-            """gallery = db.execute(galleries.select().where(galleries.c.id == id)).first()
-
-            if not gallery:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Galería con id {id} no encontrada",
-                )
 
-            # Verificar que el usuario tiene acceso a la galería
-            if (
-                gallery.client_id != current_user["id"]
-                and gallery.photographer_id != current_user["id"]
-            ):
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tiene permiso para ver esta galería",
-                )
+# Se prepara en el arranque una variante por rol (ver services/startup.py)
+for _role in UserRole:
+    register_hot_statement(lambda role=_role: _manifest_query(0, {"id": 0, "role": role}))
 
-            return gallery"""
 
-    except SQLAlchemyError as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener la galería: {str(e)}",
-        )
+def _visible_manifest(id: int, current_user):
+    """Manifiesto si el usuario puede ver la galería; si no, 404 o 403 (se ejecuta en el threadpool)."""
+    with get_db() as db:
+        manifest = db.execute(_manifest_query(id, current_user)).first()
+        if not manifest:
+            logger.info("Galería %s no encontrada o sin acceso para el usuario %s", id, current_user["id"])
+            raise_not_visible(
+                db, galleries, id,
+                not_found=f"Galería con id {id} no encontrada",
+                forbidden="No tienes permiso para ver esta galería",
+            )
+        logger.debug("Usuario %s (rol %s) consultando galería %s", current_user["id"], current_user["role"], id)
+        return manifest
 
 
 # -------------------------------------------------------------------
@@ -301,25 +244,25 @@ async def get_gallery(id: int, current_user=Depends(get_current_user)):
     summary="Eliminar galería",
     description="Elimina una galería. Solo el fotógrafo puede eliminar sus galerías.",
 )
-async def delete_gallery(id: int, current_user=Depends(get_current_user)):
+def delete_gallery(id: int, current_user=Depends(get_current_user)):
     try:
-        with get_db() as db:
-            gallery = db.execute(galleries.select().where(galleries.c.id == id)).first()
-
-            if not gallery:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Galería con id {id} no encontrada",
+        with invalidating() as stale, get_db() as db:
+            # Solo el fotógrafo de la galería: la condición va en el propio DELETE
+            result = db.execute(
+                galleries.delete().where(
+                    galleries.c.id == id, gallery_scope(current_user, "delete")
                 )
+            )
 
-            # Verificar que el usuario es el fotógrafo de la galería
-            if gallery.photographer_id != current_user["id"]:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Solo el fotógrafo puede eliminar la galería",
+            if result.rowcount == 0:
+                raise_not_visible(
+                    db, galleries, id,
+                    not_found=f"Galería con id {id} no encontrada",
+                    forbidden="Solo el fotógrafo puede eliminar la galería",
                 )
 
-            db.execute(galleries.delete().where(galleries.c.id == id))
+            manifests.forget(db, id)
+            stale.update({"galleries", f"gallery:{id}", "gallery_photos"})
             return None
 
     except SQLAlchemyError as e:
@@ -359,75 +302,57 @@ async def delete_gallery(id: int, current_user=Depends(get_current_user)):
     summary="Marcar/desmarcar foto como seleccionada",
     description="Permite a un cliente marcar o desmarcar una foto como seleccionada para el álbum"
 )
-async def toggle_photo_selection(
+def toggle_photo_selection(
     gallery_id: int,
     photo_id: int,
     current_user=Depends(get_current_user)
 ):
     try:
-        print(f"\n=== Iniciando toggle_photo_selection ===")
-        print(f"Gallery ID: {gallery_id}")
-        print(f"Photo ID: {photo_id}")
-        print(f"Usuario: {current_user['name']} (ID: {current_user['id']})")
-    
-        with get_db() as db:
-            # Verificar que la galería existe y pertenece al cliente
-            print("\n🔍 Verificando acceso a la galería...")
-            gallery = db.execute(
-                galleries.select().where(
-                    and_(
-                        galleries.c.id == gallery_id,
-                        galleries.c.client_id == current_user['id']
-                    )
-                )
-            ).first()
-            
-            if not gallery:
-                print("❌ Galería no encontrada o acceso denegado")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Galería no encontrada o no tienes acceso"
-                )
-            print("✅ Acceso a galería verificado")
+        logger.debug("Usuario %s cambiando la selección de la foto %s en la galería %s", current_user["id"], photo_id, gallery_id)
 
-            # Obtener la foto de la galería
-            print("\n🔍 Buscando foto en la galería...")
-            gallery_photo = db.execute(
-                gallery_photos.select().where(
+        with invalidating() as stale, get_db() as db:
+            # Cambiar el estado de selección (toggle) en una sola sentencia,
+            # solo si la galería está asignada al cliente
+            result = db.execute(
+                gallery_photos.update()
+                .where(
                     and_(
                         gallery_photos.c.gallery_id == gallery_id,
-                        gallery_photos.c.photo_id == photo_id
+                        gallery_photos.c.photo_id == photo_id,
+                        gallery_photos.c.gallery_id.in_(
+                            select(galleries.c.id).where(
+                                galleries.c.id == gallery_id,
+                                gallery_scope(current_user, "select"),
+                            )
+                        ),
                     )
                 )
-            ).first()
+                .values(selected=~gallery_photos.c.selected)
+            )
 
-            if not gallery_photo:
-                print("❌ Foto no encontrada en la galería")
+            if result.rowcount == 0:
+                # Solo en el caso de error: ¿falta la galería o la foto?
+                gallery = db.execute(
+                    select(galleries.c.id).where(
+                        galleries.c.id == gallery_id, gallery_scope(current_user, "select")
+                    )
+                ).first()
+                if not gallery:
+                    logger.info("Galería %s no encontrada o sin acceso para el usuario %s", gallery_id, current_user["id"])
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="Galería no encontrada o no tienes acceso"
+                    )
+                logger.info("Foto %s no encontrada en la galería %s", photo_id, gallery_id)
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Foto no encontrada en la galería"
                 )
-            print("✅ Foto encontrada")
 
-            # Cambiar el estado de selección (toggle)
-            new_selected_state = not gallery_photo.selected
-            print(f"\n🔄 Cambiando estado de selección a: {new_selected_state}")
-
-            # Actualizar el estado de selección
-            db.execute(
-                gallery_photos.update()
-                .where(
-                    and_(
-                        gallery_photos.c.gallery_id == gallery_id,
-                        gallery_photos.c.photo_id == photo_id
-                    )
-                )
-                .values(selected=new_selected_state)
-            )
-            print("✅ Estado actualizado correctamente")
+            manifests.mark_stale(db, [gallery_id])
+            stale.update({f"gallery:{gallery_id}", "gallery_photos"})
 
             # Obtener la foto actualizada
-            print("\n🔍 Obteniendo datos actualizados...")
             updated_photo = db.execute(
                 select(
                     gallery_photos.c.id.label('gallery_photo_id'),
@@ -450,14 +375,285 @@ async def toggle_photo_selection(
                 )
             ).first()
 
-            print("✅ Datos actualizados obtenidos")            
-            print("\n=== Operación completada con éxito ===")
-
-            return updated_photo
+            # Misma URL firmada que en GET /galleries/{id}
+            return {**updated_photo._mapping, "url": media_url(updated_photo.path)}
 
     except SQLAlchemyError as e:
-        print(f"\n❌ Error de base de datos: {str(e)}")
+        logger.exception("Error de base de datos al actualizar la selección")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al actualizar la selección de la foto: {str(e)}"
         )
+
+
+# -------------------------------------------------------------------
+# Endpoint para cambiar el orden de las fotos de una galería
+# PUT /galleries/{id}/photos/order
+#
+# Coloca las fotos indicadas, juntas y en ese orden, justo después de
+# after_photo_id (o al principio si es null). Solo se reescriben las filas
+# movidas: su nueva clave de orden queda entre las de sus vecinas, sin
+# renumerar el resto de la galería (ver services/ranking.py)
+#
+# Respuestas:
+#   - 200: Nuevas posiciones de las fotos movidas
+#   - 400: after_photo_id está entre las fotos movidas
+#   - 403: El usuario no es el fotógrafo de la galería
+#   - 404: Galería no encontrada o fotos que no están en ella
+#   - 500: Error interno del servidor
+# -------------------------------------------------------------------
+@gallery.put(
+    "/galleries/{id}/photos/order",
+    response_model=list[PhotoPosition],
+    responses={
+        400: {"description": "Movimiento no válido"},
+        403: {"description": "Acceso denegado"},
+        404: {"description": "Galería o foto no encontrada"},
+        500: {"description": "Error interno del servidor"},
+    },
+    summary="Reordenar fotos de la galería",
+    description="Mueve una o varias fotos detrás de otra foto de la galería. Solo para el fotógrafo de la galería.",
+)
+def move_gallery_photos(id: int, move: PhotoMove, current_user=Depends(get_current_user)):
+    # Sin repetidas, conservando el orden pedido
+    photo_ids = list(dict.fromkeys(move.photo_ids))
+    if move.after_photo_id in photo_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se puede colocar una foto detrás de sí misma",
+        )
+
+    try:
+        # Las claves se calculan a partir de las de las vecinas: la lectura y
+        # la escritura van en la misma transacción de escritura, o dos
+        # movimientos simultáneos al mismo hueco obtendrían la misma clave
+        with invalidating() as stale, get_db(immediate=True) as db:
+            visible = db.execute(
+                select(galleries.c.id).where(
+                    galleries.c.id == id, gallery_scope(current_user, "reorder")
+                )
+            ).first()
+            if not visible:
+                raise_not_visible(
+                    db, galleries, id,
+                    not_found=f"Galería con id {id} no encontrada",
+                    forbidden="Solo el fotógrafo puede ordenar las fotos de la galería",
+                )
+
+            wanted = photo_ids + ([move.after_photo_id] if move.after_photo_id is not None else [])
+            rows = db.execute(
+                select(gallery_photos.c.id, gallery_photos.c.photo_id, gallery_photos.c.rank)
+                .where(
+                    gallery_photos.c.gallery_id == id,
+                    gallery_photos.c.photo_id.in_(wanted),
+                )
+            ).fetchall()
+            by_photo = {row.photo_id: row for row in rows}
+            missing = [photo_id for photo_id in wanted if photo_id not in by_photo]
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Fotos no encontradas en la galería: {missing}",
+                )
+
+            # Hueco de destino: entre after_photo_id y la siguiente foto que no se mueve
+            moved_rows = [by_photo[photo_id].id for photo_id in photo_ids]
+            lower = by_photo[move.after_photo_id].rank if move.after_photo_id is not None else None
+            next_query = (
+                select(gallery_photos.c.rank)
+                .where(
+                    gallery_photos.c.gallery_id == id,
+                    gallery_photos.c.id.not_in(moved_rows),
+                )
+                .order_by(gallery_photos.c.rank)
+                .limit(1)
+            )
+            if lower is not None:
+                next_query = next_query.where(gallery_photos.c.rank > lower)
+            upper = db.execute(next_query).scalar()
+
+            keys = ranking.keys_between(lower, upper, len(photo_ids))
+            db.execute(
+                gallery_photos.update()
+                .where(gallery_photos.c.id == bindparam("row_id"))
+                .values(rank=bindparam("new_rank")),
+                [{"row_id": row_id, "new_rank": key} for row_id, key in zip(moved_rows, keys)],
+            )
+
+            # Claves demasiado largas: se reparten de nuevo en segundo plano
+            if max(len(key) for key in keys) > ranking.REBALANCE_LENGTH:
+                if ranking.schedule_rebalance(db, id):
+                    logger.info("Encolado el reequilibrado del orden de la galería %s", id)
+
+            manifests.mark_stale(db, [id])
+            stale.update({f"gallery:{id}", "gallery_photos"})
+            return [
+                {"photo_id": photo_id, "rank": key}
+                for photo_id, key in zip(photo_ids, keys)
+            ]
+
+    except SQLAlchemyError as e:
+        logger.exception("Error de base de datos al reordenar las fotos")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al reordenar las fotos: {str(e)}",
+        )
+
+
+# -------------------------------------------------------------------
+# Endpoint para descargar en un ZIP las fotos seleccionadas por el cliente
+# GET /galleries/{id}/selection.zip
+#
+# El ZIP se genera en streaming mientras se descarga: no se escribe nada
+# en disco y la memoria usada es constante aunque la selección ocupe varios GB
+#
+# Respuestas:
+#   - 200: ZIP con las fotos seleccionadas (selected = true)
+#   - 403: El usuario no es el fotógrafo de la galería
+#   - 404: Galería no encontrada o sin fotos seleccionadas
+#   - 500: Error interno del servidor
+# -------------------------------------------------------------------
+@gallery.get(
+    "/galleries/{id}/selection.zip",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"application/zip": {}}, "description": "ZIP con las fotos seleccionadas"},
+        403: {"description": "Acceso denegado"},
+        404: {"description": "Galería no encontrada o sin fotos seleccionadas"},
+        500: {"description": "Error interno del servidor"},
+    },
+    summary="Descargar fotos seleccionadas",
+    description="Descarga en un ZIP las fotos que el cliente ha seleccionado. Solo para el fotógrafo de la galería o un administrador.",
+)
+def download_selection(id: int, current_user=Depends(get_current_user)):
+    try:
+        with get_db() as db:
+            # Solo el fotógrafo de la galería (o un admin) puede descargar la selección:
+            # la condición de acceso va en la misma consulta que lee las fotos
+            selected_photos = db.execute(
+                select(photos.c.id, photos.c.path)
+                .select_from(
+                    join(photos, gallery_photos, photos.c.id == gallery_photos.c.photo_id)
+                    .join(galleries, galleries.c.id == gallery_photos.c.gallery_id)
+                )
+                .where(
+                    and_(
+                        gallery_photos.c.gallery_id == id,
+                        gallery_photos.c.selected == True,
+                        gallery_scope(current_user, "download"),
+                    )
+                )
+                .order_by(gallery_photos.c.rank, gallery_photos.c.id)
+            ).fetchall()
+
+            if not selected_photos:
+                # Sin filas: puede faltar la galería, el permiso o la selección
+                visible = db.execute(
+                    select(galleries.c.id).where(
+                        galleries.c.id == id, gallery_scope(current_user, "download")
+                    )
+                ).first()
+                if not visible:
+                    raise_not_visible(
+                        db, galleries, id,
+                        not_found=f"Galería con id {id} no encontrada",
+                        forbidden="Solo el fotógrafo puede descargar la selección",
+                    )
+
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener la selección: {str(e)}",
+        )
+
+    # Resolver las rutas en disco antes de empezar a enviar el ZIP
+    # (una vez enviada la cabecera 200 ya no se puede devolver un error)
+    files = []
+    used_names = set()
+    for photo in selected_photos:
+        try:
+            path = resolve_media_path(photo.path)
+        except ValueError:
+            logger.warning("Ruta no válida para la foto %s: %s", photo.id, photo.path)
+            continue
+        if not path.is_file():
+            logger.warning("Fichero no encontrado para la foto %s: %s", photo.id, path)
+            continue
+
+        # Evitar nombres repetidos dentro del ZIP
+        name = os.path.basename(photo.path)
+        if name in used_names:
+            name = f"{photo.id}_{name}"
+        used_names.add(name)
+        files.append((name, path))
+
+    if not files:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="La galería no tiene fotos seleccionadas disponibles",
+        )
+
+    return StreamingResponse(
+        stream_zip(files),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="galeria_{id}_seleccion.zip"'},
+    )
+
+
+# -------------------------------------------------------------------
+# Endpoint para obtener las fotos duplicadas o casi iguales de una galería
+# GET /galleries/{id}/duplicates
+#
+# Parámetros:
+#   - max_distance (int): Distancia de Hamming máxima entre hashes (0 = idénticas)
+#
+# Ayuda al cliente a elegir entre fotos de una misma ráfaga. Los hashes se
+# calculan con POST /sessions/{id}/phash ('pending' indica cuántos faltan)
+# -------------------------------------------------------------------
+@gallery.get(
+    "/galleries/{id}/duplicates",
+    response_model=DuplicateReport,
+    summary="Fotos casi duplicadas de la galería",
+    description="Agrupa las fotos de la galería cuyos hashes perceptuales están a poca distancia.",
+    responses={
+        403: {"description": "Acceso denegado"},
+        404: {"description": "Galería no encontrada"},
+        500: {"description": "Error interno del servidor"},
+        503: {"description": "Faltan las dependencias opcionales (numpy, Pillow)"},
+    },
+)
+def get_gallery_duplicates(
+    id: int,
+    max_distance: int = Query(phash.DEFAULT_MAX_DISTANCE, ge=0, le=32),
+    current_user=Depends(get_current_user),
+):
+    if not phash.available():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="La detección de duplicados requiere numpy y Pillow",
+        )
+
+    try:
+        with get_db() as db:
+            visible = db.execute(
+                select(galleries.c.id).where(galleries.c.id == id, gallery_scope(current_user))
+            ).first()
+            if not visible:
+                raise_not_visible(
+                    db, galleries, id,
+                    not_found=f"Galería con id {id} no encontrada",
+                    forbidden="No tienes permiso para ver esta galería",
+                )
+
+            return phash.duplicate_report(
+                db,
+                photos.c.id.in_(
+                    select(gallery_photos.c.photo_id).where(gallery_photos.c.gallery_id == id)
+                ),
+                max_distance,
+            )
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar duplicados: {str(e)}",
+        )
@@ -0,0 +1,68 @@
+# routes/media.py
+
+import logging
+import time
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from config.security import verify_media_signature
+from config.storage import resolve_media_path
+
+# Crear router con tag para la documentación
+media = APIRouter(tags=["media"])
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------------------------------------------
+# Endpoint para servir el fichero de una foto con una URL firmada
+# GET /media/{path}?expires=...&signature=...
+#
+# Las URLs las genera get_gallery para cada foto (ver media_url en
+# config/security.py). Solo se comprueba la firma y la caducidad, sin
+# token JWT ni consultas a la base de datos, así que cada imagen cuesta
+# lo mismo que un fichero estático y la respuesta se puede cachear
+# hasta que caduca la URL
+#
+# Respuestas:
+#   - 200: Fichero de la foto
+#   - 403: Firma incorrecta o URL caducada
+#   - 404: Fichero no encontrado
+# -------------------------------------------------------------------
+@media.get(
+    "/media/{path:path}",
+    response_class=FileResponse,
+    responses={
+        200: {"content": {"image/jpeg": {}}, "description": "Fichero de la foto"},
+        403: {"description": "Firma incorrecta o URL caducada"},
+        404: {"description": "Fichero no encontrado"},
+    },
+    summary="Descargar una foto con URL firmada",
+    description="Sirve el fichero de una foto. La URL firmada se obtiene en GET /galleries/{id}.",
+)
+async def get_media(
+    path: str,
+    expires: int = Query(...),
+    signature: str = Query(..., max_length=64),
+):
+    if not verify_media_signature(path, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="URL no válida o caducada",
+        )
+
+    try:
+        file_path = resolve_media_path(path)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fichero no encontrado")
+    if not file_path.is_file():
+        logger.warning("Fichero no encontrado para la URL firmada: %s", file_path)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Fichero no encontrado")
+
+    # La URL es la credencial: se puede cachear tal cual hasta que caduca
+    max_age = max(0, expires - int(time.time()))
+    return FileResponse(
+        file_path,
+        headers={"Cache-Control": f"public, max-age={max_age}, immutable"},
+    )
@@ -0,0 +1,43 @@
+# routes/metrics.py
+
+import hmac
+import os
+
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+
+from middleware.metrics import registry
+
+# Crear router con tag para la documentación
+metrics = APIRouter(tags=["metrics"])
+
+# Token opcional para proteger /metrics (Authorization: Bearer <token>)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+# -------------------------------------------------------------------
+# Endpoint con las métricas del proceso en formato Prometheus
+# GET /metrics
+#
+# Si la variable de entorno METRICS_TOKEN está definida, hay que enviar
+# la cabecera Authorization: Bearer <METRICS_TOKEN>
+# -------------------------------------------------------------------
+@metrics.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Métricas Prometheus",
+    description="Latencias, peticiones en curso y consultas SQL por ruta en formato de texto de Prometheus.",
+    responses={401: {"description": "Token de métricas incorrecto"}},
+)
+async def get_metrics(request: Request):
+    if METRICS_TOKEN:
+        provided = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(provided.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de métricas incorrecto",
+            )
+
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -1,23 +1,69 @@
 # routes/user.py
 
 # Importamos las librerías necesarias
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from config.db import get_db
 from models.session import sessions  # sessions es la tabla de la base de datos
-from schemas.session import Session as SessionSchema
+from models.photo import photos
+from models.gallery_photos import gallery_photos
+from schemas.session import Session as SessionSchema, SessionOverview
+from schemas.photo import DuplicateReport, PhashJobs
 from models.user import UserRole  # Importar el enum de roles
 
 from sqlalchemy.exc import SQLAlchemyError  # Para manejar errores de la base de datos
-from sqlalchemy import select
+from sqlalchemy import select, func, distinct, case
 from middleware.auth import get_current_user  # Middleware
+from services.response_cache import cacheable
+from services import phash
+from services.scoping import raise_not_visible, session_scope
+from typing import Optional
+from datetime import datetime
+import logging
 
 
 session = APIRouter(tags=["sessions"])
 
+logger = logging.getLogger(__name__)
+
+
+# Quita la zona horaria de un límite del rango de fechas, igual que la
+# migración normalize_session_dates hace con sessions.date: las fechas se
+# guardan sin zona y un 'from' con zona y un 'to' sin ella no se pueden
+# comparar (TypeError, un 500)
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value.replace(tzinfo=None)
+
+
+# Aplica a una consulta de sesiones los filtros comunes de los listados:
+# sesiones visibles para el usuario, rango de fechas (incluido) y límite,
+# ordenando por fecha. Para un fotógrafo el filtro por (photographer_id, date)
+# usa el índice ix_sessions_photographer_date.
+def _filter_sessions(query, current_user, date_from=None, date_to=None, limit=None):
+    query = query.where(session_scope(current_user)).order_by(
+        sessions.c.date, sessions.c.id
+    )
+    if date_from is not None:
+        query = query.where(sessions.c.date >= date_from)
+    if date_to is not None:
+        query = query.where(sessions.c.date <= date_to)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
 
 # -------------------------------------------------------------------
 # Endpoint para obtener la lista de todas las sesiones de un fotógrafo
 # GET /sessions
+#
+# Parámetros (opcionales):
+#   - from (datetime): Solo sesiones en esta fecha o posteriores
+#   - to (datetime): Solo sesiones en esta fecha o anteriores
+#   - limit (int): Número máximo de sesiones a devolver
+#
+# Las sesiones se devuelven ordenadas por fecha. El filtro usa el
+# índice (photographer_id, date).
 # 
 # Verifica:
 #   - Que el usuario esté autenticado
@@ -30,12 +76,19 @@ session = APIRouter(tags=["sessions"])
     description="Retorna la información de las sesiones del fotógrafo autenticado.",
     responses={
         200: {"description": "Lista de sesiones encontradas"},
+        400: {"description": "Rango de fechas no válido"},
         401: {"description": "No autenticado"},
         403: {"description": "No autorizado - Se requiere rol de fotógrafo"},
         500: {"description": "Error interno del servidor"}
     }
 )
-def get_sessions(current_user=Depends(get_current_user)):
+@cacheable(["sessions"])
+def get_sessions(
+    date_from: Optional[datetime] = Query(None, alias="from", description="Fecha inicial (incluida)"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Fecha final (incluida)"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Máximo de sesiones"),
+    current_user=Depends(get_current_user),
+):
     try:
 
         # Verificar rol de fotógrafo
@@ -45,20 +98,21 @@ def get_sessions(current_user=Depends(get_current_user)):
                 detail="Solo los fotógrafos pueden acceder a sus sesiones",
             )
         
-        print(f"\n=== Obteniendo sesiones para fotógrafo ===")
-        print(f"Fotógrafo ID: {current_user['id']}")
-        print(f"Email: {current_user['email']}")
-
-        user_id = current_user["id"]  # Acceso correcto
+        date_from, date_to = _naive(date_from), _naive(date_to)
+        if date_from is not None and date_to is not None and date_from > date_to:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La fecha 'from' debe ser anterior a 'to'",
+            )
 
         with get_db() as db:
-            # Filtrar las sesiones por el user_id del usuario actual
-            print("\n🔍 Consultando sesiones en base de datos...")
-            query = select(sessions).where(sessions.c.photographer_id == user_id)            
+            # Filtrar las sesiones del usuario actual
+            query = _filter_sessions(
+                select(sessions), current_user, date_from, date_to, limit
+            )
             result = db.execute(query).fetchall() # Ejecutamos la consulta
 
-            print(f"✅ Sesiones encontradas: {len(result)}")
-            print("\n=== Operación completada con éxito ===")
+            logger.debug("Fotógrafo %s: %s sesiones encontradas", current_user["id"], len(result))
 
             return result
     except SQLAlchemyError as e:
@@ -67,3 +121,179 @@ def get_sessions(current_user=Depends(get_current_user)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener las sesiones: {str(e)}",
         )
+
+
+# -------------------------------------------------------------------
+# Endpoint para obtener el resumen de las sesiones de un fotógrafo
+# GET /sessions/overview
+#
+# Devuelve cada sesión con:
+#   - photo_count: Número de fotos de la sesión
+#   - gallery_count: Número de galerías que usan alguna foto de la sesión
+#   - selected_count: Número de fotos de la sesión seleccionadas en alguna galería
+#
+# Todo se calcula en una única consulta agrupada, en lugar de pedir
+# las fotos de cada sesión por separado.
+# Acepta los mismos filtros que GET /sessions (from, to, limit)
+# -------------------------------------------------------------------
+@session.get(
+    "/sessions/overview",
+    response_model=list[SessionOverview],
+    summary="Resumen de sesiones del fotógrafo",
+    description="Retorna las sesiones del fotógrafo autenticado con sus totales de fotos, galerías y selecciones.",
+    responses={
+        200: {"description": "Resumen de sesiones"},
+        400: {"description": "Rango de fechas no válido"},
+        401: {"description": "No autenticado"},
+        403: {"description": "No autorizado - Se requiere rol de fotógrafo"},
+        500: {"description": "Error interno del servidor"}
+    }
+)
+@cacheable(["sessions", "galleries", "gallery_photos"])
+def get_sessions_overview(
+    date_from: Optional[datetime] = Query(None, alias="from", description="Fecha inicial (incluida)"),
+    date_to: Optional[datetime] = Query(None, alias="to", description="Fecha final (incluida)"),
+    limit: Optional[int] = Query(None, ge=1, le=10000, description="Máximo de sesiones"),
+    current_user=Depends(get_current_user),
+):
+    # Verificar rol de fotógrafo
+    if current_user["role"] != UserRole.photographer:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los fotógrafos pueden acceder a sus sesiones",
+        )
+
+    date_from, date_to = _naive(date_from), _naive(date_to)
+    if date_from is not None and date_to is not None and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha 'from' debe ser anterior a 'to'",
+        )
+
+    query = (
+        select(
+            sessions.c.id,
+            sessions.c.name,
+            sessions.c.date,
+            sessions.c.photographer_id,
+            func.count(distinct(photos.c.id)).label("photo_count"),
+            func.count(distinct(gallery_photos.c.gallery_id)).label("gallery_count"),
+            func.count(
+                distinct(case((gallery_photos.c.selected == True, photos.c.id)))
+            ).label("selected_count"),
+        )
+        .select_from(
+            sessions.outerjoin(photos, photos.c.session_id == sessions.c.id).outerjoin(
+                gallery_photos, gallery_photos.c.photo_id == photos.c.id
+            )
+        )
+        .group_by(sessions.c.id)
+    )
+
+    try:
+        with get_db() as db:
+            return db.execute(
+                _filter_sessions(query, current_user, date_from, date_to, limit)
+            ).fetchall()
+    except SQLAlchemyError as e:
+        # Manejar errores específicos de la base de datos
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener el resumen de sesiones: {str(e)}",
+        )
+
+
+# Comprueba que la sesión existe y es visible para el usuario (404 / 403)
+def _check_session(db, id: int, current_user):
+    visible = db.execute(
+        select(sessions.c.id).where(sessions.c.id == id, session_scope(current_user))
+    ).first()
+    if not visible:
+        raise_not_visible(
+            db, sessions, id,
+            not_found=f"Sesión con id {id} no encontrada",
+            forbidden="No tienes permiso para acceder a esta sesión",
+        )
+
+
+# -------------------------------------------------------------------
+# Endpoint para calcular los hashes perceptuales de las fotos de una sesión
+# POST /sessions/{id}/phash
+#
+# Encola (en lotes) el cálculo del hash de las fotos que aún no lo tienen;
+# lo hacen los workers de la cola (python -m scripts.worker --processes N).
+# Las fotos cuyo hash ya falló no se encolan salvo con retry_failed=true
+# (p. ej. tras reponer los ficheros).
+# Después, GET /sessions/{id}/duplicates agrupa las fotos casi iguales.
+# -------------------------------------------------------------------
+@session.post(
+    "/sessions/{id}/phash",
+    response_model=PhashJobs,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Calcular hashes de las fotos de la sesión",
+    description="Encola el cálculo del hash perceptual de las fotos de la sesión que aún no lo tienen.",
+    responses={
+        403: {"description": "Acceso denegado"},
+        404: {"description": "Sesión no encontrada"},
+        500: {"description": "Error interno del servidor"},
+    },
+)
+def enqueue_session_hashes(
+    id: int,
+    retry_failed: bool = Query(False, description="Reintentar también las fotos cuyo hash falló"),
+    current_user=Depends(get_current_user),
+):
+    try:
+        with get_db() as db:
+            _check_session(db, id, current_user)
+            result = phash.enqueue_missing(db, photos.c.session_id == id, retry_failed)
+            logger.info("Sesión %s: %s fotos encoladas para hash en %s trabajos", id, result["photos"], result["jobs"])
+            return result
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al encolar el cálculo de hashes: {str(e)}",
+        )
+
+
+# -------------------------------------------------------------------
+# Endpoint para obtener las fotos duplicadas o casi iguales de una sesión
+# GET /sessions/{id}/duplicates
+#
+# Parámetros:
+#   - max_distance (int): Distancia de Hamming máxima entre hashes (0 = idénticas)
+#
+# Solo se comparan las fotos con hash ('pending' indica cuántas faltan)
+# -------------------------------------------------------------------
+@session.get(
+    "/sessions/{id}/duplicates",
+    response_model=DuplicateReport,
+    summary="Fotos casi duplicadas de la sesión",
+    description="Agrupa las fotos de la sesión cuyos hashes perceptuales están a poca distancia.",
+    responses={
+        403: {"description": "Acceso denegado"},
+        404: {"description": "Sesión no encontrada"},
+        500: {"description": "Error interno del servidor"},
+        503: {"description": "Faltan las dependencias opcionales (numpy, Pillow)"},
+    },
+)
+def get_session_duplicates(
+    id: int,
+    max_distance: int = Query(phash.DEFAULT_MAX_DISTANCE, ge=0, le=32),
+    current_user=Depends(get_current_user),
+):
+    if not phash.available():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="La detección de duplicados requiere numpy y Pillow",
+        )
+
+    try:
+        with get_db() as db:
+            _check_session(db, id, current_user)
+            return phash.duplicate_report(db, photos.c.session_id == id, max_distance)
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar duplicados: {str(e)}",
+        )
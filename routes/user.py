@@ -1,14 +1,25 @@
 # routes/user.py
 
 # Importamos las librerías necesarias
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Body, File, UploadFile
+from fastapi.responses import StreamingResponse
 from config.db import get_db
+from config.security import get_password_hashes
 from models.user import users  # users es la tabla de la base de datos
 from models.user import UserRole  # Importar el enum de roles
-from schemas.user import User, UserCreate, UserUpdate  # Clase User
+from schemas.user import User, UserCreate, UserUpdate, UserPublic, UserImportResult  # Clase User
+from pydantic import ValidationError
 from passlib.context import CryptContext  # Para bcrypt
-from sqlalchemy.exc import SQLAlchemyError  # Para manejar errores de la base de datos
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError  # Para manejar errores de la base de datos
+from sqlalchemy import select
 from middleware.auth import get_current_user  # Middleware
+from services.response_cache import cacheable, invalidate, invalidating
+from services.scoping import raise_not_visible, user_scope
+from typing import Optional
+import csv
+import io
+import json
+import logging
 
 
 # Configurar bcrypt
@@ -16,6 +27,8 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 user = APIRouter(tags=["users"])
 
+logger = logging.getLogger(__name__)
+
 
 # -------------------------------------------------------------------
 # Endpoint para crear un nuevo usuario. Recibe los datos del usuario,
@@ -62,9 +75,10 @@ def create_user(user: UserCreate, current_user=Depends(get_current_user)):
         new_user["password"] = pwd_context.hash(user.password)
 
         # Usar context manager para manejar la conexión
-        with get_db() as db:
+        with invalidating() as stale, get_db() as db:
             # Ejecutar la inserción del nuevo usuario
             result = db.execute(users.insert().values(new_user))
+            stale.add("users")
 
             # Obtener y retornar el usuario recién creado
             created_user = db.execute(
@@ -87,6 +101,191 @@ def create_user(user: UserCreate, current_user=Depends(get_current_user)):
         )
 
 
+# Número máximo de filas por importación y filas por transacción
+USER_IMPORT_MAX_ROWS = 10000
+USER_IMPORT_CHUNK = 500
+
+
+# Rol que se asigna a los usuarios creados por el usuario actual
+# (mismas reglas que en create_user)
+def _role_for_new_users(current_user) -> UserRole:
+    if current_user["role"] == UserRole.admin:
+        return UserRole.photographer
+    if current_user["role"] == UserRole.photographer:
+        return UserRole.client
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="No tienes permiso para crear usuarios",
+    )
+
+
+# Valida, hashea e inserta las filas de una importación masiva.
+# Las contraseñas se hashean en paralelo y las filas se insertan con
+# executemany en transacciones de USER_IMPORT_CHUNK filas.
+def _import_users(rows: list[dict], current_user) -> dict:
+    new_user_role = _role_for_new_users(current_user)
+    photographer_id = current_user["id"] if new_user_role == UserRole.client else None
+
+    if len(rows) > USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {USER_IMPORT_MAX_ROWS} usuarios por importación",
+        )
+
+    errors = []
+    valid = []  # (número de fila, UserCreate)
+    seen_emails = set()
+
+    # 1. Validar cada fila y detectar emails repetidos dentro del fichero
+    for number, row in enumerate(rows, start=1):
+        try:
+            new_user = UserCreate.model_validate(row)
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+            errors.append({"row": number, "email": row.get("email") if isinstance(row, dict) else None, "error": message})
+            continue
+
+        if new_user.email in seen_emails:
+            errors.append({"row": number, "email": new_user.email, "error": "Email repetido en la importación"})
+            continue
+        seen_emails.add(new_user.email)
+        valid.append((number, new_user))
+
+    # 2. Descartar los emails que ya existen en la base de datos
+    existing = set()
+    with get_db() as db:
+        emails = [new_user.email for _, new_user in valid]
+        for start in range(0, len(emails), USER_IMPORT_CHUNK):
+            existing.update(
+                db.execute(
+                    select(users.c.email).where(users.c.email.in_(emails[start:start + USER_IMPORT_CHUNK]))
+                ).scalars()
+            )
+
+    pending = []
+    for number, new_user in valid:
+        if new_user.email in existing:
+            errors.append({"row": number, "email": new_user.email, "error": "Ya existe un usuario con este email"})
+        else:
+            pending.append((number, new_user))
+
+    # 3. Hashear todas las contraseñas en paralelo
+    hashes = get_password_hashes([new_user.password for _, new_user in pending])
+
+    # 4. Insertar por bloques, cada bloque en su propia transacción
+    created = 0
+    records = [
+        (number, {
+            "name": new_user.name,
+            "email": new_user.email,
+            "password": password_hash,
+            "role": new_user_role,
+            "photographer_id": photographer_id,
+        })
+        for (number, new_user), password_hash in zip(pending, hashes)
+    ]
+    for start in range(0, len(records), USER_IMPORT_CHUNK):
+        chunk = records[start:start + USER_IMPORT_CHUNK]
+        try:
+            with get_db() as db:
+                db.execute(users.insert(), [values for _, values in chunk])
+            created += len(chunk)
+        except IntegrityError:
+            # Otro proceso creó alguno de estos emails entretanto:
+            # se reintenta fila a fila para saber cuál falla
+            for number, values in chunk:
+                try:
+                    with get_db() as db:
+                        db.execute(users.insert().values(values))
+                    created += 1
+                except IntegrityError:
+                    errors.append({"row": number, "email": values["email"], "error": "Ya existe un usuario con este email"})
+
+    if created:
+        invalidate("users")
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "errors": errors}
+
+
+# -------------------------------------------------------------------
+# Endpoint para importar usuarios de forma masiva desde JSON
+# POST /users/import
+# Body: Array JSON de objetos con name, email y password
+#
+# Las filas no válidas (datos incorrectos, emails repetidos o existentes)
+# se informan en 'errors' sin impedir la creación del resto.
+# Mismas reglas de rol que POST /users/
+# -------------------------------------------------------------------
+@user.post(
+    "/users/import",
+    response_model=UserImportResult,
+    summary="Importar usuarios (JSON)",
+    description="Crea varios usuarios a partir de un array JSON e informa de los errores por fila.",
+    responses={
+        200: {"description": "Importación realizada (ver errores por fila)"},
+        400: {"description": "Demasiadas filas"},
+        403: {"description": "No autorizado - Rol insuficiente"},
+        500: {"description": "Error interno del servidor"},
+    },
+)
+def import_users(rows: list[dict] = Body(...), current_user=Depends(get_current_user)):
+    try:
+        return _import_users(rows, current_user)
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al importar los usuarios: {str(e)}",
+        )
+
+
+# -------------------------------------------------------------------
+# Endpoint para importar usuarios de forma masiva desde un CSV
+# POST /users/import/csv
+# Body (form-data):
+#   - file: Fichero CSV (UTF-8) con cabecera name,email,password
+# -------------------------------------------------------------------
+@user.post(
+    "/users/import/csv",
+    response_model=UserImportResult,
+    summary="Importar usuarios (CSV)",
+    description="Crea varios usuarios a partir de un fichero CSV con cabecera name,email,password.",
+    responses={
+        200: {"description": "Importación realizada (ver errores por fila)"},
+        400: {"description": "Fichero CSV no válido o demasiadas filas"},
+        403: {"description": "No autorizado - Rol insuficiente"},
+        500: {"description": "Error interno del servidor"},
+    },
+)
+def import_users_csv(file: UploadFile = File(...), current_user=Depends(get_current_user)):
+    try:
+        content = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El fichero debe estar codificado en UTF-8",
+        )
+
+    reader = csv.DictReader(io.StringIO(content))
+    missing = {"name", "email", "password"} - set(reader.fieldnames or [])
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Faltan columnas en el CSV: {', '.join(sorted(missing))}",
+        )
+
+    try:
+        return _import_users(list(reader), current_user)
+    except SQLAlchemyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al importar los usuarios: {str(e)}",
+        )
+
+
 # -------------------------------------------------------------------
 # Endpoint que obtiene el usuario actual autenticado.
 # Ruta: GET /users/me
@@ -106,51 +305,138 @@ def create_user(user: UserCreate, current_user=Depends(get_current_user)):
 # Inyecta el usuario actual usando el middleware get_current_user
 # Si el token es válido, current_user contendrá los datos del usuario
 # Si el token es inválido, get_current_user lanzará una HTTPException
+@cacheable(["users"])
 def read_users_me(current_user=Depends(get_current_user)):
 
     return current_user
 
 
+# Campos que se pueden pedir en los listados de usuarios (nunca la contraseña)
+USER_LIST_FIELDS = {
+    "id": users.c.id,
+    "name": users.c.name,
+    "email": users.c.email,
+    "role": users.c.role,
+    "photographer_id": users.c.photographer_id,
+}
+
+# Filas que se leen de SQLite en cada paso del listado en streaming
+USER_STREAM_BATCH = 500
+
+
+# Convierte el parámetro fields= en la lista de columnas a consultar.
+# El ID se incluye siempre porque es la clave de la paginación.
+def _user_list_columns(fields: Optional[str]):
+    if not fields:
+        return list(USER_LIST_FIELDS.values())
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in USER_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos no válidos: {', '.join(unknown)}. Disponibles: {', '.join(USER_LIST_FIELDS)}",
+        )
+
+    return [users.c.id] + [USER_LIST_FIELDS[name] for name in names if name != "id"]
+
+
+# Convierte una fila en un diccionario serializable a JSON
+def _user_row_to_dict(row) -> dict:
+    data = dict(row._mapping)
+    if isinstance(data.get("role"), UserRole):
+        data["role"] = data["role"].value
+    return data
+
+
+# Lee una página del listado por clave (ID) con una conexión propia
+def _user_batch(query, after_id: Optional[int], size: int):
+    if after_id is not None:
+        query = query.where(users.c.id > after_id)
+    with get_db() as db:
+        return db.execute(query.limit(size)).fetchall()
+
+
+# Genera el listado como un array JSON por lotes de USER_STREAM_BATCH filas,
+# sin cargar todo el resultado en memoria (se usa en el listado de
+# administrador). Cada lote abre y cierra su conexión: no se retiene
+# ninguna mientras el cliente descarga, y se envía como un solo bloque
+# (un mensaje ASGI por lote, no por usuario).
+#
+# El primer lote (rows) lo lee el endpoint antes de responder, para que un
+# error de la base de datos sea un 500 y no un 200 con el JSON cortado.
+def _stream_users(query, rows, limit: int):
+    prefix = b"["
+    remaining = limit
+    while True:
+        if rows:
+            yield prefix + b",".join(
+                json.dumps(_user_row_to_dict(row), ensure_ascii=False, separators=(",", ":")).encode()
+                for row in rows
+            )
+            prefix = b","
+        remaining -= len(rows)
+        if remaining <= 0 or len(rows) < USER_STREAM_BATCH:
+            break
+        rows = _user_batch(query, rows[-1].id, min(USER_STREAM_BATCH, remaining))
+    yield b"]" if prefix == b"," else b"[]"
+
+
 # -------------------------------------------------------------------
-# Endpoint para obtener la lista de todos los usuarios registrados
+# Endpoint para obtener la lista de usuarios registrados
+# GET /users
+#
+# Parámetros:
+#   - fields (str, opcional): Campos a devolver separados por comas
+#     (id, name, email, role, photographer_id). Por defecto todos.
+#   - after_id (int, opcional): Devuelve usuarios con ID mayor (paginación por clave)
+#   - limit (int): Número máximo de usuarios a devolver
+#
+# Para obtener la siguiente página se pasa como after_id el ID del
+# último usuario recibido. La contraseña nunca se devuelve.
 # -------------------------------------------------------------------
 @user.get(
     "/users",
-    response_model=list[User],
+    response_model=list[UserPublic],
+    response_model_exclude_unset=True,
     summary="Obtener lista de usuarios",
-    description="Retorna la lista completa de usuarios registrados.",
+    description="Retorna la lista de usuarios registrados, paginada por ID y con los campos pedidos.",
     responses={
         200: {"description": "Lista de usuarios obtenida correctamente"},
+        400: {"description": "Campos no válidos"},
         403: {"description": "No autorizado - Rol insuficiente"},
         500: {"description": "Error interno del servidor"},
     }
 )
-def get_users(current_user=Depends(get_current_user)):
+@cacheable(["users"])
+def get_users(
+    fields: Optional[str] = Query(None, description="Campos separados por comas"),
+    after_id: Optional[int] = Query(None, ge=0, description="ID del último usuario de la página anterior"),
+    limit: int = Query(100, ge=1, le=10000),
+    current_user=Depends(get_current_user),
+):
+    # Si es cliente, denegar acceso
+    if current_user["role"] not in (UserRole.admin, UserRole.photographer):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Los clientes no tienen permiso para ver la lista de usuarios",
+        )
+
+    # Solo se consultan las columnas que se van a devolver
+    query = select(*_user_list_columns(fields)).order_by(users.c.id)
+
     try:
-        with get_db() as db:
-            # Si es admin, mostrar todos los usuarios
-            if current_user["role"] == UserRole.admin:
-                result = db.execute(users.select()).fetchall()
-                return result
-
-            # Si es fotógrafo, mostrar solo sus clientes
-            elif current_user["role"] == UserRole.photographer:
-                result = db.execute(
-                    users.select().where(users.c.photographer_id == current_user["id"])
-                ).fetchall()
-                return result
-
-            # Si es cliente, denegar acceso
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Los clientes no tienen permiso para ver la lista de usuarios",
-                )
+        # Si es admin, mostrar todos los usuarios (en streaming)
+        if current_user["role"] == UserRole.admin:
+            rows = _user_batch(query, after_id, min(USER_STREAM_BATCH, limit))
+            return StreamingResponse(_stream_users(query, rows, limit), media_type="application/json")
 
-            """
-            result = db.execute(users.select()).fetchall()
-            return result
-            """
+        # Si es fotógrafo, mostrar solo sus clientes
+        if after_id is not None:
+            query = query.where(users.c.id > after_id)
+        with get_db() as db:
+            result = db.execute(query.where(user_scope(current_user)).limit(limit))
+            return [_user_row_to_dict(row) for row in result]
 
     except SQLAlchemyError as e:
         # Manejar errores específicos de la base de datos
@@ -175,49 +461,33 @@ def get_users(current_user=Depends(get_current_user)):
         500: {"description": "Error interno del servidor"},
     },
 )
+@cacheable(["users"])
 def get_user(id: int, current_user=Depends(get_current_user)):
     try:
-        with get_db() as db:
-            # Si es admin, puede ver cualquier usuario
-            if current_user["role"] == UserRole.admin:
-                user = db.execute(users.select().where(users.c.id == id)).first()
-                if not user:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail=f"Usuario con id {id} no encontrado",
-                    )
-                return user
+        # Si es cliente, no tiene acceso a ver otros usuarios
+        if current_user["role"] == UserRole.client:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Los clientes no tienen permiso para ver usuarios",
+            )
 
-            # Si es fotógrafo, solo puede ver sus clientes
-            elif current_user["role"] == UserRole.photographer:
-                user = db.execute(
-                    users.select().where(
-                        users.c.id == id, users.c.photographer_id == current_user["id"]
-                    )
-                ).first()
-                if not user:
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="No tienes permiso para ver este usuario",
-                    )
+        with get_db() as db:
+            # Admin: cualquier usuario. Fotógrafo: solo sus clientes
+            user = db.execute(
+                users.select().where(users.c.id == id, user_scope(current_user))
+            ).first()
+            if user:
                 return user
 
-            # Si es cliente, no tiene acceso a ver otros usuarios
-            else:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Los clientes no tienen permiso para ver usuarios",
-                )
-
-            """# Ejecutamos la consulta
-            user = db.execute(users.select().where(users.c.id == id)).first()
-            if not user:
+            if current_user["role"] == UserRole.admin:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"Usuario con id {id} no encontrado",
                 )
-
-            return user"""
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para ver este usuario",
+            )
 
     except SQLAlchemyError as e:
         # Manejar errores específicos de la base de datos
@@ -259,62 +529,37 @@ def get_user(id: int, current_user=Depends(get_current_user)):
 )
 def delete_user(id: int, current_user=Depends(get_current_user)):
     try:
-        with get_db() as db:
-            # Verificamos si existe el usuario a eliminar
-            user_to_delete = db.execute(users.select().where(users.c.id == id)).first()
+        # Los clientes no pueden eliminar usuarios
+        if current_user["role"] == UserRole.client:
+            logger.info("Cliente %s intentó eliminar el usuario %s", current_user["id"], id)
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permiso para eliminar usuarios",
+            )
 
-            # Control de acceso basado en roles
-            if current_user["role"] == UserRole.admin:
-                # Los administradores pueden eliminar cualquier usuario
-                if not user_to_delete:
+        with invalidating() as stale, get_db() as db:
+            # Admin: cualquier usuario. Fotógrafo: solo sus clientes.
+            # El email devuelto sirve para invalidar la caché de su token
+            deleted = db.execute(
+                users.delete()
+                .where(users.c.id == id, user_scope(current_user))
+                .returning(users.c.email)
+            ).first()
+
+            if not deleted:
+                if current_user["role"] == UserRole.admin:
                     raise HTTPException(
                         status_code=status.HTTP_404_NOT_FOUND,
                         detail=f"Usuario con id {id} no encontrado",
                     )
-                db.execute(users.delete().where(users.c.id == id))
-                return None
-
-            elif current_user["role"] == UserRole.photographer:
-                # Los fotógrafos solo pueden eliminar sus clientes
-                if not user_to_delete:
-                    print(f"❌ No tienes permiso para eliminar este usuario {id}")
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="El usuario no existe o no puedes eliminarlo",
-                    )
-
-                if user_to_delete["photographer_id"] != current_user["id"]:
-                    print(
-                        f"❌ El cliente {id} no pertenede a tu usuario {current_user['id']}"
-                    )
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="El usuario no existe o no puedes eliminarlo",
-                    )
-
-                db.execute(users.delete().where(users.c.id == id))
-                return None
-
-            else:
-                # Los clientes no pueden eliminar usuarios
-                print(f"❌ Un cliente no puede eliminar usuarios")
+                logger.info("Fotógrafo %s intentó eliminar el usuario %s que no existe o no es su cliente", current_user["id"], id)
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
-                    detail="No tienes permiso para eliminar usuarios",
+                    detail="El usuario no existe o no puedes eliminarlo",
                 )
 
-            """# Verificamos si existe el usuario
-            user = db.execute(users.select().where(users.c.id == id)).first()
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Usuario con id {id} no encontrado",
-                )
-
-            # Ejecutamos la eliminación
-            db.execute(users.delete().where(users.c.id == id))
-
-            return None  # 204 No Content no devuelve body"""
+            stale.update({"users", f"auth:{deleted.email}"})
+            return None
 
     except SQLAlchemyError as e:
         # Manejar errores específicos de la base de datos
@@ -356,72 +601,53 @@ def update_user(
     id: int, user_update: UserUpdate, current_user=Depends(get_current_user)
 ):
     try:
-        with get_db() as db:
-            # Verificamos si existe el usuario a actualizar
-            existing_user = db.execute(users.select().where(users.c.id == id)).first()
-            if not existing_user:
-                print(f"❌ Usuario {id} no encontrado")
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Usuario no encontrado",
-                )
-
-            # Control de acceso basado en roles
-            if current_user["role"] == UserRole.admin:
-                # Los administradores pueden actualizar cualquier usuario
-                print(
-                    f"✅ Admin con id {current_user['id']}  actualizando usuario con id {id}"
-                )
-
-            elif current_user["role"] == UserRole.photographer:
-                # Los fotógrafos solo pueden actualizar sus clientes
-                if existing_user["photographer_id"] != current_user["id"]:
-                    print(
-                        f"❌ Fotógrafo {current_user['id']} intentó actualizar usuario {id} que no le pertenece"
-                    )
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Solo puedes actualizar tus propios clientes",
-                    )
-                print(f"✅ Fotógrafo {current_user['id']} actualizando su cliente {id}")
-
-            else:
-                # Los clientes no pueden actualizar usuarios
-                print(
-                    f"❌ Cliente {current_user['id']} intentó actualizar usuario {id}"
-                )
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Los clientes no tienen permiso para actualizar usuarios",
-                )
+        # Los clientes no pueden actualizar usuarios
+        if current_user["role"] == UserRole.client:
+            logger.info("Cliente %s intentó actualizar usuario %s", current_user["id"], id)
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Los clientes no tienen permiso para actualizar usuarios",
+            )
 
-            """# Verificamos si existe el usuario
-            existing_user = db.execute(users.select().where(users.c.id == id)).first()
-            if not existing_user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Usuario con id {id} no encontrado",
+        # Preparamos los datos actualizados (Solo incluye campos proporcionados)
+        update_data = user_update.model_dump(exclude_unset=True)
+
+        # Encriptamos la contraseña si se proporciona (fuera de la transacción: bcrypt es lento)
+        if "password" in update_data and update_data["password"]:
+            update_data["password"] = pwd_context.hash(update_data["password"])
+
+        # Con cambio de email hay que leer el anterior para invalidar la caché de
+        # su token: se lee con el bloqueo de escritura ya tomado (immediate)
+        changes_email = "email" in update_data
+        with invalidating() as stale, get_db(immediate=changes_email) as db:
+            previous_email = None
+            if changes_email:
+                previous_email = db.execute(select(users.c.email).where(users.c.id == id)).scalar()
+
+            # Admin: cualquier usuario. Fotógrafo: solo sus clientes.
+            # La condición de acceso va en el propio UPDATE
+            updated_user = db.execute(
+                users.update()
+                .where(users.c.id == id, user_scope(current_user))
+                .values(update_data)
+                .returning(users)
+            ).first()
+            if not updated_user:
+                logger.info("Usuario %s no encontrado o sin acceso para el usuario %s", id, current_user["id"])
+                raise_not_visible(
+                    db, users, id,
+                    not_found="Usuario no encontrado",
+                    forbidden="Solo puedes actualizar tus propios clientes",
                 )
-            """
-
-            # Preparamos los datos actualizados (Solo incluye campos proporcionados)
-            update_data = user_update.model_dump(exclude_unset=True)
-
-            # Encriptamos la contraseña si se proporciona
-            if "password" in update_data and update_data["password"]:
-                update_data["password"] = pwd_context.hash(update_data["password"])
-
-            # Ejecutamos la actualización
-            result = db.execute(
-                users.update().where(users.c.id == id).values(update_data)
-            )
+            logger.debug("Usuario %s (rol %s) actualizó el usuario %s", current_user["id"], current_user["role"], id)
 
-            # Retornamos el usuario actualizado
-            updated_user = db.execute(users.select().where(users.c.id == id)).first()
+            stale.update({"users", f"auth:{updated_user.email}"})
+            if previous_email is not None:
+                stale.add(f"auth:{previous_email}")
             return updated_user
 
     except SQLAlchemyError as e:
-        print(f"❌ Error en la base de datos: {str(e)}")
+        logger.exception("Error de base de datos al actualizar el usuario %s", id)
         # Manejar errores específicos de la base de datos
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,21 @@
+# schemas/backup.py
+
+from typing import Optional
+from pydantic import BaseModel
+
+
+# Estado de una copia de seguridad (services/backup.py)
+class BackupStatus(BaseModel):
+    id: str  # Nombre de la copia, p. ej. backup-20250215-031500
+    status: str  # 'running', 'done' o 'failed'
+    phase: str  # 'copy' o 'compress'
+    compress: bool  # Exportación comprimida con gzip
+    pages_total: int  # Páginas de la base de datos
+    pages_copied: int  # Páginas copiadas
+    progress: float  # Fracción copiada (0 a 1)
+    file: Optional[str] = None  # Fichero resultante dentro de BACKUP_DIR
+    bytes: Optional[int] = None  # Tamaño del fichero resultante
+    started_at: float  # Inicio (epoch en segundos)
+    updated_at: float  # Última actualización del progreso
+    finished_at: Optional[float] = None  # Fin (epoch en segundos)
+    error: Optional[str] = None  # Motivo del fallo
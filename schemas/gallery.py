@@ -1,6 +1,6 @@
 # schemas/gallery.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 
@@ -34,6 +34,7 @@ class PhotoInGallery(BaseModel):
     photo_id: int  # ID de la foto
     description: str  # Descripción de la foto
     path: str  # Ruta de la foto
+    url: Optional[str] = None  # URL firmada y con caducidad para descargar la foto
     selected: bool = False  # Estado de selección
     favorite: bool = False  # Estado de favorito
 
@@ -41,10 +42,25 @@ class PhotoInGallery(BaseModel):
         from_attributes = True
 
 
+# Modelo para mover fotos dentro de una galería
+# Las fotos se colocan juntas, en el orden indicado, justo después de
+# after_photo_id (o al principio de la galería si es None)
+class PhotoMove(BaseModel):
+    photo_ids: List[int] = Field(min_length=1, max_length=500)  # Fotos a mover
+    after_photo_id: Optional[int] = None  # Foto tras la que se colocan
+
+
+# Nueva posición de una foto movida
+class PhotoPosition(BaseModel):
+    photo_id: int  # ID de la foto
+    rank: str  # Clave de orden dentro de la galería
+
+
 # Modelo para respuestas de galería que incluye el ID y las fotos
 class GalleryWithPhotos(GalleryBase):
     id: int  ## ID único de la galería
     photographer_id: int  # ID del fotógrafo
+    version: Optional[int] = None  # Versión del manifiesto (cambia con cada modificación)
     photos: List[PhotoInGallery] = []  # Lista de fotos en la galería
 
     class Config:
@@ -0,0 +1,31 @@
+# schemas/photo.py
+
+from typing import Optional
+from pydantic import BaseModel
+
+
+# Foto dentro de un grupo de casi duplicados
+class DuplicatePhoto(BaseModel):
+    photo_id: int
+    path: str
+    description: Optional[str] = None
+
+
+# Grupo de fotos casi iguales (distancia de Hamming <= max_distance)
+class DuplicateCluster(BaseModel):
+    photos: list[DuplicatePhoto]
+
+
+# Resultado de la búsqueda de duplicados en una sesión o galería
+class DuplicateReport(BaseModel):
+    hashed: int  # Fotos con hash calculado (las que se comparan)
+    pending: int  # Fotos sin hash todavía (no se comparan)
+    failed: int = 0  # Fotos cuyo hash no se pudo calcular (fichero que falta o no es una imagen)
+    max_distance: int  # Umbral usado
+    clusters: list[DuplicateCluster]  # De mayor a menor
+
+
+# Trabajos encolados para calcular los hashes
+class PhashJobs(BaseModel):
+    photos: int  # Fotos sin hash encoladas
+    jobs: int  # Trabajos creados (lotes de fotos)
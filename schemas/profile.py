@@ -0,0 +1,18 @@
+# schemas/profile.py
+
+from typing import Optional
+from pydantic import BaseModel
+
+
+# Metadatos de un perfil guardado por el profiler (services/profiler.py)
+class ProfileInfo(BaseModel):
+    name: str  # Nombre del perfil (también en la cabecera X-Profile-Id)
+    created: float  # Fecha de la petición (epoch en segundos)
+    request_id: str  # ID de la petición perfilada
+    method: str
+    path: str
+    route: Optional[str] = None  # Plantilla de la ruta, p. ej. /galleries/{id}
+    status: int
+    duration_ms: float
+    trigger: str  # 'header' o 'sample'
+    samples: int  # Muestras tomadas
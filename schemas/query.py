@@ -0,0 +1,18 @@
+# schemas/query.py
+
+from typing import Optional
+from pydantic import BaseModel
+
+
+# Estadísticas acumuladas de una sentencia SQL (services/query_inspector.py)
+class QueryStatementStats(BaseModel):
+    statement: str  # Sentencia SQL con parámetros
+    count: int  # Veces ejecutada
+    total_time_ms: float  # Tiempo total acumulado
+    avg_time_ms: float  # Tiempo medio por ejecución
+    max_time_ms: float  # Ejecución más lenta
+    slow_count: int  # Ejecuciones por encima de SLOW_QUERY_MS
+    repeated_requests: int  # Peticiones en las que se repitió (posible N+1)
+    routes: list[str]  # Rutas donde se detectó la repetición
+    plan: Optional[list[str]] = None  # Último EXPLAIN QUERY PLAN (solo consultas lentas)
+    full_scan: bool  # El plan recorre una tabla completa sin índice
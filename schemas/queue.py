@@ -0,0 +1,15 @@
+# schemas/queue.py
+
+from pydantic import BaseModel
+
+
+# Estado de una cola de trabajos
+class QueueStats(BaseModel):
+    queue: str  # Nombre de la cola
+    pending: int  # Trabajos esperando (incluye los reprogramados)
+    leased: int  # Trabajos en ejecución
+    done: int  # Trabajos terminados (hasta su purga)
+    dead: int  # Trabajos en la dead-letter
+    completed_last_window: int  # Terminados en la ventana consultada
+    throughput_per_second: float  # Trabajos terminados por segundo en la ventana
+    oldest_ready_age_seconds: float  # Antigüedad del trabajo listo más antiguo
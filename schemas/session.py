@@ -1,6 +1,6 @@
 # schemas/session.py
 
-#from typing import Optional
+from typing import Optional
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -8,5 +8,12 @@ from datetime import datetime
 class Session(BaseModel):
     id: int
     name: str
-    date: datetime  # Es mejor usar tipos de fecha adecuados
+    date: Optional[datetime] = None  # Columna DateTime; NULL si la fecha original no era válida
     photographer_id: int
+
+
+# Sesión con los totales usados en el panel del fotógrafo
+class SessionOverview(Session):
+    photo_count: int  # Fotos de la sesión
+    gallery_count: int  # Galerías que usan fotos de la sesión
+    selected_count: int  # Fotos de la sesión seleccionadas en alguna galería
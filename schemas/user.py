@@ -1,7 +1,8 @@
 # schemas/user.py
 
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, EmailStr
+from models.user import UserRole
 
  # Esquema para crear un nuevo usuario. Requiere nombre, correo y contraseña.
 class UserCreate(BaseModel):
@@ -16,8 +17,28 @@ class User(BaseModel):
     email: EmailStr
     password: str
 
+ # Esquema para listados de usuarios. Nunca incluye la contraseña.
+ # Todos los campos salvo el ID son opcionales porque el cliente elige cuáles recibir (fields=)
+class UserPublic(BaseModel):
+    id: int
+    name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    role: Optional[UserRole] = None
+    photographer_id: Optional[int] = None
+
  # Esquema para actualizar la información de un usuario. Todos los campos son opcionales.
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None
-    password: Optional[str] = None
\ No newline at end of file
+    password: Optional[str] = None
+
+ # Error de una fila en una importación masiva de usuarios
+class UserImportError(BaseModel):
+    row: int  # Número de fila (empezando en 1)
+    email: Optional[str] = None
+    error: str
+
+ # Resultado de una importación masiva de usuarios
+class UserImportResult(BaseModel):
+    created: int  # Usuarios creados
+    errors: List[UserImportError] = []  # Filas rechazadas y el motivo
@@ -0,0 +1,70 @@
+# scripts/backup.py
+
+"""
+Instrucciones de Ejecución:
+
+Este script hace una copia de seguridad en caliente de la base de datos
+(DATABASE_URL) en BACKUP_DIR, sin detener la API ni bloquear a los escritores.
+Debe ejecutarse desde el directorio raíz del proyecto usando el módulo Python.
+
+1. Copia de seguridad (data/backups/backup-AAAAMMDD-HHMMSS.db):
+   python -m scripts.backup
+
+2. Exportación comprimida con gzip (.db.gz):
+   python -m scripts.backup --compress
+
+3. Pasos más pequeños y pausas más largas (menos impacto, más lenta):
+   python -m scripts.backup --pages 64 --sleep 0.02
+
+Notas:
+- Usa la API de backup de SQLite sobre una instantánea fija (ver services/backup.py)
+- El progreso también se puede consultar en GET /admin/backups
+- Termina con código 1 si la copia falla o si ya hay otra en curso (API u otro script)
+"""
+
+import argparse
+import sys
+
+from services import backup
+
+
+def show_progress(status: backup.Backup):
+    if status.status != "running":
+        return
+    if status.phase == "compress":
+        # El progreso se guarda en cada bloque comprimido: se avisa una vez
+        if not getattr(show_progress, "compressing", False):
+            show_progress.compressing = True
+            print("🗜️ Comprimiendo...")
+    elif status.pages_total:
+        percent = 100 * status.pages_copied / status.pages_total
+        print(f"📄 {status.pages_copied}/{status.pages_total} páginas ({percent:.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copia de seguridad en caliente de la base de datos")
+    parser.add_argument("--compress", action="store_true", help="Exporta la copia comprimida con gzip")
+    parser.add_argument("--pages", type=int, default=backup.PAGES_PER_STEP, help="Páginas copiadas por paso")
+    parser.add_argument("--sleep", type=float, default=backup.STEP_SLEEP, help="Segundos de pausa entre pasos")
+    args = parser.parse_args()
+
+    print(f"🚀 Copiando {backup.database_path()} en {backup.BACKUP_DIR.resolve()}...")
+    try:
+        result = backup.run(
+            compress=args.compress,
+            pages_per_step=args.pages,
+            step_sleep=args.sleep,
+            on_progress=show_progress,
+        )
+    except backup.BackupInProgress as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if result.status != "done":
+        print(f"❌ Error en la copia: {result.error}")
+        sys.exit(1)
+    print(f"✅ Copia terminada: {backup.BACKUP_DIR / result.file} ({result.bytes} bytes)")
+
+
+if __name__ == "__main__":
+    main()
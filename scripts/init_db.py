@@ -11,19 +11,36 @@ Este script debe ejecutarse desde el directorio raíz del proyecto usando el mó
 2. Para reiniciar la base de datos (elimina todo y recrea desde cero):
    python -m scripts.init_db --reset
 
+3. Para generar datos sintéticos a escala de producción (benchmarks):
+   python -m scripts.init_db --generate [parámetros]
+
 Ejemplos de uso:
     # Estando en el directorio raíz del proyecto:
     > python -m scripts.init_db         # Inicialización segura
     > python -m scripts.init_db --reset # Reinicio completo (¡Cuidado! Elimina datos existentes)
 
+    # ~10M filas en gallery_photos: 200 fotógrafos x 20 sesiones x 5 galerías de 500 fotos
+    > python -m scripts.init_db --generate --photographers 200 --sessions-per-photographer 20 \
+          --photos-per-session 500 --gallery-sizes 500,500,500,500,500
+
+    # Generar en otra base de datos
+    > DATABASE_URL=sqlite:///./data/db/bench.db python -m scripts.init_db --generate
+
 Notas:
 - La opción --reset eliminará TODOS los datos existentes
 - Asegúrese de tener respaldo antes de usar --reset
 - El script creará usuarios de ejemplo por defecto
+- Los usuarios generados usan la contraseña "generado123"
 """
 
 # Importaciones necesarias
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import islice
 from config.db import get_db, engine, meta
+from models.migrations import clear_schema_fingerprint, ensure_schema
 from config.security import get_password_hash
 from models.user import users  # Importar la tabla de usuarios
 from models.gallery import galleries  # Importar la tabla de galerías
@@ -32,6 +49,7 @@ from models.photo import photos  # Importar la tabla de fotografías
 from models.gallery_photos import (
     gallery_photos,
 )  # Importar la tabla de fotografías en galerías
+from services.ranking import initial_rank  # Posición de las fotos en la galería
 
 
 # Función para inicializar la base de datos
@@ -43,8 +61,8 @@ def init_db():
     try:
         print("🚀 Iniciando creación de base de datos...")
 
-        # Crear todas las tablas definidas en el metadata
-        meta.create_all(engine)
+        # Crear todas las tablas definidas en el metadata y aplicar las migraciones
+        ensure_schema(force=True)
         print("✅ Tablas creadas correctamente")
 
         # Usar el context manager get_db para manejar la conexión
@@ -55,13 +73,19 @@ def init_db():
             if not result:
                 print("📝 Insertando usuarios de ejemplo...")
 
+                # Cada contraseña distinta se hashea una sola vez (bcrypt es lento)
+                hashes = {
+                    password: get_password_hash(password)
+                    for password in ("admin123", "foto123", "cliente123")
+                }
+
                 # Insertar usuarios de ejemplo con IDs específicos
                 usuarios = [
                     {
                         "id": 1,
                         "name": "Admin",
                         "email": "admin@example.com",
-                        "password": get_password_hash("admin123"),
+                        "password": hashes["admin123"],
                         "role": "admin",
                         "photographer_id": None,  # Admin no tiene fotógrafo asignado
                     },
@@ -69,7 +93,7 @@ def init_db():
                         "id": 2,
                         "name": "Fotógrafo",
                         "email": "fotografo@example.com",
-                        "password": get_password_hash("foto123"),
+                        "password": hashes["foto123"],
                         "role": "photographer",
                         "photographer_id": None,  # Fotógrafo no tiene fotógrafo asignado
                     },
@@ -77,7 +101,7 @@ def init_db():
                         "id": 3,
                         "name": "Cliente",
                         "email": "cliente@example.com",
-                        "password": get_password_hash("cliente123"),
+                        "password": hashes["cliente123"],
                         "role": "client",
                         "photographer_id": 2,  # Cliente asignado al fotógrafo (ID 2)
                     },
@@ -85,7 +109,7 @@ def init_db():
                         "id": 4,
                         "name": "Cliente 4",
                         "email": "cliente4@example.com",
-                        "password": get_password_hash("cliente123"),
+                        "password": hashes["cliente123"],
                         "role": "client",
                         "photographer_id": 2,  # Cliente asignado al fotógrafo (ID 2)
                     },
@@ -93,7 +117,7 @@ def init_db():
                         "id": 5,
                         "name": "Cliente 5",
                         "email": "cliente5@example.com",
-                        "password": get_password_hash("cliente123"),
+                        "password": hashes["cliente123"],
                         "role": "client",
                         "photographer_id": 2,  # Cliente asignado al fotógrafo (ID 2)
                     },
@@ -101,7 +125,7 @@ def init_db():
                         "id": 6,
                         "name": "Fotógrafo 6",
                         "email": "fotografo6@example.com",
-                        "password": get_password_hash("foto123"),
+                        "password": hashes["foto123"],
                         "role": "photographer",
                         "photographer_id": None,  # Fotógrafo no tiene fotógrafo asignado
                     },
@@ -109,7 +133,7 @@ def init_db():
                         "id": 7,
                         "name": "Cliente 7",
                         "email": "cliente7@example.com",
-                        "password": get_password_hash("cliente123"),
+                        "password": hashes["cliente123"],
                         "role": "client",
                         "photographer_id": 6,  # Cliente asignado al fotógrafo (ID 6)
                     },
@@ -117,15 +141,14 @@ def init_db():
                         "id": 8,
                         "name": "Cliente 8",
                         "email": "cliente8@example.com",
-                        "password": get_password_hash("cliente123"),
+                        "password": hashes["cliente123"],
                         "role": "client",
                         "photographer_id": 6,  # Cliente asignado al fotógrafo (ID 6)
                     },
                 ]
 
-                # Insertar usuarios uno por uno para mantener los IDs específicos
-                for usuario in usuarios:
-                    conn.execute(users.insert().values(usuario))
+                # Insertar todos los usuarios con un solo executemany (mantiene los IDs)
+                conn.execute(users.insert(), usuarios)
                 print("✅ Usuarios de ejemplo creados correctamente")
 
                 # Insertar sesiones de ejemplo
@@ -134,26 +157,25 @@ def init_db():
                     {
                         "id": 1,
                         "name": "Boda María y Juan",
-                        "date": "2025-02-15",
+                        "date": datetime(2025, 2, 15),
                         "photographer_id": 2,
                     },
                     {
                         "id": 2,
                         "name": "Sesión Familiar López",
-                        "date": "2025-02-20",
+                        "date": datetime(2025, 2, 20),
                         "photographer_id": 2,
                     },
                     {
                         "id": 3,
                         "name": "Evento Corporativo XYZ",
-                        "date": "2025-03-01",
+                        "date": datetime(2025, 3, 1),
                         "photographer_id": 6,
                     },
                 ]
 
                 # Insertar sesiones
-                for sesion in sesiones:
-                    conn.execute(sessions.insert().values(sesion))
+                conn.execute(sessions.insert(), sesiones)
                 print("✅ Sesiones de ejemplo creadas correctamente")
 
                 # Insertar fotos de ejemplo
@@ -185,8 +207,7 @@ def init_db():
                     },
                 ]
 
-                for foto in fotos:
-                    conn.execute(photos.insert().values(foto))
+                conn.execute(photos.insert(), fotos)
                 print("✅ Fotos de ejemplo creadas correctamente")
 
                 # Insertar galerías de ejemplo
@@ -216,8 +237,7 @@ def init_db():
                 ]
 
                 # Insertar galerías
-                for galeria in galerias:
-                    conn.execute(galleries.insert().values(galeria))
+                conn.execute(galleries.insert(), galerias)
                 print("✅ Galerías de ejemplo creadas correctamente")
 
                 # Insertar relaciones entre galerías y fotos
@@ -225,6 +245,7 @@ def init_db():
                 galeria_fotos = [
                     {
                         "id": 1,
+                        "rank": initial_rank(1),  # En el orden en que se añaden
                         "gallery_id": 1,  # Galería "Boda María y Juan"
                         "photo_id": 1,  # Foto "boda_001.jpg"
                         "selected": True,
@@ -232,6 +253,7 @@ def init_db():
                     },
                     {
                         "id": 2,
+                        "rank": initial_rank(2),  # En el orden en que se añaden
                         "gallery_id": 1,  # Galería "Boda María y Juan"
                         "photo_id": 2,  # Foto "boda_002.jpg"
                         "selected": True,
@@ -239,6 +261,7 @@ def init_db():
                     },
                     {
                         "id": 3,
+                        "rank": initial_rank(3),  # En el orden en que se añaden
                         "gallery_id": 2,  # Galería "Sesión Familiar López"
                         "photo_id": 3,  # Foto "familia_001.jpg"
                         "selected": False,
@@ -246,6 +269,7 @@ def init_db():
                     },
                     {
                         "id": 4,
+                        "rank": initial_rank(4),  # En el orden en que se añaden
                         "gallery_id": 3,  # Galería "Evento Corporativo XYZ"
                         "photo_id": 4,  # Foto "evento_001.jpg"
                         "selected": False,
@@ -254,8 +278,7 @@ def init_db():
                 ]
 
                 # Insertar relaciones
-                for galeria_foto in galeria_fotos:
-                    conn.execute(gallery_photos.insert().values(galeria_foto))
+                conn.execute(gallery_photos.insert(), galeria_fotos)
                 print("✅ Relaciones entre galerías y fotos creadas correctamente")
 
                 # No necesitamos hacer commit explícito porque get_db lo maneja
@@ -275,6 +298,7 @@ def reset_db():
     try:
         print("🗑️ Eliminando tablas existentes...")
         meta.drop_all(engine)
+        clear_schema_fingerprint(engine)
         print("✅ Tablas eliminadas correctamente")
 
         # Volver a crear las tablas
@@ -285,11 +309,233 @@ def reset_db():
         raise e
 
 
+# Contraseña de todos los usuarios generados
+GENERATED_PASSWORD = "generado123"
+
+
+def _next_id(conn, table) -> int:
+    """Primer ID libre de la tabla (los IDs generados son consecutivos)."""
+    return conn.exec_driver_sql(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table.name}").scalar()
+
+
+def _bulk_insert(conn, table, columns: list[str], rows, batch_size: int) -> int:
+    """
+    Inserta las filas (tuplas) con executemany en lotes de batch_size,
+    confirmando cada lote en su propia transacción.
+
+    Usa el cursor de la DBAPI directamente: con millones de filas el
+    procesamiento de parámetros de SQLAlchemy domina el tiempo de carga.
+    """
+    sql = (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    total = 0
+    start = time.perf_counter()
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        conn.exec_driver_sql(sql, batch)
+        conn.commit()
+        total += len(batch)
+        elapsed = time.perf_counter() - start
+        print(f"   {table.name}: {total:,} filas ({total / elapsed:,.0f} filas/s)")
+    return total
+
+
+def generate_data(
+    photographers: int = 10,
+    clients_per_photographer: int = 5,
+    sessions_per_photographer: int = 10,
+    photos_per_session: int = 200,
+    gallery_sizes: tuple[int, ...] = (50, 200),
+    selection_ratio: float = 0.2,
+    favorite_ratio: float = 0.05,
+    batch_size: int = 200_000,
+    seed: int = 42,
+):
+    """
+    Genera datos sintéticos a escala de producción.
+
+    Por cada fotógrafo se crean sus clientes y sesiones; cada sesión tiene
+    photos_per_session fotos y una galería por cada tamaño de gallery_sizes
+    (para un cliente aleatorio del fotógrafo) con un tramo consecutivo de
+    las fotos de la sesión. Cada foto de una galería está seleccionada con
+    probabilidad selection_ratio y es favorita con probabilidad favorite_ratio.
+
+    Filas en gallery_photos:
+        photographers * sessions_per_photographer * sum(min(tamaño, photos_per_session))
+    """
+    rng = random.Random(seed)
+    ensure_schema(force=True)
+
+    # bcrypt tarda ~0.1 s por hash: un único hash para todos los usuarios
+    password = get_password_hash(GENERATED_PASSWORD)
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        # Pragmas para la carga: sin fsync por transacción y caché grande.
+        # Un corte de luz durante la carga puede corromper la base de datos.
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql("PRAGMA cache_size=-262144")  # 256 MB
+        conn.exec_driver_sql("PRAGMA temp_store=MEMORY")
+
+        # Los índices secundarios se quitan durante la carga y se
+        # reconstruyen al final: crear un índice de golpe es mucho más rápido
+        # que mantenerlo fila a fila
+        print("🗂️ Eliminando índices secundarios durante la carga...")
+        for table in meta.sorted_tables:
+            for index in table.indexes:
+                index.drop(conn, checkfirst=True)
+        conn.commit()
+
+        try:
+            first_user = _next_id(conn, users)
+            first_session = _next_id(conn, sessions)
+            first_photo = _next_id(conn, photos)
+            first_gallery = _next_id(conn, galleries)
+
+            # IDs: cada fotógrafo va seguido de sus clientes
+            block = 1 + clients_per_photographer
+            photographer_ids = [first_user + n * block for n in range(photographers)]
+
+            def user_rows():
+                for photographer_id in photographer_ids:
+                    yield (photographer_id, f"Fotógrafo {photographer_id}",
+                           f"fotografo{photographer_id}@generado.example.com",
+                           password, "photographer", None)
+                    for client_id in range(photographer_id + 1, photographer_id + block):
+                        yield (client_id, f"Cliente {client_id}",
+                               f"cliente{client_id}@generado.example.com",
+                               password, "client", photographer_id)
+
+            print("👤 Generando usuarios...")
+            _bulk_insert(conn, users,
+                         ["id", "name", "email", "password", "role", "photographer_id"],
+                         user_rows(), batch_size)
+
+            # Sesiones numeradas de forma consecutiva, por fotógrafo
+            base_date = datetime(2023, 1, 1)
+
+            def session_rows():
+                session_id = first_session
+                for photographer_id in photographer_ids:
+                    for _ in range(sessions_per_photographer):
+                        date = base_date + timedelta(days=rng.randrange(3 * 365))
+                        yield (session_id, f"Sesión {session_id}", date.strftime("%Y-%m-%d %H:%M:%S.%f"),
+                               photographer_id)
+                        session_id += 1
+
+            print("📸 Generando sesiones...")
+            _bulk_insert(conn, sessions, ["id", "name", "date", "photographer_id"],
+                         session_rows(), batch_size)
+
+            total_sessions = photographers * sessions_per_photographer
+
+            def photo_rows():
+                photo_id = first_photo
+                for n in range(total_sessions):
+                    session_id = first_session + n
+                    for number in range(photos_per_session):
+                        yield (photo_id, f"Foto {number} de la sesión {session_id}",
+                               f"/uploads/sessions/{session_id}/foto_{number:05d}.jpg", session_id)
+                        photo_id += 1
+
+            print("📷 Generando fotos...")
+            _bulk_insert(conn, photos, ["id", "description", "path", "session_id"],
+                         photo_rows(), batch_size)
+
+            # Galerías: una por tamaño y sesión, para un cliente aleatorio del fotógrafo.
+            # Se guarda el tramo de fotos de cada una para generar gallery_photos.
+            gallery_ranges = []
+
+            def gallery_rows():
+                gallery_id = first_gallery
+                for n in range(total_sessions):
+                    photographer_id = photographer_ids[n // sessions_per_photographer]
+                    session_first_photo = first_photo + n * photos_per_session
+                    for size in gallery_sizes:
+                        size = min(size, photos_per_session)
+                        offset = rng.randrange(photos_per_session - size + 1)
+                        client_id = (
+                            photographer_id + 1 + rng.randrange(clients_per_photographer)
+                            if clients_per_photographer else None
+                        )
+                        gallery_ranges.append((gallery_id, session_first_photo + offset, size))
+                        yield (gallery_id, f"Galería {gallery_id}", f"{size} fotos de la sesión",
+                               photographer_id, client_id)
+                        gallery_id += 1
+
+            print("🖼️ Generando galerías...")
+            _bulk_insert(conn, galleries,
+                         ["id", "name", "description", "photographer_id", "client_id"],
+                         gallery_rows(), batch_size)
+
+            # Ordenadas por (gallery_id, photo_id): el índice único crece por el final
+            def gallery_photo_rows():
+                random_value = rng.random
+                for gallery_id, first, size in gallery_ranges:
+                    for position, photo_id in enumerate(range(first, first + size), 1):
+                        yield (gallery_id, photo_id,
+                               random_value() < selection_ratio,
+                               random_value() < favorite_ratio,
+                               initial_rank(position))
+
+            print("🔗 Generando relaciones entre galerías y fotos...")
+            _bulk_insert(conn, gallery_photos, ["gallery_id", "photo_id", "selected", "favorite", "rank"],
+                         gallery_photo_rows(), batch_size)
+
+        finally:
+            print("🗂️ Reconstruyendo índices...")
+            for table in meta.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+            # Estadísticas para el planificador de consultas
+            conn.exec_driver_sql("ANALYZE")
+            conn.exec_driver_sql("PRAGMA synchronous=NORMAL")
+            conn.commit()
+            # Pasar el WAL a la base de datos y dejarlo vacío
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    print(f"✅ Datos generados en {time.perf_counter() - start:.1f} s")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inicializa la base de datos")
+    parser.add_argument("--reset", action="store_true", help="Elimina todas las tablas y las vuelve a crear")
+    parser.add_argument("--generate", action="store_true", help="Genera datos sintéticos a escala de producción")
+    parser.add_argument("--photographers", type=int, default=10)
+    parser.add_argument("--clients-per-photographer", type=int, default=5)
+    parser.add_argument("--sessions-per-photographer", type=int, default=10)
+    parser.add_argument("--photos-per-session", type=int, default=200)
+    parser.add_argument("--gallery-sizes", default="50,200", help="Tamaños de las galerías de cada sesión, separados por comas")
+    parser.add_argument("--selection-ratio", type=float, default=0.2, help="Fracción de fotos seleccionadas")
+    parser.add_argument("--favorite-ratio", type=float, default=0.05, help="Fracción de fotos favoritas")
+    parser.add_argument("--batch-size", type=int, default=200_000, help="Filas por transacción")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para obtener siempre los mismos datos")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    import sys
+    args = parse_args()
 
-    if len(sys.argv) > 1 and sys.argv[1] == "--reset":
+    if args.reset:
         print("⚠️ Reiniciando la base de datos...")
         reset_db()
-    else:
+    elif not args.generate:
         init_db()
+
+    if args.generate:
+        generate_data(
+            photographers=args.photographers,
+            clients_per_photographer=args.clients_per_photographer,
+            sessions_per_photographer=args.sessions_per_photographer,
+            photos_per_session=args.photos_per_session,
+            gallery_sizes=tuple(int(size) for size in args.gallery_sizes.split(",")),
+            selection_ratio=args.selection_ratio,
+            favorite_ratio=args.favorite_ratio,
+            batch_size=args.batch_size,
+            seed=args.seed,
+        )
@@ -0,0 +1,140 @@
+# scripts/worker.py
+
+"""
+Instrucciones de Ejecución:
+
+Este script arranca los workers que consumen la cola de trabajos (tabla 'jobs').
+Debe ejecutarse desde el directorio raíz del proyecto usando el módulo Python.
+
+1. Un único worker sobre la cola por defecto:
+   python -m scripts.worker
+
+2. Varios procesos en paralelo (cada uno reserva sus propios trabajos):
+   python -m scripts.worker --processes 4
+
+3. Otra cola y otro intervalo de sondeo:
+   python -m scripts.worker --queue exports --poll-interval 2
+
+Notas:
+- Los workers se detienen limpiamente con Ctrl+C o SIGTERM (terminan el trabajo en curso)
+- Un worker que muere deja su trabajo reservado; vuelve a la cola al agotarse
+  el tiempo de visibilidad de la tarea
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import time
+import traceback
+
+from config.logging import setup_logging, stop_logging
+import services.tasks  # noqa: F401 - Registra las tareas disponibles
+from config.db import engine
+from models.migrations import ensure_schema
+from services.queue import lease, extend_lease, complete, fail, get_task, DEFAULT_VISIBILITY_TIMEOUT
+
+
+logger = logging.getLogger("scripts.worker")
+
+# Indica si el worker debe detenerse tras el trabajo en curso
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def run_job(job):
+    """Ejecuta un trabajo reservado y registra su resultado en la cola."""
+    spec = get_task(job.task)
+    if spec is None:
+        status = fail(job, f"Tarea desconocida: {job.task}")
+        logger.error("Trabajo %s: tarea desconocida '%s' (%s)", job.id, job.task, status)
+        return
+
+    try:
+        spec.func(**json.loads(job.payload))
+    except Exception:
+        status = fail(job, traceback.format_exc())
+        logger.exception("Trabajo %s (%s) falló, intento %s/%s (%s)", job.id, job.task, job.attempts, job.max_attempts, status)
+        return
+
+    if complete(job):
+        logger.info("Trabajo %s (%s) completado", job.id, job.task)
+    else:
+        logger.warning("Trabajo %s (%s) terminó tras perder su reserva", job.id, job.task)
+
+
+def worker_loop(queue: str, poll_interval: float, visibility_timeout: int):
+    """Bucle principal de un proceso worker."""
+    setup_logging()
+
+    # Las conexiones heredadas del proceso padre no deben reutilizarse tras el fork
+    engine.dispose(close=False)
+
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+    logger.info("Worker %s consumiendo la cola '%s'", os.getpid(), queue)
+
+    while not _stopping:
+        job = lease(queue, visibility_timeout)
+        if job is None:
+            # Cola vacía: esperar con jitter para no sondear todos a la vez
+            time.sleep(poll_interval * random.uniform(0.5, 1.5))
+            continue
+
+        # El tiempo de visibilidad real depende de la tarea, no del valor por defecto
+        spec = get_task(job.task)
+        if spec is not None and spec.visibility_timeout != visibility_timeout:
+            extend_lease(job, spec.visibility_timeout)
+
+        run_job(job)
+
+    logger.info("Worker %s detenido", os.getpid())
+    stop_logging()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workers de la cola de trabajos")
+    parser.add_argument("--queue", default="default", help="Cola a consumir")
+    parser.add_argument("--processes", type=int, default=1, help="Número de procesos worker")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Segundos entre sondeos con la cola vacía")
+    parser.add_argument("--visibility-timeout", type=int, default=DEFAULT_VISIBILITY_TIMEOUT, help="Segundos antes de que un trabajo reservado vuelva a la cola")
+    args = parser.parse_args()
+
+    # Crea las tablas o aplica las migraciones si hace falta (una vez, antes de los procesos)
+    ensure_schema()
+
+    worker_args = (args.queue, args.poll_interval, args.visibility_timeout)
+
+    if args.processes <= 1:
+        worker_loop(*worker_args)
+        return
+
+    processes = [
+        multiprocessing.Process(target=worker_loop, args=worker_args)
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    # El proceso padre reenvía la señal de parada a los hijos y espera a que terminen
+    def _stop_children(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, _stop_children)
+    signal.signal(signal.SIGTERM, _stop_children)
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# services/backup.py
+"""
+Copias de seguridad en caliente de la base de datos SQLite
+
+Copiar el fichero .db con la API en marcha puede dejar una copia corrupta
+(páginas a medio escribir, WAL sin aplicar). Aquí se usa la API de backup
+de SQLite, que copia las páginas de forma consistente, por pasos:
+
+    - Cada paso copia BACKUP_PAGES_PER_STEP páginas y después el hilo
+      duerme BACKUP_STEP_SLEEP segundos: los escritores (y el GIL) no
+      esperan a que termine una copia de varios GB.
+    - La conexión de origen mantiene abierta una transacción de lectura
+      durante toda la copia. Con WAL los escritores no se bloquean y la
+      copia es una instantánea del momento en que empezó; sin ella, SQLite
+      reinicia la copia cada vez que otra conexión escribe y con tráfico
+      constante no terminaría nunca. Mientras dura, el checkpoint no puede
+      vaciar el WAL por detrás de esa instantánea (crece un poco).
+    - La copia se escribe como <id>.db.partial y se renombra al terminar.
+      Opcionalmente se comprime (gzip, por bloques y cediendo el hilo) y
+      queda solo <id>.db.gz.
+
+El progreso se guarda en <id>.json junto a la copia (como mucho una vez por
+segundo), así que cualquier worker de la API puede consultarlo.
+
+Solo se hace una copia a la vez entre todos los procesos (workers de la API
+y scripts/backup.py): la copia se reserva creando BACKUP_DIR/backup.lock
+con os.link, que falla si ya existe (atómico también entre procesos). El
+fichero lleva el ID de la copia y se borra al terminar; si el proceso muere
+sin borrarlo, la copia deja de actualizarse y pasados STALE_AFTER segundos
+el siguiente lo retira.
+
+Variables de entorno:
+    BACKUP_DIR              Carpeta de las copias (./data/backups)
+    BACKUP_PAGES_PER_STEP   Páginas por paso (256, 1 MB con páginas de 4 KB)
+    BACKUP_STEP_SLEEP       Pausa entre pasos en segundos (0.005)
+    BACKUP_COMPRESS_LEVEL   Nivel de gzip de la exportación comprimida (3)
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from config.db import engine
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", "./data/backups"))
+PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+STEP_SLEEP = float(os.getenv("BACKUP_STEP_SLEEP", "0.005"))
+COMPRESS_LEVEL = int(os.getenv("BACKUP_COMPRESS_LEVEL", "3"))
+
+# Bytes por bloque al comprimir
+COMPRESS_CHUNK = 1024 * 1024
+
+# Segundos entre escrituras del progreso en disco
+PROGRESS_INTERVAL = 1.0
+
+# Una copia 'running' cuyo progreso no se actualiza en este tiempo se da por
+# abandonada (el proceso que la hacía murió)
+STALE_AFTER = 60.0
+
+# Nombres válidos de copia (evita rutas fuera de BACKUP_DIR)
+BACKUP_NAME = re.compile(r"^backup-[0-9]{8}-[0-9]{6}(-[0-9]+)?$")
+
+# Reserva de la copia en curso (ver docstring del módulo)
+LOCK_NAME = "backup.lock"
+
+
+class BackupInProgress(RuntimeError):
+    """Ya hay una copia en curso."""
+
+
+class Backup:
+    """Estado y progreso de una copia de seguridad."""
+
+    def __init__(self, id: str, compress: bool):
+        self.id = id
+        self.compress = compress
+        self.status = "running"  # 'running', 'done' o 'failed'
+        self.phase = "copy"  # 'copy' o 'compress'
+        self.pages_total = 0
+        self.pages_copied = 0
+        self.file: Optional[str] = None
+        self.bytes: Optional[int] = None
+        self.started_at = time.time()
+        self.updated_at = self.started_at
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        # Se llama cada vez que se guarda el progreso (scripts/backup.py lo muestra)
+        self.on_progress: Optional[Callable[["Backup"], None]] = None
+        self._saved_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "phase": self.phase,
+            "compress": self.compress,
+            "pages_total": self.pages_total,
+            "pages_copied": self.pages_copied,
+            "progress": self.pages_copied / self.pages_total if self.pages_total else 0.0,
+            "file": self.file,
+            "bytes": self.bytes,
+            "started_at": self.started_at,
+            "updated_at": self.updated_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    def save(self, force: bool = False):
+        """Guarda el progreso en <id>.json (como mucho cada PROGRESS_INTERVAL salvo force)."""
+        now = time.time()
+        self.updated_at = now
+        if not force and now - self._saved_at < PROGRESS_INTERVAL:
+            return
+        self._saved_at = now
+        path = BACKUP_DIR / f"{self.id}.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.to_dict()))
+        os.replace(tmp, path)
+        if self.on_progress is not None:
+            self.on_progress(self)
+
+
+def database_path() -> Path:
+    """Fichero de la base de datos configurada (DATABASE_URL)."""
+    return Path(engine.url.database).resolve()
+
+
+def _copy(backup: Backup, destination: Path, pages_per_step: int, step_sleep: float):
+    """Copia la base de datos con la API de backup, por pasos."""
+    source = sqlite3.connect(database_path(), isolation_level=None, timeout=30)
+    target = sqlite3.connect(destination)
+    try:
+        # Instantánea fija durante toda la copia (ver docstring del módulo)
+        source.execute("BEGIN")
+        source.execute("SELECT count(*) FROM sqlite_master").fetchall()
+
+        def progress(status, remaining, total):
+            backup.pages_total = total
+            backup.pages_copied = total - remaining
+            backup.save()
+            # Ceder la base de datos y el GIL entre pasos
+            if remaining and step_sleep > 0:
+                time.sleep(step_sleep)
+
+        source.backup(target, pages=pages_per_step, progress=progress)
+        source.execute("COMMIT")
+
+        # La copia es un único fichero autónomo (sin -wal)
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+
+
+def _compress(backup: Backup, source: Path, destination: Path, step_sleep: float):
+    """Comprime la copia con gzip por bloques, cediendo el hilo entre bloques."""
+    with open(source, "rb") as raw, gzip.open(destination, "wb", compresslevel=COMPRESS_LEVEL) as packed:
+        while chunk := raw.read(COMPRESS_CHUNK):
+            packed.write(chunk)
+            # Con una base de datos de varios GB la compresión dura minutos:
+            # sin guardar el progreso la copia se daría por abandonada
+            backup.save()
+            if step_sleep > 0:
+                time.sleep(step_sleep)
+
+
+def run(
+    compress: bool = False,
+    pages_per_step: int = PAGES_PER_STEP,
+    step_sleep: float = STEP_SLEEP,
+    backup: Optional[Backup] = None,
+    on_progress: Optional[Callable[[Backup], None]] = None,
+) -> Backup:
+    """
+    Hace una copia completa en el hilo actual y devuelve su estado final
+    (status 'done' o 'failed'). La usan start() y scripts/backup.py.
+
+    backup es una copia ya reservada con claim(); sin ella se reserva aquí
+    (BackupInProgress si hay otra en curso en este u otro proceso). La
+    reserva se libera al terminar.
+    """
+    if backup is None:
+        backup = claim(compress)
+    if on_progress is not None:
+        backup.on_progress = on_progress
+
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    partial = BACKUP_DIR / f"{backup.id}.db.partial"
+    final = BACKUP_DIR / f"{backup.id}.db"
+    backup.save(force=True)
+    logger.info("Copia de seguridad %s iniciada", backup.id)
+
+    try:
+        _copy(backup, partial, pages_per_step, step_sleep)
+        os.replace(partial, final)
+
+        if backup.compress:
+            backup.phase = "compress"
+            backup.save(force=True)
+            packed = final.with_name(f"{final.name}.gz")
+            packed_partial = packed.with_name(f"{packed.name}.partial")
+            _compress(backup, final, packed_partial, step_sleep)
+            os.replace(packed_partial, packed)
+            final.unlink()
+            final = packed
+
+        backup.status = "done"
+        backup.file = final.name
+        backup.bytes = final.stat().st_size
+        logger.info("Copia de seguridad %s terminada: %s (%s bytes)", backup.id, backup.file, backup.bytes)
+    except Exception as e:
+        logger.exception("Error en la copia de seguridad %s", backup.id)
+        backup.status = "failed"
+        backup.error = str(e)
+        for leftover in BACKUP_DIR.glob(f"{backup.id}.db*.partial"):
+            leftover.unlink(missing_ok=True)
+    finally:
+        backup.finished_at = time.time()
+        backup.save(force=True)
+        release(backup)
+    return backup
+
+
+def _new_backup(compress: bool) -> Backup:
+    """Copia con un nombre libre (con sufijo si ya hay otra en el mismo segundo)."""
+    base = f"backup-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    id, n = base, 1
+    while any(BACKUP_DIR.glob(f"{id}.*")):
+        n += 1
+        id = f"{base}-{n}"
+    return Backup(id, compress)
+
+
+def _lock_is_stale(lock: Path) -> bool:
+    """True si la copia que reservó el fichero ya no está en curso."""
+    try:
+        holder = lock.read_text().strip()
+        age = time.time() - lock.stat().st_mtime
+    except FileNotFoundError:
+        return True
+    info = get_backup(holder)
+    if info is None:
+        # Recién reservada (aún sin <id>.json) o de una copia borrada
+        return age > STALE_AFTER
+    # get_backup() da por fallida una copia 'running' que no se actualiza
+    return info["status"] != "running"
+
+
+def claim(compress: bool) -> Backup:
+    """
+    Reserva la copia (BACKUP_DIR/backup.lock) y la registra como 'running'.
+    BackupInProgress si hay otra en curso en este u otro proceso. Quien la
+    reserva la libera con release() al terminar.
+    """
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    lock = BACKUP_DIR / LOCK_NAME
+    backup = _new_backup(compress)
+
+    # El ID se escribe antes en un fichero propio y se enlaza: el fichero de
+    # reserva nunca existe vacío
+    tmp = BACKUP_DIR / f".{LOCK_NAME}.{uuid.uuid4().hex}"
+    tmp.write_text(backup.id)
+    try:
+        for _ in range(2):
+            try:
+                os.link(tmp, lock)
+                break
+            except FileExistsError:
+                if not _lock_is_stale(lock):
+                    holder = lock.read_text().strip() if lock.exists() else "?"
+                    raise BackupInProgress(f"Ya hay una copia de seguridad en curso: {holder}")
+                # Se retira renombrándola: si dos procesos lo intentan, solo uno lo consigue
+                logger.warning("Retirando la reserva de una copia abandonada")
+                try:
+                    os.replace(lock, tmp.with_name(f"{tmp.name}.stale"))
+                    os.unlink(tmp.with_name(f"{tmp.name}.stale"))
+                except FileNotFoundError:
+                    pass
+        else:
+            raise BackupInProgress("Ya hay una copia de seguridad en curso")
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    try:
+        backup.save(force=True)
+    except BaseException:
+        release(backup)
+        raise
+    return backup
+
+
+def release(backup: Backup):
+    """Libera la reserva, si sigue siendo de esta copia."""
+    lock = BACKUP_DIR / LOCK_NAME
+    try:
+        if lock.read_text().strip() == backup.id:
+            lock.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def start(compress: bool = False) -> Backup:
+    """Lanza una copia en un hilo en segundo plano. BackupInProgress si ya hay una."""
+    backup = claim(compress)
+
+    def worker():
+        run(backup=backup)
+
+    threading.Thread(target=worker, name=f"backup-{backup.id}", daemon=True).start()
+    return backup
+
+
+def get_backup(id: str) -> Optional[dict]:
+    """Estado de una copia, o None si no existe."""
+    if not BACKUP_NAME.match(id):
+        return None
+    path = BACKUP_DIR / f"{id}.json"
+    try:
+        info = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if info["status"] == "running" and time.time() - info["updated_at"] > STALE_AFTER:
+        # El proceso que la hacía terminó sin acabarla
+        info["status"] = "failed"
+        info["error"] = "Copia abandonada (el proceso se detuvo)"
+    return info
+
+
+def list_backups() -> list[dict]:
+    """Estado de las copias, de la más reciente a la más antigua."""
+    if not BACKUP_DIR.is_dir():
+        return []
+    backups = []
+    for path in BACKUP_DIR.glob("backup-*.json"):
+        info = get_backup(path.stem)
+        if info is not None:
+            backups.append(info)
+    backups.sort(key=lambda info: info["started_at"], reverse=True)
+    return backups
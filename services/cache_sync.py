@@ -0,0 +1,212 @@
+# services/cache_sync.py
+"""
+Invalidación de cachés entre procesos
+
+Con varios workers de uvicorn sobre el mismo archivo SQLite, cada proceso
+tiene sus propias cachés en memoria. Cuando un proceso invalida etiquetas
+(publish), añade una fila a la tabla cache_invalidations. Un hilo de cada
+worker (CacheSync) comprueba cada CACHE_SYNC_INTERVAL segundos si la base
+de datos ha cambiado con PRAGMA data_version (sin leer ninguna tabla) y,
+solo entonces, lee las filas nuevas y avisa a los suscriptores.
+
+No necesita servicios externos: el canal es la propia base de datos.
+
+Con un solo worker no hay nadie a quien avisar: publish() no escribe nada
+y el hilo no arranca. El número de workers se toma de WEB_CONCURRENCY, que
+uvicorn usa como valor por defecto de --workers; con varios workers hay que
+arrancarlo con WEB_CONCURRENCY=N en lugar de --workers N.
+
+Garantía de frescura: una escritura confirmada en un proceso deja de
+servirse desde la caché de los demás como mucho CACHE_SYNC_INTERVAL
+segundos después (más el tiempo de la consulta). Si un proceso deja de
+sincronizar más de PRUNE_AFTER segundos (las filas que no leyó pueden
+haberse borrado), vacía sus cachés por completo.
+
+Variables de entorno:
+    WEB_CONCURRENCY       Número de workers de uvicorn (1)
+    CACHE_SYNC_INTERVAL   Segundos entre comprobaciones (0.5)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from sqlalchemy import delete, insert
+
+from config.db import engine
+from models.cache_invalidation import cache_invalidations
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "0.5"))
+
+# Solo hace falta sincronizar si hay otros workers
+ENABLED = int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+
+# Segundos que se conservan las filas del registro
+PRUNE_AFTER = 300
+
+# Cada cuánto se borran las filas antiguas
+PRUNE_INTERVAL = 60
+
+# Identificador de este proceso: sus propias filas no se vuelven a aplicar
+ORIGIN = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+# Funciones llamadas con la lista de etiquetas invalidadas por otro proceso,
+# o con None si hay que vaciar la caché entera
+_subscribers: list[Callable[[Optional[list[str]]], None]] = []
+
+
+def subscribe(callback: Callable[[Optional[list[str]]], None]):
+    """Registra una caché local para recibir las invalidaciones de otros procesos."""
+    _subscribers.append(callback)
+
+
+def publish(tags) -> None:
+    """Publica para los demás procesos las etiquetas invalidadas en este."""
+    tags = sorted(set(tags))
+    if not tags or not ENABLED:
+        return
+    with engine.begin() as conn:
+        conn.execute(
+            insert(cache_invalidations).values(
+                tags=json.dumps(tags), origin=ORIGIN, created_at=time.time()
+            )
+        )
+
+
+def _notify(tags: Optional[list[str]]):
+    for callback in _subscribers:
+        try:
+            callback(tags)
+        except Exception:
+            logger.exception("Error al aplicar una invalidación de caché")
+
+
+class CacheSync(threading.Thread):
+    """Hilo que aplica en este proceso las invalidaciones de los demás."""
+
+    def __init__(self, interval: float = SYNC_INTERVAL):
+        super().__init__(name="cache-sync", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._connection = None
+        self._data_version = None
+        self._last_id = 0
+        self._last_poll = time.monotonic()
+        self._last_prune = 0.0
+
+    def _connect(self):
+        # Conexión propia: data_version solo cambia con los commits de OTRAS conexiones
+        self._connection = engine.raw_connection()
+        cursor = self._connection.cursor()
+        try:
+            self._last_id = cursor.execute(
+                "SELECT COALESCE(MAX(id), 0) FROM cache_invalidations"
+            ).fetchone()[0]
+            self._data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            cursor.close()
+
+    def poll(self):
+        """Aplica las invalidaciones publicadas desde la última comprobación."""
+        if self._connection is None:
+            self._connect()
+            # Lo ocurrido mientras no había conexión se desconoce
+            _notify(None)
+
+        now = time.monotonic()
+        if now - self._last_poll > PRUNE_AFTER:
+            logger.warning("Sincronización de caché retrasada %.0f s, se vacía la caché", now - self._last_poll)
+            _notify(None)
+        self._last_poll = now
+
+        cursor = self._connection.cursor()
+        try:
+            data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+
+            rows = cursor.execute(
+                "SELECT id, tags, origin FROM cache_invalidations WHERE id > ? ORDER BY id",
+                (self._last_id,),
+            ).fetchall()
+            if not rows:
+                # Último ID asignado (AUTOINCREMENT: no baja aunque se borren
+                # las filas). Si es menor que el visto, los IDs han vuelto a
+                # empezar (tabla reconstruida o base de datos restaurada) y
+                # las filas nuevas quedarían ocultas
+                last_id = cursor.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'cache_invalidations'"
+                ).fetchone()[0]
+                if last_id < self._last_id:
+                    logger.warning("El registro de invalidaciones ha vuelto a empezar, se vacía la caché")
+                    self._last_id = last_id
+                    _notify(None)
+        finally:
+            cursor.close()
+
+        tags = set()
+        for row_id, row_tags, origin in rows:
+            self._last_id = row_id
+            if origin != ORIGIN:
+                tags.update(json.loads(row_tags))
+        if tags:
+            _notify(sorted(tags))
+
+    def prune(self):
+        """Borra las filas que ya han tenido tiempo de leer todos los procesos."""
+        with engine.begin() as conn:
+            conn.execute(
+                delete(cache_invalidations).where(
+                    cache_invalidations.c.created_at < time.time() - PRUNE_AFTER
+                )
+            )
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll()
+                if time.monotonic() - self._last_prune > PRUNE_INTERVAL:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception:
+                logger.exception("Error al sincronizar las invalidaciones de caché")
+                self._close()
+        self._close()
+
+    def _close(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_sync: Optional[CacheSync] = None
+
+
+def start():
+    """Arranca el hilo de sincronización de este proceso (una sola vez)."""
+    global _sync
+    if _sync is None and ENABLED:
+        _sync = CacheSync()
+        _sync.start()
+
+
+def stop():
+    """Detiene el hilo de sincronización."""
+    global _sync
+    if _sync is not None:
+        _sync.stop()
+        _sync.join(timeout=5)
+        _sync = None
@@ -0,0 +1,292 @@
+# services/fair_scheduler.py
+"""
+Reparto justo de la base de datos entre fotógrafos
+
+En un mismo servidor hay muchos estudios. Sin control, un fotógrafo con
+una galería de 20.000 fotos puede ocupar todas las conexiones y los
+clientes de los demás esperan. Este planificador se coloca delante de
+get_db():
+
+    - Como mucho DB_MAX_CONCURRENCY conexiones en uso a la vez entre
+      todas las peticiones con tenant.
+    - Como mucho TENANT_MAX_CONCURRENCY por tenant (cuota).
+    - Cuando no hay hueco, las peticiones esperan en la cola de su tenant
+      y los huecos libres se reparten con colas justas ponderadas (start-
+      time fair queuing): se atiende al tenant que menos tiempo de base de
+      datos ha consumido en proporción a su peso.
+
+El tenant de una petición es el fotógrafo: el propio usuario si es
+fotógrafo, o su fotógrafo si es cliente (lo fija get_current_user). Los
+administradores, el login, los workers y los scripts no tienen tenant y
+no pasan por el planificador.
+
+Si la espera supera TENANT_QUEUE_TIMEOUT se responde 503 con Retry-After.
+
+La espera bloquea el hilo (threading.Event.wait): get_db() con tenant solo
+puede usarse desde el threadpool (handlers síncronos o run_in_threadpool),
+nunca directamente en el bucle de eventos, donde pararía todas las demás
+peticiones del proceso. slot() lanza RuntimeError si se intenta.
+
+Variables de entorno:
+    FAIR_SCHEDULER_ENABLED   '1' (por defecto) para activarlo, '0' para desactivarlo
+    DB_MAX_CONCURRENCY       Conexiones simultáneas entre todos los tenants (8)
+    TENANT_MAX_CONCURRENCY   Conexiones simultáneas por tenant (4)
+    TENANT_WEIGHTS           Pesos por fotógrafo, p. ej. "12:2,40:0.5" (por defecto 1)
+    TENANT_QUEUE_TIMEOUT     Segundos máximos de espera por una conexión (10)
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+import config.db
+from middleware.metrics import Histogram, registry, render_histogram
+from models.user import UserRole
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("FAIR_SCHEDULER_ENABLED", "1") == "1"
+MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "8"))
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", "4"))
+QUEUE_TIMEOUT = float(os.getenv("TENANT_QUEUE_TIMEOUT", "10"))
+
+# Límites de los histogramas de espera y de uso (segundos)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _parse_weights(value: str) -> dict[int, float]:
+    """'12:2,40:0.5' -> {12: 2.0, 40: 0.5}"""
+    weights = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        tenant, _, weight = item.partition(":")
+        try:
+            weights[int(tenant)] = float(weight)
+        except ValueError:
+            logger.warning("Peso de tenant no válido en TENANT_WEIGHTS: %r", item)
+    return weights
+
+
+WEIGHTS = _parse_weights(os.getenv("TENANT_WEIGHTS", ""))
+
+# Tenant de la petición en curso (None: sin planificar)
+tenant_var: ContextVar[Optional[int]] = ContextVar("tenant", default=None)
+
+# True dentro de un get_db() que ya tiene hueco (los anidados no vuelven a
+# pedirlo). Es del contexto y no del hilo: Starlette ejecuta cada paso de un
+# generador en el hilo del pool que esté libre.
+_holding: ContextVar[bool] = ContextVar("fair_scheduler_holding", default=False)
+
+
+def tenant_for(user: dict) -> Optional[int]:
+    """Fotógrafo al que pertenece el trabajo de un usuario."""
+    if user["role"] == UserRole.photographer:
+        return user["id"]
+    if user["role"] == UserRole.client:
+        return user["photographer_id"]
+    return None
+
+
+def _on_event_loop() -> bool:
+    """True si el hilo actual está ejecutando un bucle de asyncio."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class TenantBusy(HTTPException):
+    """No se consiguió una conexión a tiempo (503 + Retry-After)."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Hay demasiadas operaciones en curso, inténtalo de nuevo en unos segundos",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class Ticket:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class TenantState:
+    """Cuota, cola y tiempo virtual de un tenant."""
+
+    def __init__(self, tenant: int, weight: float):
+        self.tenant = tenant
+        self.weight = weight
+        self.active = 0
+        self.waiting: deque[Ticket] = deque()
+        # Tiempo de base de datos consumido, dividido por el peso
+        self.virtual_finish = 0.0
+        self.wait = Histogram(WAIT_BUCKETS)
+        self.hold = Histogram(WAIT_BUCKETS)
+        self.timeouts = 0
+
+
+class FairScheduler:
+    """Semáforo con cuota por tenant y reparto justo ponderado de los huecos."""
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        tenant_limit: int = TENANT_MAX_CONCURRENCY,
+        weights: Optional[dict[int, float]] = None,
+        timeout: float = QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.tenant_limit = tenant_limit
+        self.weights = weights or {}
+        self.timeout = timeout
+        self.active = 0
+        self.virtual_time = 0.0
+        self._tenants: dict[int, TenantState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, tenant: int) -> TenantState:
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = self._tenants[tenant] = TenantState(tenant, self.weights.get(tenant, 1.0))
+        return state
+
+    def _has_room(self, state: TenantState) -> bool:
+        return self.active < self.max_concurrency and state.active < self.tenant_limit
+
+    def _grant(self, state: TenantState):
+        self.active += 1
+        state.active += 1
+        # Un tenant que vuelve tras estar inactivo no acumula crédito
+        self.virtual_time = max(self.virtual_time, state.virtual_finish)
+
+    def _dispatch(self):
+        """Reparte los huecos libres: primero el tenant con menor tiempo virtual."""
+        while self.active < self.max_concurrency:
+            candidates = [
+                state for state in self._tenants.values()
+                if state.waiting and state.active < self.tenant_limit
+            ]
+            if not candidates:
+                return
+            state = min(candidates, key=lambda s: max(s.virtual_finish, self.virtual_time))
+            ticket = state.waiting.popleft()
+            ticket.granted = True
+            self._grant(state)
+            ticket.event.set()
+
+    def _acquire(self, state: TenantState):
+        with self._lock:
+            # Las de otros tenants que esperan están limitadas por su cuota;
+            # con hueco global libre no compiten con esta
+            if not state.waiting and self._has_room(state):
+                self._grant(state)
+                return
+            ticket = Ticket()
+            state.waiting.append(ticket)
+
+        if ticket.event.wait(self.timeout):
+            return
+        with self._lock:
+            # Concedido justo al agotarse la espera
+            if ticket.granted:
+                return
+            state.waiting.remove(ticket)
+            state.timeouts += 1
+        raise TenantBusy(max(1, math.ceil(self.timeout / 2)))
+
+    def _release(self, state: TenantState, held: float):
+        with self._lock:
+            self.active -= 1
+            state.active -= 1
+            state.virtual_finish = max(state.virtual_finish, self.virtual_time) + held / state.weight
+            state.hold.observe(held)
+            self._dispatch()
+
+    @contextmanager
+    def slot(self):
+        """
+        Reserva una conexión para el tenant de la petición en curso.
+        Puede bloquear el hilo: no se debe llamar desde el bucle de eventos.
+        """
+        tenant = tenant_var.get()
+        if tenant is None or _holding.get():
+            yield
+            return
+
+        if _on_event_loop():
+            raise RuntimeError(
+                "get_db() con tenant desde el bucle de eventos: usar run_in_threadpool"
+            )
+
+        with self._lock:
+            state = self._state(tenant)
+        start = time.perf_counter()
+        self._acquire(state)
+        acquired = time.perf_counter()
+        with self._lock:
+            state.wait.observe(acquired - start)
+
+        token = _holding.set(True)
+        try:
+            yield
+        finally:
+            try:
+                _holding.reset(token)
+            except ValueError:
+                # Se cerró en otro contexto (un paso posterior de un generador)
+                _holding.set(False)
+            self._release(state, time.perf_counter() - acquired)
+
+    def metrics(self) -> list[str]:
+        """Métricas por tenant para GET /metrics."""
+        with self._lock:
+            states = sorted(self._tenants.values(), key=lambda s: s.tenant)
+            lines = [
+                "# HELP tenant_db_active Conexiones en uso por tenant",
+                "# TYPE tenant_db_active gauge",
+            ]
+            lines += [f'tenant_db_active{{tenant="{s.tenant}"}} {s.active}' for s in states]
+            lines += [
+                "# HELP tenant_db_queued Peticiones esperando conexión por tenant",
+                "# TYPE tenant_db_queued gauge",
+            ]
+            lines += [f'tenant_db_queued{{tenant="{s.tenant}"}} {len(s.waiting)}' for s in states]
+            lines += [
+                "# HELP tenant_db_timeouts_total Peticiones rechazadas por esperar demasiado",
+                "# TYPE tenant_db_timeouts_total counter",
+            ]
+            lines += [f'tenant_db_timeouts_total{{tenant="{s.tenant}"}} {s.timeouts}' for s in states]
+            lines += [
+                "# HELP tenant_db_wait_seconds Espera por una conexión",
+                "# TYPE tenant_db_wait_seconds histogram",
+            ]
+            for s in states:
+                lines += render_histogram("tenant_db_wait_seconds", f'tenant="{s.tenant}"', s.wait)
+            lines += [
+                "# HELP tenant_db_hold_seconds Tiempo con la conexión en uso",
+                "# TYPE tenant_db_hold_seconds histogram",
+            ]
+            for s in states:
+                lines += render_histogram("tenant_db_hold_seconds", f'tenant="{s.tenant}"', s.hold)
+            return lines
+
+
+# Planificador único del proceso
+scheduler = FairScheduler(weights=WEIGHTS)
+
+if ENABLED:
+    config.db.connection_gate = scheduler.slot
+    registry.register_collector(scheduler.metrics)
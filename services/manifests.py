@@ -0,0 +1,198 @@
+# services/manifests.py
+"""
+Manifiestos de galería: GET /galleries/{id} precalculado
+
+La vista de una galería se lee cientos de veces por cada escritura, pero
+calcularla une tres tablas (galleries, gallery_photos y photos). El
+manifiesto es el JSON ya serializado de esa respuesta, guardado en la tabla
+gallery_manifests, así que la lectura es una sola búsqueda por clave.
+
+    - Cada escritura que cambia lo que muestra una galería llama a
+      mark_stale() en su transacción: incrementa la versión de la galería
+      y encola la tarea "galleries.manifest", que lo regenera en un worker.
+    - build() genera el manifiesto de la versión actual y lo guarda solo si
+      es más nuevo que el guardado (dos generaciones simultáneas no pueden
+      dejar uno antiguo).
+    - Si una lectura encuentra el manifiesto desactualizado (el worker aún
+      no ha llegado), lo genera ella: nunca se sirven datos antiguos, p. ej.
+      al cliente que acaba de marcar una foto.
+
+La versión se devuelve en el propio JSON y en la cabecera X-Gallery-Version.
+
+Cada foto lleva su URL firmada (ver media_url en config/security.py). Las
+URLs valen al menos una ventana de MEDIA_URL_EXPIRE_SECONDS desde la ventana
+en que se generaron, así que un manifiesto de una ventana anterior también
+se considera desactualizado y se regenera.
+"""
+
+import time
+from typing import Optional
+
+from sqlalchemy import and_, delete, join, or_, select
+from sqlalchemy.dialects.sqlite import insert
+
+from config.db import get_db
+from config.security import media_url, media_url_window
+from models.gallery import galleries
+from models.gallery_manifest import gallery_manifests
+from models.gallery_photos import gallery_photos
+from models.photo import photos
+from schemas.gallery import GalleryWithPhotos
+from services.queue import enqueue_once
+
+MANIFEST_TASK = "galleries.manifest"
+VERSION_HEADER = "X-Gallery-Version"
+
+
+def mark_stale(db, gallery_ids):
+    """Marca los manifiestos como desactualizados y encola su regeneración (en la transacción de db)."""
+    ids = sorted(set(gallery_ids))
+    if not ids:
+        return
+    stmt = insert(gallery_manifests).on_conflict_do_update(
+        index_elements=[gallery_manifests.c.gallery_id],
+        set_={"version": gallery_manifests.c.version + 1},
+    )
+    db.execute(stmt, [{"gallery_id": gallery_id, "version": 1} for gallery_id in ids])
+    for gallery_id in ids:
+        enqueue_once(MANIFEST_TASK, {"gallery_id": gallery_id}, db=db)
+
+
+def is_fresh(manifest, now: Optional[float] = None) -> bool:
+    """True si el manifiesto (fila de gallery_manifests) se puede servir tal cual."""
+    return (
+        manifest.body is not None
+        and manifest.built_version == manifest.version
+        and manifest.built_at is not None
+        and media_url_window(manifest.built_at) == media_url_window(time.time() if now is None else now)
+    )
+
+
+def forget(db, gallery_id: int):
+    """Elimina el manifiesto de una galería borrada."""
+    db.execute(delete(gallery_manifests).where(gallery_manifests.c.gallery_id == gallery_id))
+
+
+def _render(db, gallery_id: int, version: int, now: float) -> Optional[bytes]:
+    """JSON de la galería con sus fotos, o None si la galería no existe."""
+    gallery = db.execute(galleries.select().where(galleries.c.id == gallery_id)).first()
+    if gallery is None:
+        return None
+
+    # Fotos de la galería en el orden elegido por el fotógrafo
+    query = (
+        select(
+            gallery_photos.c.id,  # ID de la relación gallery_photos
+            gallery_photos.c.photo_id,  # ID de la foto
+            photos.c.description,  # Descripción de la foto
+            photos.c.path,  # Ruta de la foto
+            gallery_photos.c.selected,  # Estado de selección
+            gallery_photos.c.favorite,  # Estado de favorito
+        )
+        .select_from(
+            join(photos, gallery_photos, photos.c.id == gallery_photos.c.photo_id)
+        )
+        .where(gallery_photos.c.gallery_id == gallery_id)
+        # Índice (gallery_id, rank)
+        .order_by(gallery_photos.c.rank, gallery_photos.c.id)
+    )
+
+    """
+    EQUIVALENTE EN SQL :
+    SELECT
+        gallery_photos.id,         -- ID de la relación gallery_photos
+        photos.id as photo_id,     -- ID de la foto
+        photos.description,        -- Descripción de la foto
+        photos.path,              -- Ruta de la foto
+        gallery_photos.selected,   -- Estado de selección
+        gallery_photos.favorite    -- Estado de favorito
+    FROM
+        photos
+    INNER JOIN
+        gallery_photos
+    ON
+        photos.id = gallery_photos.photo_id
+    WHERE
+        gallery_photos.gallery_id = [id]
+    ORDER BY
+        gallery_photos.rank, gallery_photos.id;
+    """
+
+    manifest = GalleryWithPhotos(
+        id=gallery.id,
+        name=gallery.name,
+        description=gallery.description,
+        photographer_id=gallery.photographer_id,
+        client_id=gallery.client_id,
+        version=version,
+        photos=[
+            {
+                "gallery_photo_id": photo.id,
+                "photo_id": photo.photo_id,
+                "description": photo.description,
+                "path": photo.path,
+                "url": media_url(photo.path, now),
+                "selected": photo.selected,
+                "favorite": photo.favorite,
+            }
+            for photo in db.execute(query)
+        ],
+    )
+    return manifest.model_dump_json().encode()
+
+
+def build(gallery_id: int) -> Optional[tuple[int, bytes]]:
+    """
+    Manifiesto al día de la galería: (versión, JSON). Lo genera y lo guarda
+    si el guardado está desactualizado. None si la galería no existe.
+    """
+    # La versión y los datos se leen en la misma transacción (misma instantánea)
+    with get_db() as db:
+        current = db.execute(
+            select(
+                gallery_manifests.c.version,
+                gallery_manifests.c.built_version,
+                gallery_manifests.c.body,
+                gallery_manifests.c.built_at,
+            )
+            .where(gallery_manifests.c.gallery_id == gallery_id)
+        ).first()
+        now = time.time()
+        if current is not None and is_fresh(current, now):
+            return current.version, current.body
+
+        version = current.version if current is not None else 0
+        body = _render(db, gallery_id, version, now)
+
+    if body is None:
+        return None
+
+    # Se guarda en otra transacción, solo si nadie ha guardado ya uno más nuevo
+    with get_db() as db:
+        stmt = insert(gallery_manifests).values(
+            gallery_id=gallery_id,
+            version=version,
+            built_version=version,
+            body=body,
+            built_at=now,
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[gallery_manifests.c.gallery_id],
+                set_={
+                    "built_version": stmt.excluded.built_version,
+                    "body": stmt.excluded.body,
+                    "built_at": stmt.excluded.built_at,
+                },
+                where=or_(
+                    gallery_manifests.c.built_version.is_(None),
+                    gallery_manifests.c.built_version < stmt.excluded.built_version,
+                    # Misma versión, URLs de una ventana posterior
+                    and_(
+                        gallery_manifests.c.built_version == stmt.excluded.built_version,
+                        gallery_manifests.c.built_at < stmt.excluded.built_at,
+                    ),
+                ),
+            )
+        )
+    return version, body
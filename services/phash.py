@@ -0,0 +1,243 @@
+# services/phash.py
+"""
+Detección de fotos duplicadas y casi duplicadas (hash perceptual)
+
+Cada foto se resume en un hash perceptual de 64 bits (pHash): la imagen en
+escala de grises reducida a 32x32, su DCT y, de los 8x8 coeficientes de
+baja frecuencia, un bit por coeficiente según esté por encima o por debajo
+de la mediana. Dos fotos casi iguales (ráfagas, pequeños cambios de
+encuadre o exposición) tienen hashes a poca distancia de Hamming.
+
+    - El cálculo (leer y decodificar cada foto) se hace en los workers de la
+      cola con la tarea "photos.phash" (ver services/tasks.py), por lotes.
+    - La búsqueda compara todos los hashes de una sesión o galería con
+      NumPy por bloques de filas: XOR de enteros de 64 bits y recuento de
+      bits vectorizado, sin bucles de Python por pareja.
+    - Las parejas por debajo del umbral se agrupan (union-find) en clusters.
+    - Las fotos cuyo fichero falta o no se puede decodificar quedan marcadas
+      (phash_failed_at): no se vuelven a encolar ni cuentan como pendientes,
+      salvo que se pida reintentarlas.
+
+NumPy y Pillow son opcionales (pip install numpy Pillow): sin ellos la API
+arranca igual, pero estos endpoints responden 503.
+"""
+
+import logging
+import time
+
+from sqlalchemy import bindparam, select, update
+
+from config.db import get_db
+from config.storage import resolve_media_path
+from models.photo import photos
+from services.queue import enqueue
+
+try:
+    import numpy as np
+except ImportError:  # Opcional
+    np = None
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Opcional
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Lado de la imagen reducida y de la submatriz de baja frecuencia
+HASH_IMAGE_SIZE = 32
+HASH_SIZE = 8
+
+# Distancia de Hamming máxima por defecto para considerar dos fotos casi iguales
+DEFAULT_MAX_DISTANCE = 6
+
+# Filas por bloque en la comparación (memoria: BLOCK_ROWS x fotos x 8 bytes)
+BLOCK_ROWS = 512
+
+# Fotos por trabajo de la cola
+JOB_BATCH_SIZE = 100
+
+
+def available() -> bool:
+    """True si están instaladas las dependencias opcionales."""
+    return np is not None and Image is not None
+
+
+def _dct_matrix():
+    """Matriz de la DCT-II (solo las HASH_SIZE primeras frecuencias)."""
+    n = np.arange(HASH_IMAGE_SIZE)
+    k = np.arange(HASH_SIZE)[:, None]
+    return np.cos(np.pi * (2 * n + 1) * k / (2 * HASH_IMAGE_SIZE))
+
+
+def compute_phash(path) -> int:
+    """Hash perceptual de 64 bits (sin signo) de un fichero de imagen."""
+    with Image.open(path) as image:
+        # En JPEG decodifica directamente a baja resolución (mucho más rápido)
+        image.draft("L", (HASH_IMAGE_SIZE * 2, HASH_IMAGE_SIZE * 2))
+        image = ImageOps.exif_transpose(image).convert("L")
+        image = image.resize((HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), Image.Resampling.LANCZOS)
+        pixels = np.asarray(image, dtype=np.float64)
+
+    dct = _dct_matrix()
+    coefficients = (dct @ pixels @ dct.T).ravel()
+    # La componente continua (brillo medio) no entra en la mediana
+    bits = coefficients > np.median(coefficients[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def to_signed(value: int) -> int:
+    """Entero sin signo de 64 bits -> con signo (INTEGER de SQLite)."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hash_photos(photo_ids: list[int]) -> dict:
+    """Calcula y guarda el hash de las fotos indicadas que aún no lo tienen."""
+    with get_db() as db:
+        rows = db.execute(
+            select(photos.c.id, photos.c.path).where(
+                photos.c.id.in_(photo_ids),
+                photos.c.phash.is_(None),
+                photos.c.phash_failed_at.is_(None),
+            )
+        ).fetchall()
+
+    # Las imágenes se leen fuera de la transacción para no retener la base de datos
+    hashes = []
+    failed = []
+    for photo in rows:
+        try:
+            value = compute_phash(resolve_media_path(photo.path))
+        except (OSError, ValueError) as e:
+            # Fichero que falta o no es una imagen: se marca y no se reintenta
+            logger.warning("No se pudo calcular el hash de la foto %s (%s): %s", photo.id, photo.path, e)
+            failed.append(photo.id)
+            continue
+        hashes.append({"photo_id": photo.id, "value": to_signed(value)})
+
+    if hashes or failed:
+        with get_db() as db:
+            if hashes:
+                db.execute(
+                    update(photos)
+                    .where(photos.c.id == bindparam("photo_id"))
+                    .values(phash=bindparam("value")),
+                    hashes,
+                )
+            if failed:
+                db.execute(
+                    update(photos)
+                    .where(photos.c.id.in_(failed))
+                    .values(phash_failed_at=time.time())
+                )
+    return {"hashed": len(hashes), "failed": len(failed)}
+
+
+def _popcount(values):
+    """Número de bits a 1 de cada elemento (uint64)."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(values)
+    # Tabla de 256 entradas aplicada a los 8 bytes de cada valor
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    return table[values.view(np.uint8).reshape(*values.shape, 8)].sum(axis=-1, dtype=np.uint8)
+
+
+def find_clusters(ids: list[int], hashes: list[int], max_distance: int = DEFAULT_MAX_DISTANCE) -> list[list[int]]:
+    """
+    Agrupa las fotos cuyos hashes están a distancia de Hamming <= max_distance
+    (de forma transitiva). Devuelve los grupos de 2 o más IDs, de mayor a menor.
+    """
+    count = len(ids)
+    if count < 2:
+        return []
+    values = np.array(hashes, dtype=np.int64).view(np.uint64)
+
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Cada bloque de filas se compara solo con las fotos posteriores (j > i)
+    for start in range(0, count, BLOCK_ROWS):
+        block = values[start:start + BLOCK_ROWS]
+        distances = _popcount(block[:, None] ^ values[None, start:])
+        rows, cols = np.nonzero(distances <= max_distance)
+        for i, j in zip((rows + start).tolist(), (cols + start).tolist()):
+            if i < j:
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    parent[root_j] = root_i
+
+    groups: dict[int, list[int]] = {}
+    for index in range(count):
+        groups.setdefault(find(index), []).append(ids[index])
+    clusters = [sorted(group) for group in groups.values() if len(group) > 1]
+    clusters.sort(key=lambda group: (-len(group), group[0]))
+    return clusters
+
+
+def duplicate_report(db, photo_filter, max_distance: int = DEFAULT_MAX_DISTANCE) -> dict:
+    """
+    Clusters de casi duplicados entre las fotos que cumplen photo_filter
+    (una condición sobre photos, p. ej. de una sesión o de una galería).
+    """
+    rows = db.execute(
+        select(photos.c.id, photos.c.phash, photos.c.phash_failed_at, photos.c.path, photos.c.description)
+        .where(photo_filter)
+        .order_by(photos.c.id)
+    ).fetchall()
+
+    hashed = [row for row in rows if row.phash is not None]
+    failed = sum(1 for row in rows if row.phash is None and row.phash_failed_at is not None)
+    clusters = find_clusters(
+        [row.id for row in hashed], [row.phash for row in hashed], max_distance
+    )
+
+    by_id = {row.id: row for row in hashed}
+    return {
+        "hashed": len(hashed),
+        "pending": len(rows) - len(hashed) - failed,
+        "failed": failed,
+        "max_distance": max_distance,
+        "clusters": [
+            {
+                "photos": [
+                    {
+                        "photo_id": photo_id,
+                        "path": by_id[photo_id].path,
+                        "description": by_id[photo_id].description,
+                    }
+                    for photo_id in cluster
+                ]
+            }
+            for cluster in clusters
+        ],
+    }
+
+
+def enqueue_missing(db, photo_filter, retry_failed: bool = False) -> dict:
+    """
+    Encola en lotes de JOB_BATCH_SIZE el cálculo del hash de las fotos que
+    cumplen photo_filter y aún no lo tienen (en la transacción de db). Las
+    que ya fallaron solo se incluyen con retry_failed.
+    """
+    if retry_failed:
+        db.execute(
+            update(photos)
+            .where(photo_filter, photos.c.phash.is_(None), photos.c.phash_failed_at.is_not(None))
+            .values(phash_failed_at=None)
+        )
+    photo_ids = db.execute(
+        select(photos.c.id)
+        .where(photo_filter, photos.c.phash.is_(None), photos.c.phash_failed_at.is_(None))
+        .order_by(photos.c.id)
+    ).scalars().all()
+
+    jobs = 0
+    for start in range(0, len(photo_ids), JOB_BATCH_SIZE):
+        enqueue("photos.phash", {"photo_ids": photo_ids[start:start + JOB_BATCH_SIZE]}, db=db)
+        jobs += 1
+    return {"photos": len(photo_ids), "jobs": jobs}
@@ -0,0 +1,168 @@
+# services/profiler.py
+"""
+Profiler estadístico de peticiones
+
+Mientras se atiende una petición marcada para perfilar, un hilo toma cada
+PROFILER_INTERVAL_MS milisegundos la pila de todos los hilos del proceso
+(sys._current_frames) y cuenta cuántas veces aparece cada pila. Al terminar
+se guarda en formato "collapsed stacks", el que usan flamegraph.pl,
+speedscope o inferno para dibujar un flame graph:
+
+    MainThread;run (asyncio/base_events.py:600);get_gallery (routes/gallery.py:161) 12
+
+Las pilas de hilos inactivos (esperando en un lock, una cola o el select
+del bucle de eventos) se descartan. Como se muestrean todos los hilos, si
+hay otras peticiones en curso también aparecen en el perfil.
+
+Los perfiles se guardan en PROFILER_DIR como un anillo acotado: al pasar
+de PROFILER_MAX_FILES se borran los más antiguos. Solo se perfila una
+petición a la vez.
+
+Variables de entorno:
+    PROFILER_ENABLED       '1' para añadir el middleware (desactivado por defecto)
+    PROFILER_SAMPLE_RATE   Fracción de peticiones perfiladas al azar (0 por defecto)
+    PROFILER_INTERVAL_MS   Intervalo de muestreo en milisegundos (5)
+    PROFILER_DIR           Carpeta de los perfiles (./data/profiles)
+    PROFILER_MAX_FILES     Número máximo de perfiles guardados (50)
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+INTERVAL = float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000
+PROFILES_DIR = Path(os.getenv("PROFILER_DIR", "./data/profiles"))
+MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "50"))
+
+# Profundidad máxima de pila que se registra
+MAX_DEPTH = 128
+
+# Nombres válidos de perfil (evita rutas fuera de PROFILES_DIR)
+PROFILE_NAME = re.compile(r"^[0-9]+-[0-9a-zA-Z_-]+$")
+
+# Un hilo cuya pila termina en estos archivos o funciones está esperando
+# (locks, colas, select del bucle de eventos, listener del logging)
+IDLE_FILES = {"threading.py", "selectors.py", "queue.py"}
+IDLE_FUNCTIONS = {"dequeue"}
+
+# Solo se perfila una petición a la vez
+_busy = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # Solo los dos últimos componentes de la ruta: routes/gallery.py
+    filename = "/".join(Path(code.co_filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(thread_name: str, frame) -> Optional[str]:
+    """Pila del hilo en formato collapsed, o None si el hilo está inactivo."""
+    code = frame.f_code
+    if Path(code.co_filename).name in IDLE_FILES or code.co_name in IDLE_FUNCTIONS:
+        return None
+
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name.replace(";", ":"))
+    return ";".join(reversed(labels))
+
+
+class StackSampler(threading.Thread):
+    """Hilo que muestrea las pilas hasta que se llama a stop()."""
+
+    def __init__(self, name: str, interval: float = INTERVAL):
+        super().__init__(name="profiler", daemon=True)
+        self.profile_name = name
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.meta: dict = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        try:
+            while not self._stop_event.wait(self.interval):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id:
+                        continue
+                    stack = _collapse(names.get(thread_id, str(thread_id)), frame)
+                    if stack is not None:
+                        self.stacks[stack] += 1
+                self.samples += 1
+            # El perfil se escribe en este hilo, fuera del camino de la petición
+            save_profile(self.profile_name, self.stacks, {**self.meta, "samples": self.samples})
+        except Exception:
+            logger.exception("Error al guardar el perfil %s", self.profile_name)
+        finally:
+            _busy.release()
+
+    def stop(self, **meta):
+        """Termina el muestreo; meta se guarda junto al perfil."""
+        self.meta = meta
+        self._stop_event.set()
+
+
+def start_profile(request_id: str) -> Optional[StackSampler]:
+    """
+    Empieza a perfilar. Devuelve None si ya hay otro perfil en curso.
+    """
+    if not _busy.acquire(blocking=False):
+        return None
+    name = f"{int(time.time() * 1000)}-{re.sub(r'[^0-9a-zA-Z_-]', '_', request_id)[:64]}"
+    sampler = StackSampler(name)
+    sampler.start()
+    return sampler
+
+
+def save_profile(name: str, stacks: Counter, meta: dict):
+    """Guarda el perfil y borra los más antiguos si se supera MAX_FILES."""
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+
+    with open(PROFILES_DIR / f"{name}.collapsed", "w", encoding="utf-8") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+    with open(PROFILES_DIR / f"{name}.json", "w", encoding="utf-8") as file:
+        json.dump({"name": name, **meta}, file)
+
+    profiles = sorted(PROFILES_DIR.glob("*.collapsed"))
+    for old in profiles[:-MAX_FILES] if MAX_FILES > 0 else profiles:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".json").unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo."""
+    if not PROFILES_DIR.is_dir():
+        return []
+
+    profiles = []
+    for path in sorted(PROFILES_DIR.glob("*.json"), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue  # Borrado o a medio escribir
+    return profiles
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """Ruta del perfil en formato collapsed, o None si no existe."""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = PROFILES_DIR / f"{name}.collapsed"
+    return path if path.is_file() else None
@@ -0,0 +1,201 @@
+# services/query_inspector.py
+"""
+Inspector de consultas SQL
+
+Se engancha a los eventos del engine y, sin tocar las rutas:
+    - Cuenta las consultas de cada petición y avisa cuando una misma
+      sentencia se repite muchas veces (patrón N+1).
+    - Registra las consultas lentas junto con su EXPLAIN QUERY PLAN,
+      marcando los recorridos completos de tabla (SCAN sin índice).
+    - Acumula las sentencias más costosas para GET /admin/queries.
+
+Es seguro en producción: el coste por consulta es una actualización de un
+diccionario, y EXPLAIN solo se ejecuta para consultas lentas (una vez por
+sentencia cada EXPLAIN_INTERVAL segundos).
+
+Variables de entorno:
+    QUERY_INSPECTOR          '1' (por defecto) para activarlo, '0' para desactivarlo
+    SLOW_QUERY_MS            Umbral de consulta lenta en milisegundos (100)
+    N_PLUS_ONE_THRESHOLD     Repeticiones de una sentencia en una petición para avisar (5)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event
+
+from config.db import engine
+from middleware.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("QUERY_INSPECTOR", "1") == "1"
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "100")) / 1000
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+# Número máximo de sentencias distintas que se acumulan
+MAX_STATEMENTS = 500
+
+# Segundos mínimos entre dos EXPLAIN de la misma sentencia
+EXPLAIN_INTERVAL = 300
+
+
+class StatementStats:
+    """Estadísticas acumuladas de una sentencia SQL."""
+
+    __slots__ = (
+        "statement", "count", "total_time", "max_time", "slow_count",
+        "repeated_requests", "routes", "plan", "full_scan", "explained_at",
+    )
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.slow_count = 0
+        self.repeated_requests = 0  # Peticiones en las que se repitió (N+1)
+        self.routes: set[str] = set()
+        self.plan: Optional[list[str]] = None
+        self.full_scan = False
+        self.explained_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "statement": self.statement,
+            "count": self.count,
+            "total_time_ms": round(self.total_time * 1000, 3),
+            "avg_time_ms": round(self.total_time * 1000 / self.count, 3) if self.count else 0.0,
+            "max_time_ms": round(self.max_time * 1000, 3),
+            "slow_count": self.slow_count,
+            "repeated_requests": self.repeated_requests,
+            "routes": sorted(self.routes),
+            "plan": self.plan,
+            "full_scan": self.full_scan,
+        }
+
+
+# Sentencia SQL -> StatementStats. Las consultas llegan desde varios hilos.
+_statements: dict[str, StatementStats] = {}
+_lock = threading.Lock()
+
+
+def _get_stats(statement: str) -> StatementStats:
+    stats = _statements.get(statement)
+    if stats is None:
+        if len(_statements) >= MAX_STATEMENTS:
+            # Descartar la sentencia que menos tiempo acumula
+            cheapest = min(_statements.values(), key=lambda item: item.total_time)
+            del _statements[cheapest.statement]
+        stats = _statements[statement] = StatementStats(statement)
+    return stats
+
+
+def _explain(cursor, statement: str, parameters) -> tuple[list[str], bool]:
+    """Ejecuta EXPLAIN QUERY PLAN con la misma conexión y parámetros."""
+    explain_cursor = cursor.connection.cursor()
+    try:
+        rows = explain_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    finally:
+        explain_cursor.close()
+
+    plan = [row[3] for row in rows]
+    # "SCAN tabla" sin índice recorre la tabla completa
+    full_scan = any(
+        detail.startswith("SCAN ") and " USING " not in detail for detail in plan
+    )
+    return plan, full_scan
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+
+    explain = False
+    with _lock:
+        stats = _get_stats(statement)
+        stats.count += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        if elapsed >= SLOW_QUERY_SECONDS:
+            stats.slow_count += 1
+            now = time.time()
+            if (
+                not executemany
+                and statement.lstrip().upper().startswith("SELECT")
+                and now - stats.explained_at >= EXPLAIN_INTERVAL
+            ):
+                stats.explained_at = now
+                explain = True
+
+    if elapsed < SLOW_QUERY_SECONDS:
+        return
+
+    plan, full_scan = None, False
+    if explain:
+        try:
+            plan, full_scan = _explain(cursor, statement, parameters)
+        except Exception:
+            logger.debug("No se pudo obtener el plan de la consulta", exc_info=True)
+        with _lock:
+            stats.plan, stats.full_scan = plan, full_scan
+
+    logger.warning(
+        "Consulta lenta (%.1f ms)%s: %s%s",
+        elapsed * 1000,
+        " con recorrido completo de tabla" if full_scan else "",
+        " ".join(statement.split()),
+        f" | plan: {'; '.join(plan)}" if plan else "",
+    )
+
+
+def finish_request(route: str, query_stats):
+    """Al terminar una petición, busca sentencias repetidas (N+1)."""
+    repeated = [
+        (statement, count)
+        for statement, count in query_stats.statements.items()
+        if count >= N_PLUS_ONE_THRESHOLD
+    ]
+    if not repeated:
+        return
+
+    with _lock:
+        for statement, count in repeated:
+            stats = _get_stats(statement)
+            stats.repeated_requests += 1
+            stats.routes.add(route)
+
+    for statement, count in repeated:
+        logger.warning(
+            "Posible N+1 en %s: la misma sentencia se ejecutó %s veces: %s",
+            route, count, " ".join(statement.split()),
+        )
+
+
+def top_statements(order_by: str = "total_time", limit: int = 20) -> list[dict]:
+    """Sentencias más costosas ordenadas por el criterio indicado."""
+    with _lock:
+        items = [stats.to_dict() for stats in _statements.values()]
+
+    key = {
+        "total_time": "total_time_ms",
+        "count": "count",
+        "max_time": "max_time_ms",
+        "slow_count": "slow_count",
+        "repeated": "repeated_requests",
+    }[order_by]
+    items.sort(key=lambda item: item[key], reverse=True)
+    return items[:limit]
+
+
+def reset():
+    """Borra las estadísticas acumuladas."""
+    with _lock:
+        _statements.clear()
+
+
+if ENABLED:
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    registry.register_request_hook(finish_request)
@@ -0,0 +1,320 @@
+# services/queue.py
+"""
+Cola de trabajos duradera respaldada por SQLite
+
+Permite sacar del ciclo de la petición el trabajo pesado (miniaturas,
+borrados en cascada, exportaciones...) sin depender de un broker externo.
+
+Ciclo de vida de un trabajo:
+    pending -> leased -> done
+                      -> pending (reintento con backoff exponencial)
+                      -> dead    (dead-letter al agotar max_attempts)
+
+Un trabajo reservado ('leased') que no se completa antes de `leased_until`
+(el worker murió o se colgó) vuelve a ser visible para otros workers.
+
+Ejemplo de uso:
+    from services.queue import task, enqueue
+
+    @task("photos.thumbnail", max_attempts=3)
+    def make_thumbnail(photo_id: int):
+        ...
+
+    enqueue("photos.thumbnail", {"photo_id": 1})
+"""
+
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import select, update, delete, func, and_, or_
+
+from config.db import get_db
+from models.job import jobs
+
+
+# Configuración del backoff entre reintentos (en segundos)
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 600.0
+
+# Tiempo de visibilidad por defecto de un trabajo reservado (en segundos)
+DEFAULT_VISIBILITY_TIMEOUT = 300
+
+
+# Definición de una tarea registrada
+@dataclass
+class TaskSpec:
+    name: str
+    func: Callable
+    max_attempts: int = 5
+    visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT
+
+
+# Registro de tareas disponibles (nombre -> TaskSpec)
+_tasks: dict[str, TaskSpec] = {}
+
+
+def task(name: str, *, max_attempts: int = 5, visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT):
+    """Decorador que registra una función como tarea de la cola."""
+
+    def decorator(func: Callable) -> Callable:
+        _tasks[name] = TaskSpec(name, func, max_attempts, visibility_timeout)
+        return func
+
+    return decorator
+
+
+def get_task(name: str) -> Optional[TaskSpec]:
+    return _tasks.get(name)
+
+
+# Calcula el retraso antes del siguiente intento: 2, 4, 8... segundos
+# con un jitter del ±20% para que los reintentos no lleguen a la vez
+def backoff_delay(attempts: int) -> float:
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def enqueue(
+    task_name: str,
+    payload: Optional[dict] = None,
+    *,
+    queue: str = "default",
+    delay: float = 0,
+    max_attempts: Optional[int] = None,
+    db=None,
+) -> int:
+    """
+    Añade un trabajo a la cola y devuelve su ID.
+
+    Si se pasa `db`, el trabajo se inserta en la misma transacción que el
+    código que lo encola: solo será visible si esa transacción se confirma.
+    """
+    spec = _tasks.get(task_name)
+    if max_attempts is None:
+        max_attempts = spec.max_attempts if spec else 5
+
+    now = time.time()
+    values = {
+        "queue": queue,
+        "task": task_name,
+        "payload": json.dumps(payload or {}),
+        "status": "pending",
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_at": now + delay,
+        "created_at": now,
+    }
+
+    if db is not None:
+        return db.execute(jobs.insert().values(values)).lastrowid
+
+    with get_db() as conn:
+        return conn.execute(jobs.insert().values(values)).lastrowid
+
+
+def enqueue_once(task_name: str, payload: Optional[dict] = None, *, queue: str = "default", db=None) -> Optional[int]:
+    """
+    Como enqueue(), salvo que ya haya un trabajo pendiente de la misma tarea
+    con el mismo payload (p. ej. regenerar algo que se ha modificado varias
+    veces seguidas). Devuelve el ID del trabajo nuevo o None si ya había uno.
+
+    Solo cuenta los pendientes: si el que hay ya está en curso, puede haber
+    leído los datos antes del cambio y se encola otro.
+    """
+    query = (
+        select(jobs.c.id)
+        .where(
+            and_(
+                jobs.c.queue == queue,
+                jobs.c.status == "pending",
+                jobs.c.task == task_name,
+                jobs.c.payload == json.dumps(payload or {}),
+            )
+        )
+        .limit(1)
+    )
+    if db is not None:
+        if db.execute(query).first():
+            return None
+        return enqueue(task_name, payload, queue=queue, db=db)
+
+    with get_db() as conn:
+        if conn.execute(query).first():
+            return None
+        return enqueue(task_name, payload, queue=queue, db=conn)
+
+
+def lease(queue: str = "default", visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT):
+    """
+    Reserva el siguiente trabajo listo de la cola.
+
+    La selección y la reserva se hacen en una única sentencia UPDATE ... RETURNING,
+    de modo que dos workers nunca pueden reservar el mismo trabajo.
+    Devuelve la fila reservada (con `leased_by` como token) o None.
+    """
+    now = time.time()
+    token = uuid.uuid4().hex
+
+    with get_db() as db:
+        # Los trabajos cuya reserva expiró sin más intentos disponibles van a dead-letter
+        db.execute(
+            update(jobs)
+            .where(
+                and_(
+                    jobs.c.queue == queue,
+                    jobs.c.status == "leased",
+                    jobs.c.leased_until <= now,
+                    jobs.c.attempts >= jobs.c.max_attempts,
+                )
+            )
+            .values(
+                status="dead",
+                finished_at=now,
+                last_error="Tiempo de visibilidad agotado",
+            )
+        )
+
+        next_job = (
+            select(jobs.c.id)
+            .where(
+                and_(
+                    jobs.c.queue == queue,
+                    or_(
+                        and_(jobs.c.status == "pending", jobs.c.run_at <= now),
+                        and_(jobs.c.status == "leased", jobs.c.leased_until <= now),
+                    ),
+                )
+            )
+            .order_by(jobs.c.run_at)
+            .limit(1)
+            .scalar_subquery()
+        )
+
+        return db.execute(
+            update(jobs)
+            .where(jobs.c.id == next_job)
+            .values(
+                status="leased",
+                attempts=jobs.c.attempts + 1,
+                leased_until=now + visibility_timeout,
+                leased_by=token,
+            )
+            .returning(jobs)
+        ).first()
+
+
+def extend_lease(job, visibility_timeout: int) -> bool:
+    """Amplía la reserva de un trabajo en curso (heartbeat para tareas largas)."""
+    with get_db() as db:
+        result = db.execute(
+            update(jobs)
+            .where(and_(jobs.c.id == job.id, jobs.c.leased_by == job.leased_by))
+            .values(leased_until=time.time() + visibility_timeout)
+        )
+        return result.rowcount == 1
+
+
+def complete(job) -> bool:
+    """Marca un trabajo como terminado. Falla si la reserva ya no es nuestra."""
+    with get_db() as db:
+        result = db.execute(
+            update(jobs)
+            .where(and_(jobs.c.id == job.id, jobs.c.leased_by == job.leased_by))
+            .values(status="done", finished_at=time.time(), leased_until=None)
+        )
+        return result.rowcount == 1
+
+
+def fail(job, error: str) -> str:
+    """
+    Registra el fallo de un trabajo.
+    Lo reprograma con backoff o lo mueve a dead-letter; devuelve el nuevo estado.
+    """
+    now = time.time()
+    if job.attempts >= job.max_attempts:
+        values = {"status": "dead", "finished_at": now}
+    else:
+        values = {"status": "pending", "run_at": now + backoff_delay(job.attempts)}
+
+    with get_db() as db:
+        db.execute(
+            update(jobs)
+            .where(and_(jobs.c.id == job.id, jobs.c.leased_by == job.leased_by))
+            .values(leased_until=None, last_error=error[:4000], **values)
+        )
+    return values["status"]
+
+
+def retry_dead(queue: str = "default") -> int:
+    """Devuelve a la cola los trabajos de la dead-letter (tras corregir la causa)."""
+    with get_db() as db:
+        result = db.execute(
+            update(jobs)
+            .where(and_(jobs.c.queue == queue, jobs.c.status == "dead"))
+            .values(status="pending", attempts=0, run_at=time.time(), finished_at=None)
+        )
+        return result.rowcount
+
+
+def purge_finished(older_than: float) -> int:
+    """Elimina los trabajos terminados hace más de `older_than` segundos."""
+    with get_db() as db:
+        result = db.execute(
+            delete(jobs).where(
+                and_(jobs.c.status == "done", jobs.c.finished_at < time.time() - older_than)
+            )
+        )
+        return result.rowcount
+
+
+def stats(window: int = 60) -> list[dict]:
+    """
+    Profundidad y throughput por cola.
+    `window` es la ventana (en segundos) usada para calcular el throughput.
+    """
+    now = time.time()
+    with get_db() as db:
+        counts = db.execute(
+            select(jobs.c.queue, jobs.c.status, func.count())
+            .group_by(jobs.c.queue, jobs.c.status)
+        ).fetchall()
+
+        finished = db.execute(
+            select(jobs.c.queue, func.count())
+            .where(and_(jobs.c.finished_at >= now - window, jobs.c.status == "done"))
+            .group_by(jobs.c.queue)
+        ).fetchall()
+
+        oldest = db.execute(
+            select(jobs.c.queue, func.min(jobs.c.run_at))
+            .where(and_(jobs.c.status == "pending", jobs.c.run_at <= now))
+            .group_by(jobs.c.queue)
+        ).fetchall()
+
+    result: dict[str, dict] = {}
+    for queue, status, count in counts:
+        entry = result.setdefault(
+            queue,
+            {"queue": queue, "pending": 0, "leased": 0, "done": 0, "dead": 0},
+        )
+        entry[status] = count
+
+    for entry in result.values():
+        entry["completed_last_window"] = 0
+        entry["throughput_per_second"] = 0.0
+        entry["oldest_ready_age_seconds"] = 0.0
+
+    for queue, count in finished:
+        if queue in result:
+            result[queue]["completed_last_window"] = count
+            result[queue]["throughput_per_second"] = round(count / window, 3)
+
+    for queue, run_at in oldest:
+        if queue in result and run_at is not None:
+            result[queue]["oldest_ready_age_seconds"] = round(now - run_at, 3)
+
+    return list(result.values())
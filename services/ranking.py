@@ -0,0 +1,137 @@
+# services/ranking.py
+"""
+Orden de las fotos de una galería con claves fraccionarias
+
+Cada fila de gallery_photos tiene una clave 'rank' (texto en base 62) y las
+fotos se ordenan por ella. Entre dos claves siempre existe otra, así que
+mover una foto solo reescribe esa fila: su nueva clave queda entre las de
+sus nuevos vecinos. No hay que renumerar la galería en cada arrastre.
+
+Las claves se interpretan como la parte fraccionaria de un número en base
+62 (0.<clave>): la comparación de textos coincide con la numérica porque
+ninguna clave termina en '0', el dígito menor.
+
+Si se inserta muchas veces en el mismo hueco las claves se alargan (un
+carácter cada ~6 inserciones). Cuando alguna supera REBALANCE_LENGTH se
+encola la tarea "galleries.rebalance_ranks", que reparte de nuevo las
+claves de la galería a intervalos regulares en una sola transacción.
+"""
+
+import math
+from typing import Optional
+
+from sqlalchemy import bindparam, select, update
+
+from models.gallery_photos import gallery_photos
+from services.queue import enqueue_once
+
+# Dígitos en orden ASCII (el orden de comparación de SQLite con BINARY)
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_VALUES = {digit: value for value, digit in enumerate(DIGITS)}
+
+# Longitud de clave a partir de la cual se reequilibra la galería
+REBALANCE_LENGTH = 16
+
+REBALANCE_TASK = "galleries.rebalance_ranks"
+
+
+def initial_rank(position: int) -> str:
+    """
+    Clave para insertar filas en orden (p. ej. por ID): hexadecimal de ancho
+    fijo, con un sufijo que evita terminar en '0' y deja hueco entre claves.
+    Es la misma que usa la migración (printf('%08XV', id)).
+    """
+    return f"{position:08X}V"
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """
+    Clave estrictamente entre a y b (a < b). None significa el principio
+    (para a) o el final (para b) de la lista.
+    """
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"Claves fuera de orden: {a!r} >= {b!r}")
+    return _midpoint(a or "", b)
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    if b is not None:
+        # Prefijo común (a se completa con '0', el dígito menor)
+        n = 0
+        while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = _VALUES[a[0]] if a else 0
+    digit_b = _VALUES[b[0]] if b is not None else BASE
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+
+    # Dígitos consecutivos: si b tiene más dígitos basta su primer dígito
+    if b is not None and len(b) > 1:
+        return b[:1]
+    # Si no, se añade un dígito después del de a
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def keys_between(a: Optional[str], b: Optional[str], count: int) -> list[str]:
+    """count claves ordenadas entre a y b, repartidas para no alargarse de más."""
+    if count <= 0:
+        return []
+    if count == 1:
+        return [key_between(a, b)]
+    middle = key_between(a, b)
+    left = keys_between(a, middle, count // 2)
+    right = keys_between(middle, b, count - count // 2 - 1)
+    return [*left, middle, *right]
+
+
+def spaced_keys(count: int) -> list[str]:
+    """count claves cortas a intervalos regulares (reequilibrado)."""
+    if count <= 0:
+        return []
+    # Un dígito más del necesario para dejar hueco entre claves consecutivas
+    width = max(1, math.ceil(math.log(count + 1, BASE))) + 1
+    span = BASE ** width
+    keys = []
+    for index in range(1, count + 1):
+        value = index * span // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def rebalance_gallery(db, gallery_id: int) -> int:
+    """Reparte de nuevo las claves de la galería; devuelve las filas reescritas."""
+    rows = db.execute(
+        select(gallery_photos.c.id, gallery_photos.c.rank)
+        .where(gallery_photos.c.gallery_id == gallery_id)
+        .order_by(gallery_photos.c.rank, gallery_photos.c.id)
+    ).fetchall()
+
+    changes = [
+        {"row_id": row.id, "new_rank": key}
+        for row, key in zip(rows, spaced_keys(len(rows)))
+        if row.rank != key
+    ]
+    if changes:
+        db.execute(
+            update(gallery_photos)
+            .where(gallery_photos.c.id == bindparam("row_id"))
+            .values(rank=bindparam("new_rank")),
+            changes,
+        )
+    return len(changes)
+
+
+def schedule_rebalance(db, gallery_id: int) -> bool:
+    """
+    Encola el reequilibrado de la galería (en la transacción de db) salvo
+    que ya haya uno pendiente. Devuelve True si se encoló.
+    """
+    return enqueue_once(REBALANCE_TASK, {"gallery_id": gallery_id}, db=db) is not None
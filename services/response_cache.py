@@ -0,0 +1,244 @@
+# services/response_cache.py
+"""
+Caché de respuestas HTTP en memoria
+
+Guarda los bytes ya serializados (y comprimidos) de las respuestas GET de
+los endpoints marcados con @cacheable. Una respuesta en caché se sirve sin
+consultar al usuario en la base de datos, sin ejecutar la consulta y sin
+volver a serializar (ver middleware/response_cache.py).
+
+Clave: (ruta, query string, Accept-Encoding, usuario del token JWT).
+
+Cada entrada lleva etiquetas (tags), p. ej. "gallery:5" o "users". Los
+endpoints de escritura llaman a invalidate() con las etiquetas afectadas
+DESPUÉS del commit. Cada etiqueta tiene una versión: una respuesta que se
+calculó mientras se invalidaba una de sus etiquetas no se guarda, así que
+una lectura concurrente con una escritura no puede dejar datos antiguos.
+
+Para invalidar justo después del commit de get_db():
+
+    with invalidating() as stale, get_db() as db:
+        db.execute(...)
+        stale.add(f"gallery:{gallery_id}")
+
+Además todas las entradas llevan la etiqueta "auth:<email>", que se
+invalida al modificar o eliminar el usuario (su rol decide lo que ve).
+
+Expulsión: LRU con TTL por entrada y un límite de memoria total.
+
+Con varios workers (WEB_CONCURRENCY > 1), invalidate() también publica
+las etiquetas para los demás procesos, que las aplican en
+CACHE_SYNC_INTERVAL segundos como mucho (ver services/cache_sync.py).
+
+Variables de entorno:
+    RESPONSE_CACHE_ENABLED     '1' (por defecto) para activarla, '0' para desactivarla
+    RESPONSE_CACHE_TTL         Segundos que vive una entrada (30)
+    RESPONSE_CACHE_MAX_BYTES   Memoria máxima de la caché (64 MB)
+    RESPONSE_CACHE_MAX_ENTRY   Tamaño máximo de una respuesta cacheable (2 MB)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Optional, Union
+
+from middleware.metrics import registry
+from services import cache_sync
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+DEFAULT_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY", str(2 * 1024 * 1024)))
+
+# Bytes que se suman a cada entrada por la clave, las cabeceras y el objeto
+ENTRY_OVERHEAD = 512
+
+
+class CacheRule:
+    """Cómo cachear un endpoint: etiquetas a partir de los parámetros de ruta y TTL."""
+
+    __slots__ = ("tags", "ttl")
+
+    def __init__(self, tags: Union[list[str], Callable[[dict], list[str]]], ttl: Optional[float]):
+        self.tags = tags
+        self.ttl = ttl
+
+    def tags_for(self, path_params: dict) -> list[str]:
+        return list(self.tags(path_params) if callable(self.tags) else self.tags)
+
+
+def cacheable(tags: Union[list[str], Callable[[dict], list[str]]], ttl: Optional[float] = None):
+    """
+    Marca un endpoint GET como cacheable.
+
+    tags es una lista de etiquetas o una función que las calcula a partir de
+    los parámetros de ruta. Se coloca debajo del decorador del router:
+
+        @gallery.get("/galleries/{id}")
+        @cacheable(lambda params: [f"gallery:{params['id']}"])
+        async def get_gallery(id: int, ...):
+    """
+    def decorator(endpoint):
+        endpoint.__response_cache__ = CacheRule(tags, ttl)
+        return endpoint
+    return decorator
+
+
+class CacheEntry:
+    __slots__ = ("status", "headers", "body", "tags", "expires_at", "size")
+
+    def __init__(self, status: int, headers: list, body: bytes, tags: list[str], expires_at: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.tags = tags
+        self.expires_at = expires_at
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers) + ENTRY_OVERHEAD
+
+
+class ResponseCache:
+    """LRU con TTL, límite de memoria e invalidación por etiquetas."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, CacheEntry] = OrderedDict()
+        self._by_tag: dict[str, set[tuple]] = {}
+        self._versions: dict[str, int] = {}
+        # Se incrementa al vaciar la caché (invalida todas las etiquetas a la vez)
+        self._generation = 0
+        self._bytes = 0
+        # Se invalida desde los handlers síncronos (threadpool) y se lee desde el bucle
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def versions(self, tags: list[str]) -> tuple:
+        """Versiones actuales de las etiquetas (se toman antes de calcular la respuesta)."""
+        with self._lock:
+            return (self._generation, *(self._versions.get(tag, 0) for tag in tags))
+
+    def put(self, key: tuple, entry: CacheEntry, versions: tuple):
+        """Guarda la entrada si ninguna de sus etiquetas se invalidó mientras se calculaba."""
+        if entry.size > MAX_ENTRY_BYTES or entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if (self._generation, *(self._versions.get(tag, 0) for tag in entry.tags)) != versions:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            # Expulsar las menos usadas hasta volver al límite
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tags: str):
+        """Elimina las entradas con cualquiera de las etiquetas."""
+        with self._lock:
+            self.invalidations += 1
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+                for key in self._by_tag.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_tag.clear()
+            self._bytes = 0
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def metrics(self) -> list[str]:
+        """Métricas para GET /metrics."""
+        return [
+            "# HELP response_cache_hits_total Respuestas servidas desde la caché",
+            "# TYPE response_cache_hits_total counter",
+            f"response_cache_hits_total {self.hits}",
+            "# HELP response_cache_misses_total Peticiones cacheables no encontradas en la caché",
+            "# TYPE response_cache_misses_total counter",
+            f"response_cache_misses_total {self.misses}",
+            "# HELP response_cache_invalidations_total Invalidaciones por etiquetas",
+            "# TYPE response_cache_invalidations_total counter",
+            f"response_cache_invalidations_total {self.invalidations}",
+            "# HELP response_cache_entries Entradas en la caché",
+            "# TYPE response_cache_entries gauge",
+            f"response_cache_entries {len(self._entries)}",
+            "# HELP response_cache_bytes Memoria usada por la caché",
+            "# TYPE response_cache_bytes gauge",
+            f"response_cache_bytes {self._bytes}",
+        ]
+
+
+# Caché única del proceso
+response_cache = ResponseCache()
+registry.register_collector(response_cache.metrics)
+
+
+def invalidate(*tags: str):
+    """Invalida las respuestas cacheadas con esas etiquetas (llamar tras el commit)."""
+    response_cache.invalidate(*tags)
+    try:
+        cache_sync.publish(tags)
+    except Exception:
+        # El commit ya está hecho: los demás workers lo verán al caducar el TTL
+        logger.exception("No se pudo publicar la invalidación de caché %s", tags)
+
+
+def _apply_remote(tags: Optional[list[str]]):
+    """Aplica una invalidación de otro proceso (sin volver a publicarla)."""
+    if tags is None:
+        response_cache.clear()
+    else:
+        response_cache.invalidate(*tags)
+
+
+cache_sync.subscribe(_apply_remote)
+
+
+@contextmanager
+def invalidating():
+    """
+    Acumula etiquetas y las invalida al salir del bloque.
+
+    Se abre antes que get_db() en el mismo with, así se sale después y la
+    invalidación ocurre tras el commit.
+    """
+    tags: set[str] = set()
+    try:
+        yield tags
+    finally:
+        if tags:
+            invalidate(*tags)
@@ -0,0 +1,101 @@
+# services/scoping.py
+"""
+Reglas de acceso como condiciones SQL
+
+Cada función devuelve, para el usuario actual, la condición WHERE con las
+filas que puede ver o modificar. Así el control de acceso se hace en la
+misma consulta que lee o escribe (una sola sentencia, sin leer la fila para
+comprobarla en Python) y las reglas están en un único sitio:
+
+    with get_db() as db:
+        gallery = db.execute(
+            galleries.select().where(galleries.c.id == id, gallery_scope(current_user))
+        ).first()
+        if gallery is None:
+            raise_not_visible(db, galleries, id, ...)
+
+Acciones sobre galerías:
+    - read:     admin todas, fotógrafo las suyas, cliente las asignadas
+    - select:   solo el cliente asignado (marcar fotos)
+    - delete:   solo el fotógrafo propietario
+    - reorder:  solo el fotógrafo propietario (orden de las fotos)
+    - download: admin o fotógrafo propietario (ZIP de la selección)
+
+Usuarios: admin todos, fotógrafo sus clientes, cliente ninguno.
+Sesiones: admin todas, fotógrafo las suyas, cliente ninguna.
+
+Las rutas de fotos (selección, duplicados, ZIP) actúan siempre sobre las
+fotos de una galería o de una sesión: su condición de acceso es la de esa
+galería o sesión.
+"""
+
+from typing import Literal
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, Table, false, select, true
+
+from models.gallery import galleries
+from models.session import sessions
+from models.user import UserRole, users
+
+GalleryAction = Literal["read", "select", "delete", "reorder", "download"]
+
+# Roles que tienen acceso a cada acción sobre galerías y a qué filas
+GALLERY_RULES = {
+    "read": {
+        UserRole.admin: lambda user: true(),
+        UserRole.photographer: lambda user: galleries.c.photographer_id == user["id"],
+        UserRole.client: lambda user: galleries.c.client_id == user["id"],
+    },
+    "select": {
+        UserRole.client: lambda user: galleries.c.client_id == user["id"],
+    },
+    "delete": {
+        UserRole.photographer: lambda user: galleries.c.photographer_id == user["id"],
+    },
+    "reorder": {
+        UserRole.photographer: lambda user: galleries.c.photographer_id == user["id"],
+    },
+    "download": {
+        UserRole.admin: lambda user: true(),
+        UserRole.photographer: lambda user: galleries.c.photographer_id == user["id"],
+    },
+}
+
+
+def gallery_scope(user: dict, action: GalleryAction = "read") -> ColumnElement[bool]:
+    """Galerías sobre las que el usuario puede realizar la acción."""
+    rule = GALLERY_RULES[action].get(user["role"])
+    return rule(user) if rule is not None else false()
+
+
+def user_scope(user: dict) -> ColumnElement[bool]:
+    """Usuarios que el usuario puede ver, modificar o eliminar."""
+    if user["role"] == UserRole.admin:
+        return true()
+    if user["role"] == UserRole.photographer:
+        return users.c.photographer_id == user["id"]
+    return false()
+
+
+def session_scope(user: dict) -> ColumnElement[bool]:
+    """Sesiones fotográficas visibles para el usuario."""
+    if user["role"] == UserRole.admin:
+        return true()
+    if user["role"] == UserRole.photographer:
+        # Igualdad sobre photographer_id: usa el índice (photographer_id, date)
+        return sessions.c.photographer_id == user["id"]
+    return false()
+
+
+def raise_not_visible(db, table: Table, id: int, not_found: str, forbidden: str):
+    """
+    La consulta con la condición de acceso no encontró la fila: responde
+    404 si no existe o 403 si existe pero no es accesible.
+
+    Solo se consulta en el caso de error; el caso normal no paga nada.
+    """
+    exists = db.execute(select(table.c.id).where(table.c.id == id)).first()
+    if exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden)
@@ -0,0 +1,111 @@
+# services/singleflight.py
+"""
+Agrupación de lecturas idénticas concurrentes (single-flight)
+
+Cuando llegan a la vez muchas peticiones iguales (p. ej. una galería
+compartida en redes sociales), solo la primera ejecuta la consulta; las
+demás esperan a su resultado en lugar de repetirla. Si la consulta falla,
+todas reciben la misma excepción.
+
+No guarda nada: en cuanto termina la consulta, la siguiente petición
+vuelve a ejecutarla. Para no servir datos anteriores a una escritura, la
+clave incluye la versión de los datos que ya vio la petición (p. ej. la
+del manifiesto de la galería, ver services/manifests.py): después de una
+escritura la versión es otra y las peticiones no se unen a una consulta
+empezada antes de ella.
+
+Uso desde un endpoint async (la función se ejecuta en el threadpool):
+
+    built = await gallery_reads.do(f"gallery:{id}:{version}", manifests.build, id)
+
+Variables de entorno:
+    SINGLEFLIGHT_TIMEOUT   Segundos máximos de espera de cada petición (10)
+"""
+
+import asyncio
+import os
+from typing import Callable, Hashable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from middleware.metrics import registry
+
+DEFAULT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", "10"))
+
+
+class SingleFlight:
+    """Grupo de consultas en curso, una por clave."""
+
+    def __init__(self, name: str, timeout: float = DEFAULT_TIMEOUT):
+        self.name = name
+        self.timeout = timeout
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self.executions = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    async def do(self, key: Hashable, fn: Callable, *args, timeout: Optional[float] = None):
+        """
+        Devuelve fn(*args), compartiendo la ejecución con las peticiones
+        concurrentes de la misma clave.
+
+        Lanza asyncio.TimeoutError si el resultado no llega a tiempo; la
+        consulta sigue en curso para las demás peticiones.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            self.executions += 1
+            # Tarea aparte: si se cancela la primera petición, las demás siguen esperando
+            call = asyncio.get_running_loop().create_task(run_in_threadpool(fn, *args))
+            call.add_done_callback(lambda task: self._done(key, task))
+            self._calls[key] = call
+        else:
+            self.shared += 1
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(call), self.timeout if timeout is None else timeout
+            )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Evita el aviso de "excepción no recuperada" si nadie esperaba ya
+        if not task.cancelled():
+            task.exception()
+
+
+_groups: list[SingleFlight] = []
+
+
+def group(name: str, timeout: float = DEFAULT_TIMEOUT) -> SingleFlight:
+    """Crea un grupo y lo registra para las métricas."""
+    flight = SingleFlight(name, timeout)
+    _groups.append(flight)
+    return flight
+
+
+# Nombre, tipo, ayuda y valor de cada métrica
+METRICS = (
+    ("singleflight_executions_total", "counter", "Consultas ejecutadas", lambda f: f.executions),
+    ("singleflight_shared_total", "counter", "Peticiones que reutilizaron una consulta en curso", lambda f: f.shared),
+    ("singleflight_timeouts_total", "counter", "Peticiones que agotaron la espera", lambda f: f.timeouts),
+    ("singleflight_in_flight", "gauge", "Consultas en curso", lambda f: len(f._calls)),
+)
+
+
+def metrics() -> list[str]:
+    """Métricas para GET /metrics."""
+    lines = []
+    for name, kind, help_text, value in METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for flight in _groups:
+            lines.append(f'{name}{{group="{flight.name}"}} {value(flight)}')
+    return lines
+
+
+registry.register_collector(metrics)
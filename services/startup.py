@@ -0,0 +1,153 @@
+# services/startup.py
+"""
+Arranque de la API: esquema, conexiones y sentencias antes de la primera petición
+
+Los workers de uvicorn se reinician a menudo. Sin preparación, las primeras
+peticiones de cada uno pagan abrir las conexiones (y aplicar sus pragmas),
+compilar las sentencias SQL en SQLAlchemy y prepararlas en SQLite, y leer
+las páginas de la base de datos desde disco. run() lo hace en el lifespan
+de app.py, antes de aceptar peticiones:
+
+    1. schema:      ensure_schema() (no ejecuta DDL si la huella coincide)
+    2. connections: abre a la vez STARTUP_WARM_CONNECTIONS conexiones del pool
+    3. statements:  ejecuta en cada conexión las sentencias registradas con
+                    register_hot_statement() (con parámetros que no
+                    devuelven filas): quedan en la caché de compilación de
+                    SQLAlchemy y en la de sentencias preparadas de SQLite
+    4. caches:      regenera, si hace falta, los manifiestos de las
+                    STARTUP_WARM_GALLERIES galerías usadas más recientemente
+
+La duración de cada fase se registra en el log y en GET /metrics
+(app_startup_seconds).
+
+Variables de entorno:
+    STARTUP_WARM_CONNECTIONS  Conexiones a abrir (por defecto, el tamaño del pool)
+    STARTUP_WARM_GALLERIES    Manifiestos a preparar (0, desactivado)
+"""
+
+import logging
+import os
+import time
+from typing import Callable
+
+from sqlalchemy import select
+
+from config.db import engine
+from middleware.metrics import registry
+from models.gallery_manifest import gallery_manifests
+from models.migrations import ensure_schema
+
+logger = logging.getLogger(__name__)
+
+WARM_CONNECTIONS = int(os.getenv("STARTUP_WARM_CONNECTIONS", str(engine.pool.size())))
+WARM_GALLERIES = int(os.getenv("STARTUP_WARM_GALLERIES", "0"))
+
+# Funciones sin argumentos que devuelven una sentencia de las rutas más usadas
+_hot_statements: list[Callable] = []
+
+# Duración de cada fase del último arranque (segundos)
+timings: dict[str, float] = {}
+
+
+def register_hot_statement(build: Callable):
+    """
+    Registra una sentencia para prepararla en el arranque. build() debe
+    devolver la misma sentencia que usa la ruta, con parámetros que no
+    coincidan con ninguna fila (solo lecturas).
+    """
+    _hot_statements.append(build)
+    return build
+
+
+def _warm_connections() -> int:
+    """Abre las conexiones del pool a la vez (cada una aplica sus pragmas)."""
+    connections = []
+    try:
+        for _ in range(WARM_CONNECTIONS):
+            connections.append(engine.connect())
+    finally:
+        for conn in connections:
+            conn.close()
+    return len(connections)
+
+
+def _warm_statements() -> int:
+    """Ejecuta las sentencias registradas en cada conexión del pool."""
+    statements = [build() for build in _hot_statements]
+    connections = []
+    try:
+        for _ in range(max(1, WARM_CONNECTIONS)):
+            conn = engine.connect()
+            connections.append(conn)
+            for statement in statements:
+                conn.execute(statement).fetchall()
+            conn.rollback()
+    finally:
+        for conn in connections:
+            conn.close()
+    return len(statements)
+
+
+def _warm_caches() -> int:
+    """Prepara los manifiestos de las galerías usadas más recientemente."""
+    if WARM_GALLERIES <= 0:
+        return 0
+    from services import manifests
+
+    with engine.connect() as conn:
+        gallery_ids = conn.execute(
+            select(gallery_manifests.c.gallery_id)
+            .order_by(gallery_manifests.c.built_at.desc())
+            .limit(WARM_GALLERIES)
+        ).scalars().all()
+    for gallery_id in gallery_ids:
+        manifests.build(gallery_id)
+    return len(gallery_ids)
+
+
+def run():
+    """Prepara el proceso para servir peticiones (ver docstring del módulo)."""
+    start = time.perf_counter()
+    results = {}
+    phases = (
+        ("schema", ensure_schema),
+        ("connections", _warm_connections),
+        ("statements", _warm_statements),
+        ("caches", _warm_caches),
+    )
+    for phase, step in phases:
+        phase_start = time.perf_counter()
+        try:
+            results[phase] = step()
+        except Exception:
+            # El esquema es imprescindible; el resto solo acelera
+            if phase == "schema":
+                raise
+            logger.exception("Fallo en la fase '%s' del arranque", phase)
+        timings[phase] = time.perf_counter() - phase_start
+    timings["total"] = time.perf_counter() - start
+
+    logger.info(
+        "Arranque completado en %.0f ms (esquema %s, %s conexiones, %s sentencias, %s manifiestos)",
+        timings["total"] * 1000,
+        "actualizado" if results.get("schema") else "sin cambios",
+        results.get("connections", 0),
+        results.get("statements", 0),
+        results.get("caches", 0),
+    )
+    return timings
+
+
+def metrics() -> list[str]:
+    """Duración del arranque para GET /metrics."""
+    if not timings:
+        return []
+    lines = [
+        "# HELP app_startup_seconds Duración de las fases del arranque del proceso",
+        "# TYPE app_startup_seconds gauge",
+    ]
+    lines += [f'app_startup_seconds{{phase="{phase}"}} {seconds:.6f}' for phase, seconds in timings.items()]
+    return lines
+
+
+registry.register_collector(metrics)
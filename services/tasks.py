@@ -0,0 +1,58 @@
+# services/tasks.py
+"""
+Tareas disponibles para los workers de la cola
+
+Importar este módulo registra todas las tareas en `services.queue`.
+Los workers (scripts/worker.py) lo importan antes de empezar a consumir.
+"""
+
+from config.db import get_db
+from services import manifests, phash, ranking
+from services.queue import task, purge_finished
+
+
+# -------------------------------------------------------------------
+# Tarea de mantenimiento: elimina los trabajos terminados antiguos
+# para que la tabla 'jobs' no crezca indefinidamente
+# Payload:
+#   - older_than (int): Antigüedad mínima en segundos (por defecto 7 días)
+# -------------------------------------------------------------------
+@task("queue.purge", max_attempts=3)
+def purge_old_jobs(older_than: int = 7 * 24 * 3600):
+    return purge_finished(older_than)
+
+
+# -------------------------------------------------------------------
+# Hash perceptual de un lote de fotos (detección de casi duplicados)
+# Payload:
+#   - photo_ids (list[int]): Fotos a procesar (las que ya tienen hash se saltan)
+# Ver services/phash.py
+# -------------------------------------------------------------------
+@task("photos.phash", max_attempts=3)
+def compute_photo_hashes(photo_ids: list[int]):
+    return phash.hash_photos(photo_ids)
+
+
+# -------------------------------------------------------------------
+# Reparte de nuevo las claves de orden de una galería cuando se han
+# alargado demasiado (muchos movimientos al mismo hueco)
+# Payload:
+#   - gallery_id (int): Galería a reequilibrar
+# Ver services/ranking.py
+# -------------------------------------------------------------------
+@task(ranking.REBALANCE_TASK, max_attempts=5)
+def rebalance_gallery_ranks(gallery_id: int):
+    with get_db() as db:
+        return {"rewritten": ranking.rebalance_gallery(db, gallery_id)}
+
+
+# -------------------------------------------------------------------
+# Regenera el manifiesto precalculado de una galería tras un cambio
+# Payload:
+#   - gallery_id (int): Galería modificada
+# Ver services/manifests.py
+# -------------------------------------------------------------------
+@task(manifests.MANIFEST_TASK, max_attempts=3)
+def build_gallery_manifest(gallery_id: int):
+    built = manifests.build(gallery_id)
+    return {"version": built[0] if built else None}
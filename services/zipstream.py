@@ -0,0 +1,138 @@
+# services/zipstream.py
+"""
+Generación de ficheros ZIP en streaming
+
+El archivo se construye sobre la marcha mientras se envía al cliente:
+- Las entradas se guardan sin comprimir (ZIP_STORED); los JPEG no comprimen
+  y recomprimirlos solo gastaría CPU.
+- La memoria usada es constante: como mucho `read_ahead` bloques leídos por
+  adelantado más el bloque que se está enviando.
+- Zip64 se activa automáticamente para ficheros o archivos de más de 4 GB.
+- Como la salida no es "seekable", zipfile escribe el CRC y los tamaños en un
+  data descriptor tras cada fichero, así que nada se lee dos veces del disco.
+
+Ejemplo de uso:
+    files = [("boda_001.jpg", Path("/data/uploads/sessions/1/boda_001.jpg"))]
+    return StreamingResponse(stream_zip(files), media_type="application/zip")
+"""
+
+import os
+import queue
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# Tamaño de cada bloque leído del disco
+CHUNK_SIZE = 1024 * 1024
+
+# Número máximo de bloques leídos por adelantado
+READ_AHEAD = 4
+
+# Fecha mínima representable en un ZIP (1980-01-01)
+_MIN_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class _Sink:
+    """Destino de escritura sin seek: acumula los bytes hasta que se envían."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _read_chunks(path: Path, chunk_size: int, read_ahead: int) -> Iterator[bytes]:
+    """
+    Lee un fichero por bloques en un hilo aparte.
+    La cola acotada limita la memoria y solapa la lectura del disco con el envío.
+    """
+    chunks: queue.Queue = queue.Queue(maxsize=read_ahead)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Reintenta periódicamente para poder abandonar si el consumidor se detiene
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def reader():
+        try:
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not put(chunk) or not chunk:
+                        return
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=reader, name="zip-read-ahead", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if isinstance(item, BaseException):
+                raise item
+            if not item:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def stream_zip(
+    files: Iterable[tuple[str, Path]],
+    chunk_size: int = CHUNK_SIZE,
+    read_ahead: int = READ_AHEAD,
+) -> Iterator[bytes]:
+    """
+    Genera los bytes de un ZIP con los ficheros indicados.
+
+    Args:
+        files: Pares (nombre dentro del ZIP, ruta en disco)
+        chunk_size: Tamaño de los bloques leídos del disco
+        read_ahead: Bloques que se pueden leer por adelantado
+    """
+    for data in _generate(files, chunk_size, read_ahead):
+        if data:
+            yield data
+
+
+def _generate(files, chunk_size, read_ahead) -> Iterator[bytes]:
+    sink = _Sink()
+
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for arcname, path in files:
+            stat = os.stat(path)
+            date_time = max(time.localtime(stat.st_mtime)[:6], _MIN_DATE_TIME)
+
+            info = zipfile.ZipInfo(arcname, date_time=date_time)
+            info.compress_type = zipfile.ZIP_STORED
+            # Con el tamaño conocido, zipfile decide si la entrada necesita Zip64
+            info.file_size = stat.st_size
+
+            with archive.open(info, "w") as entry:
+                for chunk in _read_chunks(path, chunk_size, read_ahead):
+                    entry.write(chunk)
+                    yield sink.drain()
+
+            # Data descriptor de la entrada
+            yield sink.drain()
+
+    # Directorio central (y registros Zip64 si hacen falta)
+    yield sink.drain()
@@ -0,0 +1,60 @@
+# tests/conftest.py
+
+"""
+Configuración común de los tests
+
+Los tests usan su propia base de datos SQLite en un directorio temporal
+(DATABASE_URL se fija antes de importar la aplicación) con los datos de
+ejemplo de scripts/init_db.py.
+
+Ejecución, desde el directorio raíz del proyecto:
+    python -m pytest -q
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_tmp = tempfile.mkdtemp(prefix="fotos-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["BACKUP_DIR"] = f"{_tmp}/backups"
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from scripts.init_db import init_db
+
+    from config.db import engine
+
+    init_db()
+    with TestClient(app) as test_client:
+        yield test_client
+    engine.dispose()
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def login(client):
+    """Cabeceras de autorización para un usuario de ejemplo."""
+
+    def headers(email: str, password: str) -> dict:
+        response = client.post("/token", data={"username": email, "password": password})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return headers
+
+
+@pytest.fixture(scope="session")
+def admin_headers(login):
+    return login("admin@example.com", "admin123")
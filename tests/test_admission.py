@@ -0,0 +1,96 @@
+# tests/test_admission.py
+
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from middleware.admission import AdmissionMiddleware, classify
+
+
+def make_app(**admission):
+    """App mínima cuyas peticiones esperan a que el test las deje terminar."""
+    state = {"started": [], "gate": None}
+
+    async def endpoint(request):
+        state["started"].append(f"{request.method} {request.url.path}")
+        await state["gate"].wait()
+        return JSONResponse({"ok": True})
+
+    app = Starlette(routes=[
+        Route("/slow", endpoint, methods=["GET", "POST"]),
+        Route("/token", endpoint, methods=["POST"]),
+        Route("/metrics", endpoint),
+    ])
+    return AdmissionMiddleware(app, **admission), state
+
+
+async def run_requests(app, state, *requests, release_after=0.2):
+    state["gate"] = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        pending = []
+        for method, path in requests:
+            pending.append(asyncio.ensure_future(client.request(method, path)))
+            # Llegan en el orden indicado
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(release_after)
+        state["gate"].set()
+        return await asyncio.gather(*pending)
+
+
+def test_queue_full_returns_503():
+    app, state = make_app(limits={"read": (1, 1)}, queue_timeout=5)
+    responses = asyncio.run(run_requests(app, state, ("GET", "/slow"), ("GET", "/slow"), ("GET", "/slow")))
+
+    assert [r.status_code for r in responses] == [200, 200, 503]
+    assert responses[2].headers["retry-after"] == "5"
+    assert "sobrecargado" in responses[2].json()["detail"]
+    read = app.controller.classes["read"]
+    assert read.rejected == {"queue_full": 1, "timeout": 0}
+    assert read.in_flight == 0 and not read.waiters
+
+
+def test_queue_timeout_returns_503():
+    app, state = make_app(limits={"read": (1, 5)}, queue_timeout=0.05)
+    responses = asyncio.run(run_requests(app, state, ("GET", "/slow"), ("GET", "/slow")))
+
+    assert [r.status_code for r in responses] == [200, 503]
+    assert responses[1].headers["retry-after"] == "1"
+    assert app.controller.classes["read"].rejected == {"queue_full": 0, "timeout": 1}
+    assert app.controller.in_flight == 0
+
+
+def test_exempt_paths_are_never_rejected():
+    app, state = make_app(max_in_flight=1, limits={"read": (1, 0)}, queue_timeout=5)
+    responses = asyncio.run(run_requests(app, state, ("GET", "/slow"), ("GET", "/metrics"), ("GET", "/slow")))
+    assert [r.status_code for r in responses] == [200, 200, 503]
+
+
+def test_free_slots_go_to_reads_first():
+    app, state = make_app(max_in_flight=1, queue_timeout=5)
+    responses = asyncio.run(run_requests(
+        app, state, ("POST", "/slow"), ("POST", "/token"), ("GET", "/slow"), release_after=0.1,
+    ))
+
+    assert all(r.status_code == 200 for r in responses)
+    # El login llegó antes, pero la lectura tiene prioridad
+    assert state["started"] == ["POST /slow", "GET /slow", "POST /token"]
+
+
+def test_classify():
+    def scope(method, path):
+        return {"method": method, "path": path}
+
+    assert classify(scope("GET", "/galleries/1")) == "read"
+    assert classify(scope("GET", "/galleries/1/selection.zip")) == "stream"
+    assert classify(scope("POST", "/token")) == "auth"
+    assert classify(scope("PUT", "/galleries/1/photos/order")) == "write"
+
+
+def test_app_requests_are_admitted(client):
+    # La app real lleva el middleware: las peticiones normales pasan y se cuentan
+    assert client.get("/metrics").status_code == 200
+    assert 'admission_admitted_total{class="read"}' in client.get("/metrics").text
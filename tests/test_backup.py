@@ -0,0 +1,100 @@
+# tests/test_backup.py
+
+import gzip
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import backup
+
+
+@pytest.fixture
+def backup_dir(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "BACKUP_DIR", tmp_path)
+    return tmp_path
+
+
+def wait_finished(client, headers, backup_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = client.get(f"/admin/backups/{backup_id}", headers=headers).json()
+        if info["status"] != "running":
+            return info
+        time.sleep(0.05)
+    raise AssertionError(f"La copia {backup_id} no terminó")
+
+
+def test_compressed_backup(backup_dir, tmp_path):
+    result = backup.run(compress=True)
+    assert result.status == "done", result.error
+    assert result.file.endswith(".db.gz")
+    assert not (backup_dir / backup.LOCK_NAME).exists()
+    assert not list(backup_dir.glob("*.partial"))
+
+    # La exportación es una base de datos SQLite válida y autónoma
+    restored = tmp_path / "restored.db"
+    with gzip.open(backup_dir / result.file) as packed:
+        restored.write_bytes(packed.read())
+    conn = sqlite3.connect(restored)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert conn.execute("SELECT count(*) FROM users").fetchone()[0] > 0
+    finally:
+        conn.close()
+
+
+def test_backup_in_progress_returns_409(client, admin_headers, backup_dir):
+    # Otra copia reservada (p. ej. por otro worker o por scripts/backup.py)
+    other = backup.claim(compress=False)
+    try:
+        response = client.post("/admin/backups", headers=admin_headers)
+        assert response.status_code == 409
+        with pytest.raises(backup.BackupInProgress):
+            backup.run()
+    finally:
+        backup.release(other)
+        other.status = "failed"
+        other.save(force=True)
+
+    response = client.post("/admin/backups?compress=true", headers=admin_headers)
+    assert response.status_code == 202, response.text
+    info = wait_finished(client, admin_headers, response.json()["id"])
+    assert info["status"] == "done"
+    assert info["file"].endswith(".db.gz")
+    assert not (backup_dir / backup.LOCK_NAME).exists()
+
+
+def test_only_one_claim_wins(backup_dir):
+    def try_claim(_):
+        try:
+            return backup.claim(compress=False)
+        except backup.BackupInProgress:
+            return None
+
+    with ThreadPoolExecutor(8) as pool:
+        claims = [claimed for claimed in pool.map(try_claim, range(8)) if claimed is not None]
+    assert len(claims) == 1
+    backup.release(claims[0])
+
+
+def test_stale_backup_is_abandoned(backup_dir):
+    stale = backup.claim(compress=False)
+    # El proceso que la hacía murió: su progreso dejó de actualizarse
+    sidecar = backup_dir / f"{stale.id}.json"
+    info = json.loads(sidecar.read_text())
+    info["updated_at"] -= backup.STALE_AFTER + 1
+    sidecar.write_text(json.dumps(info))
+
+    reported = backup.get_backup(stale.id)
+    assert reported["status"] == "failed"
+    assert "abandonada" in reported["error"]
+
+    # Su reserva ya no impide hacer otra copia
+    result = backup.run()
+    assert result.status == "done", result.error
+    assert result.id != stale.id
+    assert not (backup_dir / backup.LOCK_NAME).exists()
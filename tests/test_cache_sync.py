@@ -0,0 +1,83 @@
+# tests/test_cache_sync.py
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+
+from config.db import get_db
+from models.cache_invalidation import cache_invalidations
+from services import cache_sync
+from services.response_cache import invalidate
+
+CLIENT = ("cliente@example.com", "cliente123")
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def sync(client, monkeypatch):
+    monkeypatch.setattr(cache_sync, "ENABLED", True)
+    watcher = cache_sync.CacheSync()
+    watcher.poll()
+    yield watcher
+    watcher._close()
+
+
+def published_count():
+    with get_db() as db:
+        return db.execute(select(func.count()).select_from(cache_invalidations)).scalar()
+
+
+def publish_from_other_process(tags):
+    subprocess.run(
+        [sys.executable, "-c", f"from services import cache_sync; cache_sync.publish({tags!r})"],
+        cwd=ROOT,
+        env={**os.environ, "WEB_CONCURRENCY": "2"},
+        check=True,
+    )
+
+
+def cached(client, headers):
+    response = client.get("/galleries/1", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.headers["x-cache"] == "HIT"
+
+
+def test_invalidation_from_other_process(client, login, sync):
+    headers = login(*CLIENT)
+    cached(client, headers)
+    assert cached(client, headers)
+
+    publish_from_other_process(["gallery:1"])
+    # Hasta la siguiente comprobación se sigue sirviendo desde la caché
+    assert cached(client, headers)
+    sync.poll()
+    assert not cached(client, headers)
+    assert cached(client, headers)
+
+    # Las etiquetas de otras galerías no afectan
+    publish_from_other_process(["gallery:2"])
+    sync.poll()
+    assert cached(client, headers)
+
+
+def test_own_invalidations_are_not_applied_twice(client, login, sync):
+    headers = login(*CLIENT)
+    cached(client, headers)
+    assert cached(client, headers)
+
+    before = published_count()
+    cache_sync.publish(["gallery:1"])
+    assert published_count() == before + 1
+    sync.poll()
+    assert cached(client, headers)
+
+
+def test_single_worker_does_not_publish(client, monkeypatch):
+    monkeypatch.setattr(cache_sync, "ENABLED", False)
+    before = published_count()
+    invalidate("gallery:1")
+    assert published_count() == before
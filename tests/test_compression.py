@@ -0,0 +1,96 @@
+# tests/test_compression.py
+
+import asyncio
+import gzip
+import json
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from middleware import compression
+from middleware.compression import CompressionMiddleware
+
+ROWS = [{"id": i, "email": f"usuario{i}@example.com", "name": f"Usuario {i}"} for i in range(2000)]
+
+
+def make_app(chunks):
+    async def stream(request):
+        async def body():
+            for chunk in chunks:
+                yield chunk
+        return StreamingResponse(body(), media_type="application/json")
+
+    async def full(request):
+        return JSONResponse(ROWS)
+
+    return CompressionMiddleware(
+        Starlette(routes=[Route("/stream", stream), Route("/full", full)]),
+        minimum_size=1024,
+        encodings=["gzip"],
+    )
+
+
+def call(app, path):
+    """Ejecuta una petición ASGI y devuelve (cabeceras, cuerpos enviados)."""
+    sent = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # El cliente sigue conectado hasta el final
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "scheme": "http", "server": ("test", 80),
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    asyncio.run(app(scope, receive, send))
+    headers = {name.decode(): value.decode() for name, value in sent[0]["headers"]}
+    bodies = [message["body"] for message in sent[1:]]
+    return headers, bodies
+
+
+def test_small_stream_is_buffered_and_sent_uncompressed():
+    headers, bodies = call(make_app([b"[", b'{"id":1}', b"]"]), "/stream")
+    assert "content-encoding" not in headers
+    assert bodies == [b'[{"id":1}]']
+
+
+def test_stream_is_not_flushed_on_every_chunk(monkeypatch):
+    monkeypatch.setattr(compression, "STREAM_FLUSH_INTERVAL", 60)
+    chunks = [json.dumps(row).encode() + b"\n" for row in ROWS]
+    headers, bodies = call(make_app(chunks), "/stream")
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert gzip.decompress(b"".join(bodies)) == b"".join(chunks)
+    # Un vaciado cada STREAM_FLUSH_SIZE bytes, no uno por trozo
+    raw_size = sum(map(len, chunks))
+    assert len(bodies) <= raw_size // compression.STREAM_FLUSH_SIZE + 3
+    # Comprime como si fuera una sola respuesta
+    assert len(b"".join(bodies)) < 2 * len(gzip.compress(b"".join(chunks)))
+
+
+def test_stream_is_flushed_after_interval(monkeypatch):
+    monkeypatch.setattr(compression, "STREAM_FLUSH_INTERVAL", 0)
+    chunks = [b"x" * 2000, b"y" * 10, b"z" * 10]
+    headers, bodies = call(make_app(chunks), "/stream")
+    assert headers["content-encoding"] == "gzip"
+    # Con intervalo 0 cada trozo se envía en cuanto llega (más el cierre del gzip)
+    assert len(bodies) == 4 and all(bodies)
+    assert gzip.decompress(b"".join(bodies)) == b"".join(chunks)
+
+
+def test_full_response_has_content_length():
+    headers, [body] = call(make_app([]), "/full")
+    assert headers["content-encoding"] == "gzip"
+    assert headers["content-length"] == str(len(body))
+    assert json.loads(gzip.decompress(body)) == ROWS
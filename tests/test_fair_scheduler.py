@@ -0,0 +1,140 @@
+# tests/test_fair_scheduler.py
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import fair_scheduler
+from services.fair_scheduler import FairScheduler, TenantBusy, tenant_var
+from services.response_cache import invalidate
+
+CLIENT = ("cliente@example.com", "cliente123")
+
+
+def hold(scheduler, tenant, seconds, log=None):
+    """Ocupa una conexión del tenant durante `seconds` (en el hilo actual)."""
+    tenant_var.set(tenant)
+    with scheduler.slot():
+        if log is not None:
+            log.append(tenant)
+        time.sleep(seconds)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condición no alcanzada"
+        time.sleep(0.005)
+
+
+def test_tenant_quota():
+    scheduler = FairScheduler(max_concurrency=8, tenant_limit=2, timeout=5)
+    peak = 0
+
+    def work(_):
+        nonlocal peak
+        tenant_var.set(1)
+        with scheduler.slot():
+            peak = max(peak, scheduler._state(1).active)
+            time.sleep(0.05)
+
+    with ThreadPoolExecutor(6) as pool:
+        list(pool.map(work, range(6)))
+    assert peak == 2
+    assert scheduler.active == 0
+
+
+def test_busy_tenant_does_not_block_others():
+    scheduler = FairScheduler(max_concurrency=8, tenant_limit=1, timeout=5)
+    with ThreadPoolExecutor(3) as pool:
+        pool.submit(hold, scheduler, 1, 0.3)
+        pool.submit(hold, scheduler, 1, 0.3)
+        wait_until(lambda: scheduler._state(1).waiting)
+
+        start = time.perf_counter()
+        hold(scheduler, 2, 0)
+        assert time.perf_counter() - start < 0.1
+
+
+def test_timeout_raises_tenant_busy():
+    scheduler = FairScheduler(max_concurrency=8, tenant_limit=1, timeout=0.1)
+    with ThreadPoolExecutor(1) as pool:
+        holder = pool.submit(hold, scheduler, 1, 0.4)
+        wait_until(lambda: scheduler._state(1).active == 1)
+        with pytest.raises(TenantBusy) as busy:
+            hold(scheduler, 1, 0)
+        holder.result()
+
+    assert busy.value.status_code == 503
+    assert busy.value.headers == {"Retry-After": "1"}
+    state = scheduler._state(1)
+    assert state.timeouts == 1
+    assert not state.waiting and state.active == 0
+
+
+def test_free_slot_goes_to_tenant_with_less_usage():
+    scheduler = FairScheduler(max_concurrency=1, tenant_limit=4, timeout=5)
+    # El tenant 1 ya ha usado la base de datos un rato
+    hold(scheduler, 1, 0.1)
+
+    order = []
+    with ThreadPoolExecutor(3) as pool:
+        pool.submit(hold, scheduler, 3, 0.2)
+        wait_until(lambda: scheduler.active == 1)
+        pool.submit(hold, scheduler, 1, 0, order)
+        wait_until(lambda: scheduler._state(1).waiting)
+        pool.submit(hold, scheduler, 2, 0, order)
+        wait_until(lambda: scheduler._state(2).waiting)
+    assert order == [2, 1]
+
+
+def test_requests_without_tenant_and_nested_slots_are_not_queued():
+    scheduler = FairScheduler(max_concurrency=1, tenant_limit=1, timeout=0.1)
+    tenant_var.set(None)
+    with scheduler.slot():
+        assert scheduler.active == 0
+
+    tenant_var.set(1)
+    try:
+        with scheduler.slot():
+            # Un get_db() dentro de otro no pide otro hueco
+            with scheduler.slot():
+                assert scheduler.active == 1
+    finally:
+        tenant_var.set(None)
+    assert scheduler.active == 0
+
+
+def test_slot_refuses_to_run_on_event_loop():
+    scheduler = FairScheduler()
+
+    async def main():
+        tenant_var.set(1)
+        with scheduler.slot():
+            pass
+
+    with pytest.raises(RuntimeError, match="bucle de eventos"):
+        asyncio.run(main())
+    assert scheduler.active == 0
+
+
+def test_endpoint_returns_503_when_tenant_is_busy(client, login, monkeypatch):
+    headers = login(*CLIENT)
+    scheduler = fair_scheduler.scheduler
+    monkeypatch.setattr(scheduler, "tenant_limit", 1)
+    monkeypatch.setattr(scheduler, "timeout", 0.1)
+    invalidate("gallery:1")
+
+    # Otra petición del mismo fotógrafo (tenant 2) ocupa su única conexión
+    holder = threading.Thread(target=hold, args=(scheduler, 2, 0.5))
+    holder.start()
+    wait_until(lambda: scheduler._state(2).active == 1)
+    response = client.get("/galleries/1", headers=headers)
+    holder.join()
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.get("/galleries/1", headers=headers).status_code == 200
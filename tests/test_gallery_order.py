@@ -0,0 +1,131 @@
+# tests/test_gallery_order.py
+
+import time
+
+from sqlalchemy import select
+
+# Galería 1 de los datos de ejemplo: fotos 1 y 2, del fotógrafo 2
+PHOTOGRAPHER = ("fotografo@example.com", "foto123")
+CLIENT = ("cliente@example.com", "cliente123")
+
+
+def photo_order(client, headers, gallery_id=1):
+    response = client.get(f"/galleries/{gallery_id}", headers=headers)
+    assert response.status_code == 200, response.text
+    return [photo["photo_id"] for photo in response.json()["photos"]]
+
+
+def test_move_to_front(client, login):
+    headers = login(*PHOTOGRAPHER)
+    assert photo_order(client, headers) == [1, 2]
+
+    response = client.put(
+        "/galleries/1/photos/order",
+        json={"photo_ids": [2], "after_photo_id": None},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    [position] = response.json()
+    assert position["photo_id"] == 2
+    assert photo_order(client, headers) == [2, 1]
+
+    # Mover una y otra vez al principio sigue funcionando (claves cada vez menores)
+    for photo_id in [1, 2, 1, 2, 1]:
+        response = client.put(
+            "/galleries/1/photos/order",
+            json={"photo_ids": [photo_id], "after_photo_id": None},
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        assert photo_order(client, headers)[0] == photo_id
+
+
+def test_move_after_photo(client, login):
+    headers = login(*PHOTOGRAPHER)
+    first, second = photo_order(client, headers)
+    response = client.put(
+        "/galleries/1/photos/order",
+        json={"photo_ids": [first], "after_photo_id": second},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert photo_order(client, headers) == [second, first]
+
+
+def test_move_errors(client, login):
+    headers = login(*PHOTOGRAPHER)
+    response = client.put(
+        "/galleries/1/photos/order",
+        json={"photo_ids": [1], "after_photo_id": 1},
+        headers=headers,
+    )
+    assert response.status_code == 400
+
+    response = client.put(
+        "/galleries/1/photos/order",
+        json={"photo_ids": [999], "after_photo_id": None},
+        headers=headers,
+    )
+    assert response.status_code == 404
+
+    # Solo el fotógrafo de la galería puede ordenarla
+    response = client.put(
+        "/galleries/1/photos/order",
+        json={"photo_ids": [1], "after_photo_id": None},
+        headers=login(*CLIENT),
+    )
+    assert response.status_code == 403
+
+
+def test_concurrent_moves_into_same_gap(client, login, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from config.db import get_db
+    from models.gallery import galleries
+    from models.gallery_photos import gallery_photos
+    from services import ranking
+
+    # Galería propia del fotógrafo 2 con las fotos 1 a 4
+    with get_db() as db:
+        gallery_id = db.execute(
+            galleries.insert().values(name="Concurrencia", photographer_id=2, client_id=3)
+        ).lastrowid
+        db.execute(
+            gallery_photos.insert(),
+            [
+                {"gallery_id": gallery_id, "photo_id": photo_id, "rank": ranking.initial_rank(photo_id)}
+                for photo_id in range(1, 5)
+            ],
+        )
+
+    # Entre leer las vecinas y escribir pasa tiempo: sin una transacción de
+    # escritura desde el principio, los dos movimientos verían el mismo hueco
+    keys_between = ranking.keys_between
+
+    def slow_keys_between(*args):
+        keys = keys_between(*args)
+        time.sleep(0.3)
+        return keys
+
+    monkeypatch.setattr(ranking, "keys_between", slow_keys_between)
+
+    headers = login(*PHOTOGRAPHER)
+
+    def move(photo_id):
+        return client.put(
+            f"/galleries/{gallery_id}/photos/order",
+            json={"photo_ids": [photo_id], "after_photo_id": 1},
+            headers=headers,
+        )
+
+    with ThreadPoolExecutor(2) as pool:
+        responses = list(pool.map(move, [3, 4]))
+    assert [response.status_code for response in responses] == [200, 200]
+
+    with get_db() as db:
+        ranks = db.execute(
+            select(gallery_photos.c.rank).where(gallery_photos.c.gallery_id == gallery_id)
+        ).scalars().all()
+    assert len(set(ranks)) == len(ranks) == 4
+    order = photo_order(client, headers, gallery_id)
+    assert order[0] == 1 and order[-1] == 2 and set(order[1:3]) == {3, 4}
@@ -0,0 +1,121 @@
+# tests/test_manifests.py
+
+import json
+import threading
+
+from sqlalchemy import select, update
+
+from config.db import get_db
+from config.security import settings
+from models.gallery import galleries
+from models.gallery_manifest import gallery_manifests
+from models.gallery_photos import gallery_photos
+from services import manifests, ranking
+
+PHOTOGRAPHER = ("fotografo@example.com", "foto123")
+
+
+def new_gallery(name="Manifiesto"):
+    """Galería del fotógrafo 2 con las fotos 1 y 2."""
+    with get_db() as db:
+        gallery_id = db.execute(
+            galleries.insert().values(name=name, photographer_id=2, client_id=3)
+        ).lastrowid
+        db.execute(
+            gallery_photos.insert(),
+            [
+                {"gallery_id": gallery_id, "photo_id": photo_id, "rank": ranking.initial_rank(photo_id)}
+                for photo_id in (1, 2)
+            ],
+        )
+    return gallery_id
+
+
+def rename(gallery_id, name):
+    """Escritura que cambia lo que muestra la galería (como haría un endpoint)."""
+    with get_db() as db:
+        db.execute(update(galleries).where(galleries.c.id == gallery_id).values(name=name))
+        manifests.mark_stale(db, [gallery_id])
+
+
+def manifest_row(gallery_id):
+    with get_db() as db:
+        return db.execute(
+            select(gallery_manifests).where(gallery_manifests.c.gallery_id == gallery_id)
+        ).first()
+
+
+def test_build_and_reuse(client):
+    gallery_id = new_gallery()
+    version, body = manifests.build(gallery_id)
+    assert version == 0
+    assert json.loads(body)["name"] == "Manifiesto"
+
+    row = manifest_row(gallery_id)
+    assert manifests.is_fresh(row)
+    # Fresco: se devuelve el guardado sin volver a generarlo
+    assert manifests.build(gallery_id) == (0, row.body)
+
+
+def test_stale_manifest_is_rebuilt(client, login):
+    gallery_id = new_gallery()
+    manifests.build(gallery_id)
+
+    rename(gallery_id, "Renombrada")
+    row = manifest_row(gallery_id)
+    assert row.version == 1 and row.built_version == 0
+    assert not manifests.is_fresh(row)
+
+    # La lectura no espera al worker: genera la versión nueva ella misma
+    response = client.get(f"/galleries/{gallery_id}", headers=login(*PHOTOGRAPHER))
+    assert response.status_code == 200, response.text
+    assert response.headers[manifests.VERSION_HEADER] == "1"
+    assert response.json()["name"] == "Renombrada"
+    assert manifest_row(gallery_id).built_version == 1
+
+
+def test_manifest_from_previous_url_window_is_stale(client):
+    gallery_id = new_gallery()
+    manifests.build(gallery_id)
+    row = manifest_row(gallery_id)
+    assert manifests.is_fresh(row, now=row.built_at)
+    assert not manifests.is_fresh(row, now=row.built_at + settings.MEDIA_URL_EXPIRE_SECONDS)
+
+
+def test_slow_build_does_not_overwrite_newer_manifest(client, monkeypatch):
+    gallery_id = new_gallery()
+    rendering = threading.Event()
+    resume = threading.Event()
+    render = manifests._render
+
+    def slow_render(db, gallery_id, version, now):
+        body = render(db, gallery_id, version, now)
+        if threading.current_thread() is not threading.main_thread():
+            rendering.set()
+            resume.wait(5)
+        return body
+
+    monkeypatch.setattr(manifests, "_render", slow_render)
+
+    # Una generación de la versión 0 se queda a medias...
+    result = {}
+    slow = threading.Thread(target=lambda: result.update(built=manifests.build(gallery_id)))
+    slow.start()
+    assert rendering.wait(5)
+
+    # ...mientras otra escritura y otra generación guardan la versión 1
+    rename(gallery_id, "Nueva")
+    assert manifests.build(gallery_id)[0] == 1
+
+    resume.set()
+    slow.join()
+    assert result["built"][0] == 0
+
+    row = manifest_row(gallery_id)
+    assert row.built_version == 1
+    assert json.loads(row.body)["name"] == "Nueva"
+    assert manifests.is_fresh(row)
+
+
+def test_missing_gallery(client):
+    assert manifests.build(999999) is None
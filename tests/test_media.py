@@ -0,0 +1,84 @@
+# tests/test_media.py
+
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from config import storage
+from config.security import media_url, sign_media_path
+
+CLIENT = ("cliente@example.com", "cliente123")
+PHOTO = "uploads/sessions/1/boda_001.jpg"
+
+
+@pytest.fixture
+def media_root(tmp_path, monkeypatch):
+    root = tmp_path / "media"
+    (root / "uploads/sessions/1").mkdir(parents=True)
+    (root / PHOTO).write_bytes(b"\xff\xd8jpeg")
+    monkeypatch.setattr(storage, "MEDIA_ROOT", root)
+    return root
+
+
+def signed(path, expires):
+    return f"/media/{path}?expires={expires}&signature={sign_media_path(path, expires)}"
+
+
+def test_signed_url_serves_file(client, login, media_root):
+    # La URL que entrega la galería sirve el fichero sin token
+    response = client.get("/galleries/1", headers=login(*CLIENT))
+    [url] = [photo["url"] for photo in response.json()["photos"] if photo["photo_id"] == 1]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == b"\xff\xd8jpeg"
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert "x-cache" not in response.headers
+
+
+def test_urls_are_stable_within_a_window(client):
+    now = time.time()
+    assert media_url(f"/{PHOTO}", now) == media_url(PHOTO, now)
+    expires = int(parse_qs(urlsplit(media_url(PHOTO, now)).query)["expires"][0])
+    assert expires > now
+
+
+def test_bad_signature(client, media_root):
+    url = media_url(PHOTO)
+    expires = parse_qs(urlsplit(url).query)["expires"][0]
+
+    assert client.get(f"/media/{PHOTO}?expires={expires}&signature=AAAAAAAAAAAAAAAAAAAAAA").status_code == 403
+    # La firma de otra foto o de otra caducidad no vale
+    other = signed("uploads/sessions/1/boda_002.jpg", int(expires))
+    assert client.get(other.replace("boda_002", "boda_001")).status_code == 403
+    assert client.get(url.replace(f"expires={expires}", f"expires={int(expires) + 1}")).status_code == 403
+    assert client.get(f"/media/{PHOTO}?expires={expires}").status_code == 422
+
+
+def test_expired_url(client, media_root):
+    response = client.get(signed(PHOTO, int(time.time()) - 1))
+    assert response.status_code == 403
+    assert response.json()["detail"] == "URL no válida o caducada"
+
+
+def test_path_traversal(client, media_root, monkeypatch):
+    from routes import media
+
+    requested = []
+    resolve = media.resolve_media_path
+    monkeypatch.setattr(media, "resolve_media_path", lambda path: requested.append(path) or resolve(path))
+
+    secret = media_root.parent / "secret.txt"
+    secret.write_text("no")
+    # Aunque la firma sea válida, la ruta no puede salir de MEDIA_ROOT
+    expires = int(time.time()) + 60
+    path = "../secret.txt"
+    url = f"/media/..%2Fsecret.txt?expires={expires}&signature={sign_media_path(path, expires)}"
+    assert client.get(url).status_code == 404
+    assert requested == [path]
+
+
+def test_missing_file(client, media_root):
+    response = client.get(signed("uploads/sessions/1/no_existe.jpg", int(time.time()) + 60))
+    assert response.status_code == 404
@@ -0,0 +1,101 @@
+# tests/test_migrations.py
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Index, MetaData, create_engine
+
+from config.db import meta
+from models.migrations import clear_schema_fingerprint, ensure_schema, schema_fingerprint
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Proceso que aplica ensure_schema() a la vez que los demás (como varios
+# workers de uvicorn arrancando juntos) y escribe si ejecutó el DDL
+RACE_SCRIPT = """
+import sys, time
+from models.migrations import ensure_schema
+time.sleep(max(0, float(sys.argv[1]) - time.time()))
+print(ensure_schema())
+"""
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/schema.db")
+    yield engine
+    engine.dispose()
+
+
+def user_version(engine):
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def index_names(engine):
+    with engine.connect() as conn:
+        return set(conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+
+
+def test_fingerprint_match_skips_ddl(engine):
+    assert ensure_schema(engine) is True
+    assert user_version(engine) == schema_fingerprint(engine, meta)
+
+    # Misma huella: no se ejecuta nada
+    assert ensure_schema(engine) is False
+    assert ensure_schema(engine, force=True) is True
+
+    # Sin huella (p. ej. tras borrar las tablas) se vuelve a aplicar
+    clear_schema_fingerprint(engine)
+    assert user_version(engine) == 0
+    assert ensure_schema(engine) is True
+
+
+def test_fingerprint_mismatch_applies_changes(engine):
+    ensure_schema(engine)
+
+    # Los modelos declaran un índice nuevo: cambia la huella y se crea
+    changed = MetaData()
+    for table in meta.sorted_tables:
+        table.to_metadata(changed)
+    photos = changed.tables["photos"]
+    Index("ix_photos_description", photos.c.description)
+
+    assert schema_fingerprint(engine, changed) != schema_fingerprint(engine, meta)
+    assert "ix_photos_description" not in index_names(engine)
+    assert ensure_schema(engine, changed) is True
+    assert "ix_photos_description" in index_names(engine)
+    assert user_version(engine) == schema_fingerprint(engine, changed)
+    assert ensure_schema(engine, changed) is False
+
+
+def test_processes_racing_ensure_schema(tmp_path):
+    database = tmp_path / "race.db"
+    start_at = str(time.time() + 1.0)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", RACE_SCRIPT, start_at],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(4)
+    ]
+    results = []
+    for process in processes:
+        stdout, stderr = process.communicate(timeout=60)
+        assert process.returncode == 0, stderr
+        results.append(stdout.strip())
+
+    # Solo uno ejecuta el DDL; los demás esperan y encuentran la huella
+    assert sorted(results) == ["False", "False", "False", "True"]
+
+    engine = create_engine(f"sqlite:///{database}")
+    try:
+        assert user_version(engine) == schema_fingerprint(engine, meta)
+        assert ensure_schema(engine) is False
+    finally:
+        engine.dispose()
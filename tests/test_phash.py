@@ -0,0 +1,128 @@
+# tests/test_phash.py
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from config import storage
+from config.db import get_db
+from models.photo import photos
+from models.session import sessions
+from services import phash
+
+PHOTOGRAPHER = ("fotografo@example.com", "foto123")
+
+
+def new_session(paths):
+    """Sesión nueva del fotógrafo 2 con una foto por ruta; devuelve (sesión, fotos)."""
+    with get_db() as db:
+        session_id = db.execute(
+            sessions.insert().values(name="Duplicados", date=datetime(2024, 5, 1), photographer_id=2)
+        ).lastrowid
+        photo_ids = [
+            db.execute(
+                photos.insert().values(description=path, path=path, session_id=session_id)
+            ).lastrowid
+            for path in paths
+        ]
+    return session_id, photo_ids
+
+
+def photo_row(photo_id):
+    with get_db() as db:
+        return db.execute(select(photos).where(photos.c.id == photo_id)).first()
+
+
+def test_failed_hashes_are_not_requeued(client, login, monkeypatch):
+    headers = login(*PHOTOGRAPHER)
+    session_id, (missing, ok) = new_session(["/uploads/falta.jpg", "/uploads/bien.jpg"])
+
+    def fake_phash(path):
+        if path.name == "falta.jpg":
+            raise FileNotFoundError(path)
+        return 0x8000000000000001
+
+    monkeypatch.setattr(phash, "compute_phash", fake_phash)
+
+    response = client.post(f"/sessions/{session_id}/phash", headers=headers)
+    assert response.status_code == 202, response.text
+    assert response.json() == {"photos": 2, "jobs": 1}
+
+    # Lo que haría el worker con ese trabajo
+    assert phash.hash_photos([missing, ok]) == {"hashed": 1, "failed": 1}
+    assert photo_row(missing).phash_failed_at is not None
+    assert photo_row(ok).phash == phash.to_signed(0x8000000000000001) < 0
+
+    # Ni se vuelve a encolar ni se reintenta en otro lote
+    response = client.post(f"/sessions/{session_id}/phash", headers=headers)
+    assert response.json() == {"photos": 0, "jobs": 0}
+    assert phash.hash_photos([missing, ok]) == {"hashed": 0, "failed": 0}
+
+    # Salvo que se pida expresamente
+    response = client.post(f"/sessions/{session_id}/phash?retry_failed=true", headers=headers)
+    assert response.json() == {"photos": 1, "jobs": 1}
+    assert photo_row(missing).phash_failed_at is None
+
+
+def test_enqueue_in_batches(client, monkeypatch):
+    monkeypatch.setattr(phash, "JOB_BATCH_SIZE", 2)
+    session_id, _ = new_session([f"/uploads/lote_{i}.jpg" for i in range(5)])
+    with get_db() as db:
+        assert phash.enqueue_missing(db, photos.c.session_id == session_id) == {"photos": 5, "jobs": 3}
+
+
+def test_find_clusters(monkeypatch):
+    pytest.importorskip("numpy")
+    ids = [10, 11, 12, 13, 14, 15]
+    hashes = [
+        0,
+        0b1111,                                 # a 4 de la 10
+        0b11111111,                             # a 4 de la 11 y a 8 de la 10
+        phash.to_signed(0xFFFFFFFF00000000),    # lejos de todas
+        phash.to_signed(0xFFFFFFFF00000001),    # a 1 de la 13 (bit de signo incluido)
+        phash.to_signed(0x0F0F0F0F0F0F0F0F),
+    ]
+
+    # Los grupos son transitivos y salen de mayor a menor
+    assert phash.find_clusters(ids, hashes, max_distance=6) == [[10, 11, 12], [13, 14]]
+    assert phash.find_clusters(ids, hashes, max_distance=3) == [[13, 14]]
+    assert phash.find_clusters(ids, hashes, max_distance=0) == []
+    assert phash.find_clusters([1, 2], [7, 7], max_distance=0) == [[1, 2]]
+    assert phash.find_clusters([1], [7]) == []
+
+    # El resultado no depende del tamaño de los bloques de la comparación
+    monkeypatch.setattr(phash, "BLOCK_ROWS", 2)
+    assert phash.find_clusters(ids, hashes, max_distance=6) == [[10, 11, 12], [13, 14]]
+
+
+def test_duplicates_of_known_images(client, login, tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    Image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(storage, "MEDIA_ROOT", tmp_path)
+
+    def save(name, pixels, **options):
+        image = Image.fromarray(pixels.astype(np.uint8)).resize((256, 256), Image.NEAREST)
+        image.save(tmp_path / name, **options)
+        return f"/{name}"
+
+    rng = np.random.default_rng(7)
+    base = rng.integers(0, 256, (16, 16))
+    other = rng.integers(0, 256, (16, 16))
+    paths = [
+        save("original.jpg", base, quality=95),
+        # Misma foto más clara y con más compresión
+        save("retocada.jpg", np.clip(base + 10, 0, 255), quality=60),
+        save("otra.png", other),
+    ]
+    session_id, (original, edited, different) = new_session(paths)
+
+    assert phash.hash_photos([original, edited, different]) == {"hashed": 3, "failed": 0}
+    response = client.get(f"/sessions/{session_id}/duplicates", headers=login(*PHOTOGRAPHER))
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert report["hashed"] == 3
+    assert report["pending"] == 0
+    assert [[photo["photo_id"] for photo in cluster["photos"]] for cluster in report["clusters"]] == [
+        [original, edited]
+    ]
@@ -0,0 +1,141 @@
+# tests/test_queue.py
+
+import time
+import uuid
+
+import pytest
+from sqlalchemy import select, update
+
+from config.db import get_db
+from models.job import jobs
+from services import queue as job_queue
+
+
+@pytest.fixture
+def queue_name(client):
+    # Cada test usa su propia cola para no ver los trabajos de los demás
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def job_row(job_id):
+    with get_db() as db:
+        return db.execute(select(jobs).where(jobs.c.id == job_id)).first()
+
+
+def make_ready(job_id):
+    with get_db() as db:
+        db.execute(update(jobs).where(jobs.c.id == job_id).values(run_at=time.time()))
+
+
+def test_lease_and_complete(queue_name):
+    job_id = job_queue.enqueue("test.noop", {"n": 1}, queue=queue_name)
+
+    job = job_queue.lease(queue_name)
+    assert job.id == job_id
+    assert job.status == "leased"
+    assert job.attempts == 1
+    # Un trabajo reservado no lo ve otro worker
+    assert job_queue.lease(queue_name) is None
+
+    assert job_queue.complete(job)
+    assert job_row(job_id).status == "done"
+    assert job_queue.lease(queue_name) is None
+
+
+def test_delayed_job_is_not_leased_early(queue_name):
+    job_queue.enqueue("test.noop", queue=queue_name, delay=60)
+    assert job_queue.lease(queue_name) is None
+
+
+def test_visibility_timeout_expiry(queue_name):
+    job_id = job_queue.enqueue("test.noop", queue=queue_name)
+    lost = job_queue.lease(queue_name, visibility_timeout=0)
+    time.sleep(0.01)
+
+    # El worker murió: la reserva expira y otro worker recupera el trabajo
+    job = job_queue.lease(queue_name)
+    assert job.id == job_id
+    assert job.attempts == 2
+    assert job.leased_by != lost.leased_by
+
+    # El worker original ya no puede confirmar ni ampliar una reserva que no es suya
+    assert not job_queue.complete(lost)
+    assert not job_queue.extend_lease(lost, 60)
+    assert job_queue.complete(job)
+
+
+def test_failure_backoff(queue_name):
+    job_id = job_queue.enqueue("test.noop", queue=queue_name, max_attempts=3)
+    job = job_queue.lease(queue_name)
+
+    before = time.time()
+    assert job_queue.fail(job, "boom") == "pending"
+    row = job_row(job_id)
+    assert row.last_error == "boom"
+    assert row.leased_until is None
+    # Primer reintento a ~2 s (±20% de jitter)
+    assert before + 1.6 <= row.run_at <= time.time() + 2.4
+    assert job_queue.lease(queue_name) is None
+
+    make_ready(job_id)
+    job = job_queue.lease(queue_name)
+    assert job.attempts == 2
+
+
+def test_backoff_delay_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(job_queue.random, "uniform", lambda low, high: 1.0)
+    assert [job_queue.backoff_delay(n) for n in (1, 2, 3, 4)] == [2, 4, 8, 16]
+    assert job_queue.backoff_delay(50) == job_queue.BACKOFF_MAX
+
+
+def test_dead_letter_and_retry(queue_name):
+    job_id = job_queue.enqueue("test.noop", queue=queue_name, max_attempts=2)
+
+    assert job_queue.fail(job_queue.lease(queue_name), "first") == "pending"
+    make_ready(job_id)
+    assert job_queue.fail(job_queue.lease(queue_name), "second") == "dead"
+    assert job_row(job_id).status == "dead"
+    assert job_queue.lease(queue_name) is None
+
+    assert job_queue.retry_dead(queue_name) == 1
+    job = job_queue.lease(queue_name)
+    assert job.id == job_id
+    assert job.attempts == 1
+
+
+def test_expired_lease_without_attempts_goes_dead(queue_name):
+    job_id = job_queue.enqueue("test.noop", queue=queue_name, max_attempts=1)
+    job_queue.lease(queue_name, visibility_timeout=0)
+    time.sleep(0.01)
+
+    assert job_queue.lease(queue_name) is None
+    row = job_row(job_id)
+    assert row.status == "dead"
+    assert row.last_error == "Tiempo de visibilidad agotado"
+
+
+def test_enqueue_once(queue_name):
+    first = job_queue.enqueue_once("test.noop", {"gallery_id": 1}, queue=queue_name)
+    assert first is not None
+    # Ya hay uno pendiente con el mismo payload
+    assert job_queue.enqueue_once("test.noop", {"gallery_id": 1}, queue=queue_name) is None
+    # Otro payload es otro trabajo
+    assert job_queue.enqueue_once("test.noop", {"gallery_id": 2}, queue=queue_name) is not None
+
+    # Si el pendiente ya está en curso, se encola otro
+    while (job := job_queue.lease(queue_name)) and job.id != first:
+        pass
+    assert job_queue.enqueue_once("test.noop", {"gallery_id": 1}, queue=queue_name) is not None
+
+
+def test_queue_stats(client, admin_headers, queue_name):
+    job_queue.enqueue("test.noop", queue=queue_name)
+    job_queue.complete(job_queue.lease(queue_name))
+    job_queue.enqueue("test.noop", queue=queue_name)
+
+    response = client.get("/admin/queue", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    [entry] = [entry for entry in response.json() if entry["queue"] == queue_name]
+    assert entry["pending"] == 1
+    assert entry["done"] == 1
+    assert entry["completed_last_window"] == 1
@@ -0,0 +1,79 @@
+# tests/test_ranking.py
+
+import pytest
+
+from services.ranking import BASE, DIGITS, key_between, keys_between, spaced_keys
+
+
+def assert_valid(keys):
+    """Claves estrictamente ordenadas y sin '0' final (ver services/ranking.py)."""
+    assert all(key and not key.endswith("0") for key in keys), keys
+    assert all(a < b for a, b in zip(keys, keys[1:])), keys
+
+
+def test_key_between_bounds():
+    assert_valid([key_between(None, None)])
+    assert_valid([key_between(None, "V"), "V"])
+    assert_valid(["V", key_between("V", None)])
+    assert_valid(["V", key_between("V", "W"), "W"])
+
+
+def test_key_between_rejects_unordered():
+    with pytest.raises(ValueError):
+        key_between("W", "V")
+    with pytest.raises(ValueError):
+        key_between("V", "V")
+
+
+def test_repeated_inserts_at_front():
+    keys = [key_between(None, None)]
+    for _ in range(500):
+        keys.insert(0, key_between(None, keys[0]))
+    assert_valid(keys)
+
+
+def test_repeated_inserts_at_end():
+    keys = [key_between(None, None)]
+    for _ in range(500):
+        keys.append(key_between(keys[-1], None))
+    assert_valid(keys)
+
+
+def test_repeated_inserts_into_same_gap():
+    # Siempre justo después de la primera clave: el hueco se va estrechando
+    keys = [key_between(None, None), key_between(key_between(None, None), None)]
+    for _ in range(500):
+        keys.insert(1, key_between(keys[0], keys[1]))
+    assert_valid(keys)
+
+    # Y siempre justo antes de la última
+    keys = ["1", "2"]
+    for _ in range(500):
+        keys.insert(len(keys) - 1, key_between(keys[-2], keys[-1]))
+    assert_valid(keys)
+
+
+def test_keys_between_counts():
+    for lower, upper in [(None, None), ("1", "2"), ("V", None), (None, "01")]:
+        for count in (0, 1, 2, 7, 100):
+            keys = keys_between(lower, upper, count)
+            assert len(keys) == count
+            assert_valid([k for k in (lower,) if k] + keys + [k for k in (upper,) if k])
+
+
+@pytest.mark.parametrize("count", [1, BASE - 1, BASE, BASE + 1, 5000])
+def test_spaced_keys(count):
+    keys = spaced_keys(count)
+    assert len(keys) == count
+    assert len(set(keys)) == count
+    assert_valid(keys)
+    # Se puede insertar entre cualquier pareja y en los extremos
+    assert_valid([key_between(None, keys[0]), keys[0]])
+    assert_valid([keys[-1], key_between(keys[-1], None)])
+    middle = count // 2
+    if count > 1:
+        assert_valid([keys[middle - 1], key_between(keys[middle - 1], keys[middle]), keys[middle]])
+
+
+def test_digits_are_in_ascii_order():
+    assert list(DIGITS) == sorted(DIGITS)
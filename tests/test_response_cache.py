@@ -0,0 +1,91 @@
+# tests/test_response_cache.py
+
+import time
+
+from services.response_cache import CacheEntry, ResponseCache, invalidate
+
+CLIENT = ("cliente@example.com", "cliente123")
+
+
+def get_gallery(client, headers):
+    response = client.get("/galleries/1", headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def selected(response, photo_id):
+    [photo] = [photo for photo in response.json()["photos"] if photo["photo_id"] == photo_id]
+    return photo["selected"]
+
+
+def entry(tags, body=b"{}", ttl=30):
+    return CacheEntry(200, [], body, tags, time.monotonic() + ttl)
+
+
+def test_hit_and_invalidation_on_write(client, login):
+    headers = login(*CLIENT)
+    invalidate("gallery:1")
+    first = get_gallery(client, headers)
+    assert first.headers["x-cache"] == "MISS"
+    assert get_gallery(client, headers).headers["x-cache"] == "HIT"
+
+    # Cambiar la selección invalida la etiqueta gallery:1
+    for _ in range(2):
+        response = client.put("/galleries/1/photos/1/select", headers=headers)
+        assert response.status_code == 200, response.text
+        after = get_gallery(client, headers)
+        assert after.headers["x-cache"] == "MISS"
+        assert selected(after, 1) == response.json()["selected"]
+    assert selected(after, 1) == selected(first, 1)
+
+
+def test_cache_is_per_user(client, login):
+    invalidate("gallery:1")
+    assert get_gallery(client, login(*CLIENT)).headers["x-cache"] == "MISS"
+    photographer = login("fotografo@example.com", "foto123")
+    assert get_gallery(client, photographer).headers["x-cache"] == "MISS"
+    assert get_gallery(client, photographer).headers["x-cache"] == "HIT"
+
+
+def test_invalidate_by_tag():
+    cache = ResponseCache()
+    cache.put("a", entry(["gallery:1", "galleries"]), cache.versions(["gallery:1", "galleries"]))
+    cache.put("b", entry(["gallery:2", "galleries"]), cache.versions(["gallery:2", "galleries"]))
+
+    cache.invalidate("gallery:1")
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+
+    cache.invalidate("galleries")
+    assert cache.get("b") is None
+
+
+def test_stale_response_is_not_stored():
+    cache = ResponseCache()
+    # La respuesta se calculó mientras otra petición invalidaba su etiqueta
+    versions = cache.versions(["gallery:1"])
+    cache.invalidate("gallery:1")
+    cache.put("a", entry(["gallery:1"]), versions)
+    assert cache.get("a") is None
+
+    # Tras vaciar la caché tampoco vale ninguna versión anterior
+    versions = cache.versions(["gallery:1"])
+    cache.clear()
+    cache.put("a", entry(["gallery:1"]), versions)
+    assert cache.get("a") is None
+
+
+def test_ttl_and_lru_eviction():
+    cache = ResponseCache()
+    cache.put("expired", entry(["t"], ttl=0), cache.versions(["t"]))
+    assert cache.get("expired") is None
+
+    size = entry(["t"], body=b"x" * 1000).size
+    cache = ResponseCache(max_bytes=2 * size)
+    cache.put("a", entry(["t"], body=b"x" * 1000), cache.versions(["t"]))
+    cache.put("b", entry(["t"], body=b"x" * 1000), cache.versions(["t"]))
+    assert cache.get("a") is not None  # "b" pasa a ser la menos usada
+    cache.put("c", entry(["t"], body=b"x" * 1000), cache.versions(["t"]))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
@@ -0,0 +1,117 @@
+# tests/test_singleflight.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+class SlowQuery:
+    """Consulta de prueba que tarda y cuenta cuántas veces se ejecuta."""
+
+    def __init__(self, delay=0.2, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"value": value}
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight("test")
+    query = SlowQuery()
+
+    async def main():
+        return await asyncio.gather(*(flight.do("gallery:1:1", query, 1) for _ in range(10)))
+
+    results = asyncio.run(main())
+    assert query.calls == 1
+    assert flight.executions == 1
+    assert flight.shared == 9
+    # Todas reciben el mismo objeto
+    assert all(result is results[0] for result in results)
+    assert results[0] == {"value": 1}
+    assert not flight._calls
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    query = SlowQuery()
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("gallery:1:1", query, 1),
+            flight.do("gallery:1:2", query, 2),
+        )
+
+    assert asyncio.run(main()) == [{"value": 1}, {"value": 2}]
+    assert query.calls == 2
+
+
+def test_nothing_is_kept_after_the_call():
+    flight = SingleFlight("test")
+    query = SlowQuery(delay=0)
+
+    async def main():
+        await flight.do("key", query, 1)
+        await flight.do("key", query, 1)
+
+    asyncio.run(main())
+    assert query.calls == 2
+
+
+def test_error_is_shared_by_all_waiters():
+    flight = SingleFlight("test")
+    error = RuntimeError("database is locked")
+    query = SlowQuery(error=error)
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do("key", query, 1) for _ in range(5)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert query.calls == 1
+    assert all(result is error for result in results)
+    assert not flight._calls
+
+
+def test_timeout_does_not_cancel_the_call():
+    flight = SingleFlight("test")
+    query = SlowQuery(delay=0.3)
+
+    async def main():
+        patient = asyncio.ensure_future(flight.do("key", query, 1))
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("key", query, 1, timeout=0.05)
+        return await patient
+
+    assert asyncio.run(main()) == {"value": 1}
+    assert query.calls == 1
+    assert flight.timeouts == 1
+
+
+def test_cancelled_first_caller_does_not_cancel_the_rest():
+    flight = SingleFlight("test")
+    query = SlowQuery()
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", query, 1))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(flight.do("key", query, 1))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == {"value": 1}
+    assert query.calls == 1
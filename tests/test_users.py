@@ -0,0 +1,37 @@
+# tests/test_users.py
+
+import json
+
+from sqlalchemy import select
+
+from models.user import users
+from routes import user as user_routes
+
+
+def test_admin_listing_streams_one_chunk_per_batch(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(user_routes, "USER_STREAM_BATCH", 2)
+
+    response = client.get("/users?fields=id,email", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    listed = response.json()
+    ids = [user["id"] for user in listed]
+    assert len(ids) >= 3
+    assert ids == sorted(ids)
+    assert set(listed[0]) == {"id", "email"}
+
+    # Paginación por ID y límite que no es múltiplo del lote
+    response = client.get(f"/users?fields=id&after_id={ids[0]}&limit=3", headers=admin_headers)
+    assert [user["id"] for user in response.json()] == ids[1:4]
+
+    query = select(users.c.id, users.c.email).order_by(users.c.id)
+    rows = user_routes._user_batch(query, None, 2)
+    chunks = list(user_routes._stream_users(query, rows, limit=len(ids)))
+    # Un bloque por lote más el cierre del array
+    assert len(chunks) == -(-len(ids) // 2) + 1
+    assert json.loads(b"".join(chunks)) == listed
+
+
+def test_empty_listing_is_valid_json(client, admin_headers):
+    response = client.get("/users?after_id=1000000", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json() == []
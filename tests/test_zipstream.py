@@ -0,0 +1,83 @@
+# tests/test_zipstream.py
+
+import io
+import os
+import zipfile
+
+import pytest
+
+from config import storage
+from services.zipstream import stream_zip
+
+PHOTOGRAPHER = ("fotografo@example.com", "foto123")
+CLIENT = ("cliente@example.com", "cliente123")
+
+
+@pytest.fixture
+def media_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "MEDIA_ROOT", tmp_path)
+    return tmp_path
+
+
+def write_file(root, relative, data):
+    path = root / relative.lstrip("/")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_stream_zip_is_valid(tmp_path):
+    first = write_file(tmp_path, "a.jpg", os.urandom(3000))
+    second = write_file(tmp_path, "b.jpg", b"")
+    # Varios bloques por fichero
+    data = b"".join(stream_zip([("a.jpg", first), ("vacía.jpg", second)], chunk_size=1024))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["a.jpg", "vacía.jpg"]
+        assert archive.read("a.jpg") == first.read_bytes()
+        assert archive.read("vacía.jpg") == b""
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+
+
+def test_stream_zip_uses_zip64_above_limit(tmp_path, monkeypatch):
+    # Bajar el límite de 4 GB para no tener que generar ficheros enormes
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1000)
+    big = write_file(tmp_path, "big.jpg", os.urandom(4000))
+    small = write_file(tmp_path, "small.jpg", os.urandom(100))
+    data = b"".join(stream_zip([("big.jpg", big), ("small.jpg", small)], chunk_size=1024))
+
+    # Registro de fin de directorio central Zip64
+    assert b"PK\x06\x06" in data
+    monkeypatch.undo()
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.read("big.jpg") == big.read_bytes()
+        assert archive.read("small.jpg") == small.read_bytes()
+        # La entrada grande lleva el campo extra Zip64 (id 0x0001)
+        assert archive.getinfo("big.jpg").extra.startswith(b"\x01\x00")
+
+
+def test_download_selection(client, login, media_root):
+    first = write_file(media_root, "/uploads/sessions/1/boda_001.jpg", os.urandom(2000))
+    second = write_file(media_root, "/uploads/sessions/1/boda_002.jpg", os.urandom(500))
+
+    response = client.get("/galleries/1/selection.zip", headers=login(*PHOTOGRAPHER))
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == ["boda_001.jpg", "boda_002.jpg"]
+        assert archive.read("boda_001.jpg") == first.read_bytes()
+        assert archive.read("boda_002.jpg") == second.read_bytes()
+
+
+def test_download_selection_errors(client, login, media_root):
+    # Solo el fotógrafo puede descargar la selección
+    response = client.get("/galleries/1/selection.zip", headers=login(*CLIENT))
+    assert response.status_code == 403
+
+    # Sin ficheros en disco no hay nada que enviar
+    response = client.get("/galleries/1/selection.zip", headers=login(*PHOTOGRAPHER))
+    assert response.status_code == 404